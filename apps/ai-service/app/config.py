@@ -34,6 +34,8 @@ class Settings(BaseSettings):
     SSI_BASE_URL: str = "https://fc-data.ssi.com.vn"
     SSI_CONSUMER_ID: str = ""
     SSI_CONSUMER_SECRET: str = ""
+    SSI_TIMEOUT: float = 10.0
+    SSI_MAX_RETRIES: int = 3  # 429 / 5xx / transport errors, jittered backoff
 
     # Polling Service (Sprint A.1)
     POLLING_ENABLED: bool = True
@@ -41,16 +43,56 @@ class Settings(BaseSettings):
     POLLING_INTERVAL_WATCHLIST: int = 30
     POLLING_INTERVAL_HOT: int = 15
     POLLING_BATCH_SIZE: int = 20
+    POLLING_FETCH_MODE: str = "concurrent"  # "concurrent" | "serial"
+    POLLING_MAX_IN_FLIGHT: int = 8
+    SSI_RATE_LIMIT_PER_SEC: float = 10.0  # shared by all tiers
+    SSI_RATE_LIMIT_BURST: int = 10
+    POLLING_MARKET_HOURS: bool = True  # follow HOSE/HNX sessions; False = poll around the clock
+    POLLING_AUCTION_INTERVAL: int = 0  # seconds during ATO/ATC (0 = tier interval)
+    MARKET_HOLIDAYS_FILE: str = "data/market_holidays.txt"
+    POLLING_ADAPTIVE_TIERS: bool = True  # promote active / watched symbols to hot/watchlist
+    POLLING_REQUEST_BUDGET: float = 8.0  # req/s across all tiers, below SSI_RATE_LIMIT_PER_SEC
+    POLLING_PROMOTION_SHARE: float = 0.25  # budget share promotions may use when DEFAULT alone exceeds it
+    POLLING_TIER_EVAL_INTERVAL: int = 30
+    POLLING_CHANGE_FILTER: bool = True  # drop re-fetched bars identical to what was delivered
+    INGEST_QUEUE_MAX_SYMBOLS: int = 2000  # symbols waiting between polling and state
+    INGEST_OVERFLOW: str = "block"  # "block" (backpressure) | "drop_oldest"
+    INGEST_MAX_WAIT: float = 0.0  # seconds a partial micro-batch may wait to fill
+    STREAM_ENABLED: bool = False  # push feed first, polling as fallback for gaps
+    STREAM_KIND: str = "sse"  # "sse" | "websocket" | "replay" (URL = JSONL path)
+    STREAM_URL: str = ""
+    STREAM_GAP_SECONDS: int = 90  # poll a symbol the stream has not delivered for this long
 
     # State Manager (Sprint A.2)
     STATE_ROLLING_WINDOW_1M: int = 60
     STATE_ROLLING_WINDOW_DAILY: int = 50
+    STATE_ROLLING_WINDOW_RESAMPLED: int = 60  # bars kept per 5m/15m/30m/1h frame
     STATE_STALE_THRESHOLD: int = 300
+    # "exact": v1 RSI/MA values, O(51) per daily-bar write | "wilder": O(1), Wilder RSI
+    STATE_INDICATOR_MODE: str = "exact"
+    STATE_SNAPSHOT_ENABLED: bool = True  # warm-restart file
+    STATE_SNAPSHOT_PATH: str = "data/market_state.bin"
+    STATE_SNAPSHOT_INTERVAL: int = 60
+    STATE_SHARED_MODE: str = "off"  # "off" | "writer" | "reader" | "auto" (multi-worker)
+    STATE_SHARED_NAME: str = "smarttrade_market_state"
+    STATE_SHARED_MAX_SYMBOLS: int = 2000
+    STATE_BACKFILL_ENABLED: bool = True  # daily history before polling starts
+    STATE_BACKFILL_SOURCE: str = "supabase"  # "supabase" | path to .parquet/.csv/.npz
+    STATE_BACKFILL_PAGE_SIZE: int = 1000
+    STATE_BACKFILL_LOOKBACK_DAYS: int = 100  # calendar days, covers 50 trading days
 
     # Insight Engine (Sprint A.3)
     INSIGHT_ENGINE_ENABLED: bool = True
     INSIGHT_DEDUP_WINDOW: int = 300
     INSIGHT_LOG_FILE: str = "logs/insights.jsonl"
+    INSIGHT_LOG_BATCH_SIZE: int = 500  # lines; flushed by a worker thread on size or interval
+    INSIGHT_LOG_FLUSH_INTERVAL: float = 1.0
+    INSIGHT_LOG_MAX_BYTES: int = 50 * 1024 * 1024  # rotate before the file grows past this (0 = off)
+    INSIGHT_LOG_ROTATE_DAILY: bool = True
+    INSIGHT_LOG_COMPRESS: bool = False  # gzip rotated segments
+    INSIGHT_BATCH_WINDOW: float = 1.0  # seconds; dirty symbols analyzed at most once per window
+    INSIGHT_VECTORIZED: bool = True  # batches run as one NumPy pass over (symbols x bars)
+    INSIGHT_DISABLED_DETECTORS: str = ""  # comma-separated insight codes, e.g. "PA02,VA02"
 
     # Alert Evaluator (Sprint B.1)
     ALERT_COOLDOWN_DEFAULT: int = 300
@@ -76,6 +118,10 @@ class Settings(BaseSettings):
             return []
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",") if origin.strip()]
 
+    def get_disabled_detectors(self) -> list[str]:
+        """Parse INSIGHT_DISABLED_DETECTORS string into list of insight codes."""
+        return [code.strip().upper() for code in self.INSIGHT_DISABLED_DETECTORS.split(",") if code.strip()]
+
 
 @lru_cache()
 def get_settings() -> Settings:
@@ -6,32 +6,138 @@ import logging
 from app.config import settings
 from app.routers import ai_router, hybrid_ai_router, analytics_router, research_router, alerts_router, debug_router
 from app.services.market_state_manager import MarketStateManager
+from app.services.state_snapshot import StateSnapshotStore
+from app.services.shared_state import open_shared_state
+from app.services.history_backfill import HistoryBackfill
 from app.services.market_polling_service import MarketPollingService
+from app.services.rate_limiter import TokenBucket
+from app.services.ssi_client import SSIFastConnectClient
+from app.services.stream_source import create_stream_source
+from app.services.trading_calendar import TradingCalendar
+from app.services.tier_policy import AdaptiveTierPolicy
 from app.services.insight_engine import InsightEngine
+from app.services.insight_log import InsightLogWriter
+from app.services.insight_scheduler import InsightScheduler
 from app.services.alert_evaluator import get_alert_evaluator
+from app.services.alert_engine import get_alert_engine
 from app.services.ai_explain_service import get_ai_explain_service
 from app.services.pipeline_monitor import get_pipeline_monitor
 
 logger = logging.getLogger(__name__)
 
 # Global service instances
-state_manager = MarketStateManager(
+
+# Multi-worker: one writer polls and publishes to shared memory, readers serve from it
+shared_writer, shared_reader = open_shared_state(
+    settings.STATE_SHARED_MODE,
+    name=settings.STATE_SHARED_NAME,
+    max_symbols=settings.STATE_SHARED_MAX_SYMBOLS,
+    cap_1m=settings.STATE_ROLLING_WINDOW_1M,
+    cap_daily=settings.STATE_ROLLING_WINDOW_DAILY,
+    stale_threshold=settings.STATE_STALE_THRESHOLD,
+    rolling_window_resampled=settings.STATE_ROLLING_WINDOW_RESAMPLED,
+)
+owns_state = shared_reader is None
+
+state_manager = shared_reader or MarketStateManager(
     rolling_window_1m=settings.STATE_ROLLING_WINDOW_1M,
     rolling_window_daily=settings.STATE_ROLLING_WINDOW_DAILY,
+    rolling_window_resampled=settings.STATE_ROLLING_WINDOW_RESAMPLED,
     stale_threshold=settings.STATE_STALE_THRESHOLD,
+    indicator_mode=settings.STATE_INDICATOR_MODE,
+)
+
+state_snapshot = StateSnapshotStore(
+    path=settings.STATE_SNAPSHOT_PATH,
+    interval_seconds=settings.STATE_SNAPSHOT_INTERVAL,
+)
+
+history_backfill = HistoryBackfill(
+    state_manager,
+    window=settings.STATE_ROLLING_WINDOW_DAILY,
+    page_size=settings.STATE_BACKFILL_PAGE_SIZE,
+    lookback_days=settings.STATE_BACKFILL_LOOKBACK_DAYS,
+)
+
+insight_log = (
+    InsightLogWriter(
+        settings.INSIGHT_LOG_FILE,
+        batch_size=settings.INSIGHT_LOG_BATCH_SIZE,
+        flush_interval=settings.INSIGHT_LOG_FLUSH_INTERVAL,
+        max_bytes=settings.INSIGHT_LOG_MAX_BYTES,
+        rotate_daily=settings.INSIGHT_LOG_ROTATE_DAILY,
+        compress=settings.INSIGHT_LOG_COMPRESS,
+    )
+    if settings.INSIGHT_LOG_FILE else None
 )
 
 insight_engine = InsightEngine(
     dedup_window_seconds=settings.INSIGHT_DEDUP_WINDOW,
     log_file=settings.INSIGHT_LOG_FILE,
+    log_writer=insight_log,
     enabled=settings.INSIGHT_ENGINE_ENABLED,
+    vectorized=settings.INSIGHT_VECTORIZED,
+    disabled_detectors=settings.get_disabled_detectors(),
+)
+
+# Symbols whose bars changed are analyzed once per batch window
+insight_scheduler = InsightScheduler(
+    insight_engine,
+    state_manager,
+    batch_window=settings.INSIGHT_BATCH_WINDOW,
+)
+
+# One bucket for every SSI request: poller's first attempts and client retries
+ssi_rate_limiter = TokenBucket(settings.SSI_RATE_LIMIT_PER_SEC, settings.SSI_RATE_LIMIT_BURST)
+
+ssi_client = (
+    SSIFastConnectClient(
+        settings.SSI_CONSUMER_ID,
+        settings.SSI_CONSUMER_SECRET,
+        base_url=settings.SSI_BASE_URL,
+        max_connections=settings.POLLING_MAX_IN_FLIGHT,
+        timeout=settings.SSI_TIMEOUT,
+        max_retries=settings.SSI_MAX_RETRIES,
+        rate_limiter=ssi_rate_limiter,
+    )
+    if settings.SSI_CONSUMER_ID and settings.SSI_CONSUMER_SECRET else None
 )
 
 polling_service = MarketPollingService(
+    ssi_client=ssi_client,
     interval_default=settings.POLLING_INTERVAL_DEFAULT,
     interval_watchlist=settings.POLLING_INTERVAL_WATCHLIST,
     interval_hot=settings.POLLING_INTERVAL_HOT,
     batch_size=settings.POLLING_BATCH_SIZE,
+    fetch_mode=settings.POLLING_FETCH_MODE,
+    max_in_flight=settings.POLLING_MAX_IN_FLIGHT,
+    rate_limiter=ssi_rate_limiter,
+    calendar=(
+        TradingCalendar.from_file(settings.MARKET_HOLIDAYS_FILE)
+        if settings.POLLING_MARKET_HOURS else None
+    ),
+    auction_interval=settings.POLLING_AUCTION_INTERVAL or None,
+    change_filter=settings.POLLING_CHANGE_FILTER,
+    stream_gap=settings.STREAM_GAP_SECONDS,
+    ingest_max_symbols=settings.INGEST_QUEUE_MAX_SYMBOLS,
+    ingest_overflow=settings.INGEST_OVERFLOW,
+    ingest_max_wait=settings.INGEST_MAX_WAIT,
+)
+
+# Push feed into the poller's ingest queue; polling covers the gaps
+stream_source = (
+    create_stream_source(settings.STREAM_KIND, settings.STREAM_URL)
+    if settings.STREAM_ENABLED and settings.STREAM_URL else None
+)
+if stream_source:
+    stream_source.set_on_bars_update(polling_service.push_bars)
+
+tier_policy = AdaptiveTierPolicy(
+    polling_service,
+    state_manager,
+    request_budget=settings.POLLING_REQUEST_BUDGET,
+    promotion_share=settings.POLLING_PROMOTION_SHARE,
+    eval_interval=settings.POLLING_TIER_EVAL_INTERVAL,
 )
 
 alert_evaluator = get_alert_evaluator(
@@ -42,13 +148,28 @@ alert_evaluator = get_alert_evaluator(
     cooldown_cache_path=settings.ALERT_COOLDOWN_CACHE_PATH,
 )
 
+# Smart-alert conditions read prices and indicators from state (this worker's or shared)
+alert_engine = get_alert_engine(state_manager=state_manager)
+
 ai_explain = get_ai_explain_service()  # LLM only used when AI_EXPLAIN_MODE=template_llm + key present
 
 # Wire insight engine → alert evaluator
 insight_engine.subscribe(alert_evaluator.evaluate)
+if settings.POLLING_ADAPTIVE_TIERS:
+    insight_engine.subscribe(tier_policy.record_insight)
+
+# Wire polling → state manager (→ shared memory in writer mode) → insight analysis
+async def _on_bars_update(bars):
+    summary = await state_manager.update_bars(bars)
+    if shared_writer:
+        shared_writer.publish(state_manager)
+    if settings.INSIGHT_ENGINE_ENABLED:
+        insight_scheduler.mark_changed(summary)
+    return summary
+
 
-# Wire polling → state manager
-polling_service.set_on_bars_update(state_manager.update_bars)
+if owns_state:
+    polling_service.set_on_bars_update(_on_bars_update)
 
 # Register all services with Pipeline Monitor for ops visibility
 pipeline_monitor = get_pipeline_monitor()
@@ -58,6 +179,7 @@ pipeline_monitor.register_services(
     insight_engine=insight_engine,
     alert_evaluator=alert_evaluator,
     ai_explain_service=ai_explain,
+    insight_scheduler=insight_scheduler,
 )
 
 
@@ -72,16 +194,54 @@ async def lifespan(app: FastAPI):
                  alert_evaluator.warmup_seconds)
     logger.info("Pipeline Monitor registered: polling=%s state=%s insight=%s alert=%s explain=%s",
                  True, True, True, True, True)
-    if settings.POLLING_ENABLED:
+    if shared_reader:
+        logger.info("Shared state reader: serving state from segment %s",
+                     settings.STATE_SHARED_NAME)
+    if owns_state and settings.STATE_SNAPSHOT_ENABLED:
+        state_snapshot.restore(state_manager)
+        await state_snapshot.start(state_manager)
+    if owns_state and settings.STATE_BACKFILL_ENABLED:
+        await history_backfill.run(settings.STATE_BACKFILL_SOURCE)
+        polling_service.mark_daily_backfilled(history_backfill.loaded_symbols())
+    if shared_writer:
+        shared_writer.publish(state_manager)
+        logger.info("Shared state writer: publishing to segment %s", shared_writer.name)
+    if owns_state and settings.POLLING_ENABLED:
+        if ssi_client:
+            try:
+                # Pool + token ready before the first poll
+                await ssi_client.start()
+            except Exception as e:
+                logger.error("SSI client start failed, polling will retry: %s", e)
+        await polling_service.seed_cursors(state_manager)
+        if settings.INSIGHT_ENGINE_ENABLED:
+            await insight_scheduler.start()
         await polling_service.start()
-        logger.info("Polling Service started: default=%ds watchlist=%ds hot=%ds",
+        logger.info("Polling Service started: default=%ds watchlist=%ds hot=%ds phase=%s",
                      settings.POLLING_INTERVAL_DEFAULT, settings.POLLING_INTERVAL_WATCHLIST,
-                     settings.POLLING_INTERVAL_HOT)
+                     settings.POLLING_INTERVAL_HOT, polling_service.get_stats()["session_phase"])
+        if stream_source:
+            await stream_source.start()
+        if settings.POLLING_ADAPTIVE_TIERS:
+            await tier_policy.start()
     yield
     # Shutdown
     logger.info("Shutting down %s...", settings.APP_NAME)
     alert_evaluator.persist_cooldowns()
+    await tier_policy.stop()
+    if stream_source:
+        await stream_source.stop()
     await polling_service.stop()
+    await insight_scheduler.stop()
+    await insight_engine.close()  # flush queued insight log lines
+    if ssi_client:
+        await ssi_client.close()
+    if owns_state and settings.STATE_SNAPSHOT_ENABLED:
+        await state_snapshot.stop(state_manager)
+    if shared_writer:
+        shared_writer.close()
+    if shared_reader:
+        shared_reader.close()
 
 
 app = FastAPI(
@@ -46,6 +46,11 @@ class InsightSeverity(str, Enum):
 class Timeframe(str, Enum):
     INTRADAY_1M = "intraday_1m"
     DAILY = "daily"
+    # Resampled from 1m bars by the state manager
+    INTRADAY_5M = "intraday_5m"
+    INTRADAY_15M = "intraday_15m"
+    INTRADAY_30M = "intraday_30m"
+    INTRADAY_1H = "intraday_1h"
 
 
 # ============================================
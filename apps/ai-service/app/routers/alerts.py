@@ -440,6 +440,28 @@ async def toggle_alert(alert_id: str):
     return updated
 
 
+@router.post("/{alert_id}/check")
+async def check_alert_now(alert_id: str):
+    """
+    Evaluate an alert's conditions against current market state.
+    Dry run: nothing is recorded and no notification is sent.
+    """
+    from app.services.alert_engine import get_alert_engine
+
+    alert = next((a for a in DEMO_ALERTS if a["id"] == alert_id), None)
+    if not alert:
+        raise HTTPException(status_code=404, detail="Alert not found")
+
+    result = await get_alert_engine().evaluate(alert)
+    return {
+        "alert_id": alert_id,
+        "symbol": alert["symbol"],
+        "triggered": result["triggered"],
+        "trigger_data": result.get("trigger_data"),
+        "insufficient_history": result.get("insufficient_history", []),
+    }
+
+
 @router.get("/indicators/info")
 async def get_indicators_info():
     """
@@ -18,12 +18,12 @@ async def get_market_state_debug():
 
     result = {}
     for symbol in state_manager.get_tracked_symbols():
-        st = state_manager._states.get(symbol)
-        if not st:
+        info = state_manager.get_symbol_info(symbol)
+        if not info:
             continue
 
-        bars_1m = len(st.bars_1m)
-        bars_daily = len(st.bars_daily)
+        bars_1m = info["bars_1m"]
+        bars_daily = info["bars_daily"]
 
         # Indicator readiness
         indicators = {}
@@ -49,8 +49,10 @@ async def get_market_state_debug():
         result[symbol] = {
             "bars_1m": bars_1m,
             "bars_daily": bars_daily,
+            "bars_resampled": info.get("bars_resampled", {}),
             "indicators": indicators,
-            "last_updated": st.last_updated.isoformat() + "Z" if st.last_updated else None,
+            "version": info["version"],
+            "last_updated": info["last_updated"].isoformat() + "Z" if info["last_updated"] else None,
         }
 
     return result
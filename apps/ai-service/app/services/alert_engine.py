@@ -4,12 +4,18 @@ Handles checking alert conditions against real-time market data
 and triggering notifications when conditions are met.
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 from dataclasses import dataclass
 import asyncio
 import logging
 
+import numpy as np
+
+from app.models.insight_models import Timeframe
+from app.services.bar_resampler import TIMEFRAME_BY_INTERVAL
+from app.services.indicators import compute_latest, to_optional
+
 logger = logging.getLogger(__name__)
 
 
@@ -28,32 +34,56 @@ class MarketData:
 
 @dataclass
 class TechnicalIndicators:
-    """Technical indicators for a symbol."""
+    """Technical indicators for a symbol on one timeframe. None = not enough history."""
     symbol: str
-    rsi: float
-    macd_line: float
-    macd_signal: float
-    macd_histogram: float
-    ma_20: float
-    ma_50: float
-    ma_200: float
-    bb_upper: float
-    bb_middle: float
-    bb_lower: float
+    rsi: Optional[float]
+    macd_line: Optional[float]
+    macd_signal: Optional[float]
+    macd_histogram: Optional[float]
+    ma_20: Optional[float]
+    ma_50: Optional[float]
+    ma_200: Optional[float]
+    bb_upper: Optional[float]
+    bb_middle: Optional[float]
+    bb_lower: Optional[float]
     previous_rsi: Optional[float] = None
     previous_macd_line: Optional[float] = None
+    previous_macd_signal: Optional[float] = None
     previous_price: Optional[float] = None
+    previous_ma_20: Optional[float] = None
+    previous_ma_50: Optional[float] = None
+    previous_ma_200: Optional[float] = None
+    bar_count: int = 0  # bars the values were computed from
+    timeframe: Timeframe = Timeframe.DAILY
+
+
+# MA periods alert conditions can compare
+MA_PERIODS = (20, 50, 200)
+
+
+def alert_timeframe(alert: Dict) -> Timeframe:
+    """Bars an alert's technical conditions run on: its check_interval, else daily."""
+    return TIMEFRAME_BY_INTERVAL.get(alert.get('check_interval'), Timeframe.DAILY)
 
 
 class AlertEngine:
     """
     Engine for evaluating smart alert conditions.
+    Market data and indicators come from the Market State Manager; indicators
+    for all alerted symbols are computed in one vectorized pass (indicators.py).
+    Technical conditions run on the bars of the alert's check_interval (1m,
+    or the 5m/15m/1h frames state resamples from 1m); alerts without one use
+    daily bars. Indicators are computed over the window state holds for that
+    frame (STATE_ROLLING_WINDOW_DAILY = 50 daily bars by default), so e.g.
+    MA200 conditions report insufficient history instead of silently never
+    matching.
     """
 
-    def __init__(self, supabase_client=None):
+    def __init__(self, supabase_client=None, state_manager=None):
         self.supabase = supabase_client
+        self.state_manager = state_manager
         self._market_data_cache: Dict[str, MarketData] = {}
-        self._technical_cache: Dict[str, TechnicalIndicators] = {}
+        self._technical_cache: Dict[Tuple[str, Timeframe], TechnicalIndicators] = {}
 
     async def check_all_alerts(self, interval: str) -> List[Dict]:
         """
@@ -79,7 +109,9 @@ class AlertEngine:
 
             # Fetch market data for all symbols
             await self._fetch_market_data(symbols)
-            await self._fetch_technical_indicators(symbols)
+            await self._fetch_technical_indicators(
+                symbols, TIMEFRAME_BY_INTERVAL.get(interval, Timeframe.DAILY)
+            )
 
             # Check each alert
             for alert in alerts:
@@ -96,6 +128,16 @@ class AlertEngine:
 
         return triggered_alerts
 
+    async def evaluate(self, alert: Dict) -> Dict:
+        """
+        Check one alert against current market state (dry run: the trigger is
+        not recorded). Same result shape as check_alert().
+        """
+        symbols = [alert['symbol']]
+        await self._fetch_market_data(symbols)
+        await self._fetch_technical_indicators(symbols, alert_timeframe(alert))
+        return await self.check_alert(alert)
+
     async def check_alert(self, alert: Dict) -> Dict:
         """
         Check if an alert's conditions are met.
@@ -104,7 +146,9 @@ class AlertEngine:
             alert: Alert configuration with conditions
 
         Returns:
-            Dict with 'triggered' bool and 'trigger_data' if triggered
+            Dict with 'triggered' bool and 'trigger_data' if triggered, plus
+            'insufficient_history' listing conditions that could not be
+            evaluated yet (counted as not met)
         """
         symbol = alert['symbol']
         conditions = alert.get('conditions', [])
@@ -115,7 +159,7 @@ class AlertEngine:
 
         # Get market data
         market_data = self._market_data_cache.get(symbol)
-        technical = self._technical_cache.get(symbol)
+        technical = self._technical_cache.get((symbol, alert_timeframe(alert)))
 
         if not market_data:
             logger.warning(f"No market data for {symbol}")
@@ -124,11 +168,15 @@ class AlertEngine:
         # Evaluate each condition
         results = []
         conditions_met = []
+        insufficient = []
 
         for condition in conditions:
             is_met, description = await self._evaluate_condition(
                 condition, market_data, technical
             )
+            if is_met is None:
+                insufficient.append(description)
+                is_met = False
             results.append(is_met)
             if is_met:
                 conditions_met.append(description)
@@ -139,29 +187,32 @@ class AlertEngine:
         else:  # OR
             triggered = any(results)
 
+        result = {'triggered': False}
         if triggered:
             trigger_data = self._build_trigger_data(
                 alert, market_data, technical, conditions_met
             )
-            return {
+            result = {
                 'triggered': True,
                 'alert': alert,
                 'trigger_data': trigger_data
             }
-
-        return {'triggered': False}
+        if insufficient:
+            result['insufficient_history'] = insufficient
+        return result
 
     async def _evaluate_condition(
         self,
         condition: Dict,
         market: MarketData,
         technical: Optional[TechnicalIndicators]
-    ) -> tuple[bool, str]:
+    ) -> tuple[Optional[bool], str]:
         """
         Evaluate a single condition.
 
         Returns:
-            Tuple of (is_met, description)
+            Tuple of (is_met, description); is_met is None when the indicator
+            needs more history than state holds (description says why)
         """
         indicator = condition['indicator']
         operator = condition['operator']
@@ -184,16 +235,16 @@ class AlertEngine:
             current_value = market.change_percent
             description = f"% Thay đổi {operator} {value:.2f}%"
 
-        elif indicator == 'rsi' and technical:
+        elif indicator == 'rsi' and technical and technical.rsi is not None:
             current_value = technical.rsi
             previous_value = technical.previous_rsi
             description = f"RSI {operator} {value}"
 
-        elif indicator == 'macd' and technical:
+        elif indicator == 'macd' and technical and technical.macd_signal is not None:
             current_value = technical.macd_line - technical.macd_signal
             previous_value = (
-                (technical.previous_macd_line - technical.macd_signal)
-                if technical.previous_macd_line else None
+                (technical.previous_macd_line - technical.previous_macd_signal)
+                if technical.previous_macd_signal is not None else None
             )
             description = f"MACD {operator} Signal"
 
@@ -201,14 +252,23 @@ class AlertEngine:
             # MA crossover: value is short MA period, value_secondary is long MA period
             short_ma = self._get_ma_value(technical, value)
             long_ma = self._get_ma_value(technical, value_secondary)
+            periods = [int(p) for p in (value, value_secondary) if p is not None]
+            if len(periods) == 2 and all(p in MA_PERIODS for p in periods) and (
+                short_ma is None or long_ma is None
+            ):
+                need = max(periods)
+                unit = "phiên" if technical.timeframe == Timeframe.DAILY else "nến"
+                return None, f"MA({need}): chưa đủ lịch sử ({technical.bar_count}/{need} {unit})"
             if short_ma and long_ma:
                 current_value = short_ma - long_ma
-                previous_value = None  # Would need historical data
+                prev_short = self._get_ma_value(technical, value, previous=True)
+                prev_long = self._get_ma_value(technical, value_secondary, previous=True)
+                previous_value = (prev_short - prev_long) if prev_short and prev_long else None
                 description = f"MA({int(value)}) {operator} MA({int(value_secondary)})"
             else:
                 return False, ""
 
-        elif indicator == 'bb' and technical:
+        elif indicator == 'bb' and technical and technical.bb_upper is not None:
             current_value = market.price
             if operator == 'touches_upper':
                 return (
@@ -221,6 +281,11 @@ class AlertEngine:
                     f"Giá chạm BB Lower ({technical.bb_lower:,.0f})"
                 )
 
+        elif indicator in ('rsi', 'macd', 'ma', 'bb'):
+            bars = technical.bar_count if technical else 0
+            unit = "phiên" if not technical or technical.timeframe == Timeframe.DAILY else "nến"
+            return None, f"{indicator.upper()}: chưa đủ lịch sử ({bars} {unit})"
+
         else:
             logger.warning(f"Unknown indicator: {indicator}")
             return False, ""
@@ -262,16 +327,15 @@ class AlertEngine:
         else:
             return False
 
-    def _get_ma_value(self, technical: TechnicalIndicators, period: float) -> Optional[float]:
-        """Get MA value by period."""
+    def _get_ma_value(
+        self, technical: TechnicalIndicators, period: float, previous: bool = False
+    ) -> Optional[float]:
+        """Get MA value by period (previous bar's value if `previous`)."""
         period = int(period)
-        if period == 20:
-            return technical.ma_20
-        elif period == 50:
-            return technical.ma_50
-        elif period == 200:
-            return technical.ma_200
-        return None
+        if period not in MA_PERIODS:
+            return None
+        prefix = "previous_ma_" if previous else "ma_"
+        return getattr(technical, f"{prefix}{period}")
 
     def _build_trigger_data(
         self,
@@ -336,9 +400,25 @@ class AlertEngine:
 
     async def _fetch_market_data(self, symbols: List[str]):
         """Fetch real-time market data for symbols."""
-        # In production: fetch from market data provider or database
-        # For demo: generate sample data
+        if self.state_manager:
+            for symbol in symbols:
+                snap = await self.state_manager.get_snapshot(symbol)
+                if not snap:
+                    self._market_data_cache.pop(symbol, None)
+                    continue
+                self._market_data_cache[symbol] = MarketData(
+                    symbol=symbol,
+                    price=snap.last_price,
+                    volume=snap.volume,
+                    change_percent=snap.change_pct,
+                    high=snap.high_price,
+                    low=snap.low_price,
+                    open=snap.open_price,
+                    timestamp=snap.last_updated or datetime.utcnow(),
+                )
+            return
 
+        # No state manager (demo): generate sample prices
         for symbol in symbols:
             self._market_data_cache[symbol] = MarketData(
                 symbol=symbol,
@@ -351,27 +431,52 @@ class AlertEngine:
                 timestamp=datetime.utcnow()
             )
 
-    async def _fetch_technical_indicators(self, symbols: List[str]):
-        """Fetch technical indicators for symbols."""
-        # In production: calculate from historical data or fetch from service
-        # For demo: generate sample data
-
-        for symbol in symbols:
-            price = self._market_data_cache.get(symbol)
-            if price:
-                self._technical_cache[symbol] = TechnicalIndicators(
-                    symbol=symbol,
-                    rsi=self._generate_demo_rsi(),
-                    macd_line=0.5,
-                    macd_signal=0.3,
-                    macd_histogram=0.2,
-                    ma_20=price.price * 0.98,
-                    ma_50=price.price * 0.95,
-                    ma_200=price.price * 0.90,
-                    bb_upper=price.price * 1.05,
-                    bb_middle=price.price,
-                    bb_lower=price.price * 0.95,
-                )
+    async def _fetch_technical_indicators(
+        self, symbols: List[str], timeframe: Timeframe = Timeframe.DAILY
+    ):
+        """
+        Compute indicators for all symbols from their `timeframe` bars in one
+        vectorized pass. Without a state manager there is no history, so
+        technical conditions never match.
+        """
+        self._technical_cache.clear()
+        if not self.state_manager or not symbols:
+            return
+
+        bars = await self.state_manager.get_bar_matrix(symbols, timeframe)
+        # RSI follows the state manager's convention so alerts agree with snapshots
+        mode = getattr(self.state_manager, "indicator_mode", "exact")
+        values = compute_latest(
+            bars["close"], bars["high"], bars["low"], bars["volume"],
+            rsi_method="wilder" if mode == "wilder" else "simple",
+        )
+        closes = bars["close"]
+        counts = (~np.isnan(closes)).sum(axis=1)
+
+        for i, symbol in enumerate(symbols):
+            v = {name: to_optional(arr[i]) for name, arr in values.items()}
+            self._technical_cache[(symbol, timeframe)] = TechnicalIndicators(
+                symbol=symbol,
+                rsi=v["rsi"],
+                macd_line=v["macd_line"],
+                macd_signal=v["macd_signal"],
+                macd_histogram=v["macd_histogram"],
+                ma_20=v["ma20"],
+                ma_50=v["ma50"],
+                ma_200=v["ma200"],
+                bb_upper=v["bb_upper"],
+                bb_middle=v["bb_middle"],
+                bb_lower=v["bb_lower"],
+                previous_rsi=v["prev_rsi"],
+                previous_macd_line=v["prev_macd_line"],
+                previous_macd_signal=v["prev_macd_signal"],
+                previous_price=to_optional(closes[i, -2]) if closes.shape[1] >= 2 else None,
+                previous_ma_20=v["prev_ma20"],
+                previous_ma_50=v["prev_ma50"],
+                previous_ma_200=v["prev_ma200"],
+                bar_count=int(counts[i]),
+                timeframe=timeframe,
+            )
 
     async def _record_trigger(self, alert: Dict, trigger_data: Dict):
         """Record alert trigger in database."""
@@ -413,18 +518,14 @@ class AlertEngine:
         import random
         return random.uniform(-3, 3)
 
-    def _generate_demo_rsi(self) -> float:
-        import random
-        return random.uniform(20, 80)
-
 
 # Singleton instance
 _engine_instance: Optional[AlertEngine] = None
 
 
-def get_alert_engine(supabase_client=None) -> AlertEngine:
+def get_alert_engine(supabase_client=None, state_manager=None) -> AlertEngine:
     """Get or create AlertEngine instance."""
     global _engine_instance
     if _engine_instance is None:
-        _engine_instance = AlertEngine(supabase_client)
+        _engine_instance = AlertEngine(supabase_client, state_manager)
     return _engine_instance
@@ -0,0 +1,251 @@
+"""
+Columnar bar storage for the Market State Manager.
+Fixed-capacity NumPy ring buffers (timestamp, OHLC, volume) with a head index.
+Readers get contiguous array views instead of lists of PriceBar objects.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.models.insight_models import PriceBar, Timeframe
+
+_EPOCH = datetime(1970, 1, 1)
+_ONE_US = timedelta(microseconds=1)
+
+
+def to_epoch_us(ts: datetime) -> int:
+    """Datetime -> int64 microseconds since epoch (naive timestamps are UTC)."""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return (ts - _EPOCH) // _ONE_US
+
+
+def from_epoch_us(value: int) -> datetime:
+    """int64 microseconds since epoch -> naive UTC datetime."""
+    return _EPOCH + timedelta(microseconds=int(value))
+
+
+class BarWrite(str, Enum):
+    """Outcome of writing one bar into state."""
+    APPENDED = "appended"    # newer than anything held
+    REPLACED = "replaced"    # same timestamp as the last bar, OHLCV updated in place
+    INSERTED = "inserted"    # late bar placed in timestamp order
+    UNCHANGED = "unchanged"  # duplicate, or older than the retained window
+
+
+@dataclass(frozen=True)
+class BarColumns:
+    """Read-only column views over a window of bars, oldest first."""
+    timestamp: np.ndarray  # int64, epoch microseconds (UTC)
+    open: np.ndarray       # float64
+    high: np.ndarray       # float64
+    low: np.ndarray        # float64
+    close: np.ndarray      # float64
+    volume: np.ndarray     # int64
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+
+class BarRingBuffer:
+    """
+    Fixed-capacity ring buffer of OHLCV bars stored column-wise.
+
+    Every write lands at slot `head` and its mirror `head + capacity`, so the
+    newest `size` bars always sit contiguously in [head + capacity - size,
+    head + capacity). Reads are therefore zero-copy slices, never concatenations.
+
+    Views returned by `columns()` alias the live buffer: they are valid until
+    the next write. Copy them if they must outlive the caller's lock.
+
+    A set of held timestamps is maintained alongside the arrays and evicted
+    with them, so duplicate checks are O(1).
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.head = 0   # next slot to write, in [0, capacity)
+        self.size = 0
+
+        n = capacity * 2
+        self._ts = np.zeros(n, dtype=np.int64)
+        self._open = np.zeros(n, dtype=np.float64)
+        self._high = np.zeros(n, dtype=np.float64)
+        self._low = np.zeros(n, dtype=np.float64)
+        self._close = np.zeros(n, dtype=np.float64)
+        self._volume = np.zeros(n, dtype=np.int64)
+
+        self._index: Set[int] = set()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, ts: int) -> bool:
+        return ts in self._index
+
+    def _write(self, slot: int, ts: int, o: float, h: float, l: float, c: float, v: int):
+        for i in (slot, slot + self.capacity):
+            self._ts[i] = ts
+            self._open[i] = o
+            self._high[i] = h
+            self._low[i] = l
+            self._close[i] = c
+            self._volume[i] = v
+
+    def append(self, ts: int, o: float, h: float, l: float, c: float, v: int):
+        """Append one bar, evicting the oldest when full."""
+        if self.size == self.capacity:
+            self._index.discard(int(self._ts[self.head]))
+        self._write(self.head, ts, o, h, l, c, v)
+        self._index.add(ts)
+        self.head = (self.head + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def replace_last(self, o: float, h: float, l: float, c: float, v: int):
+        """Overwrite OHLCV of the newest bar (still-forming bar update)."""
+        slot = (self.head - 1) % self.capacity
+        self._write(slot, int(self._ts[slot]), o, h, l, c, v)
+
+    def insert(self, ts: int, o: float, h: float, l: float, c: float, v: int) -> bool:
+        """
+        Place a late bar in timestamp order. O(capacity); the rare path.
+        Returns False if the buffer is full and the bar is older than all held bars.
+        """
+        cols = self.columns()
+        pos = int(np.searchsorted(cols.timestamp, ts))
+        if pos == 0 and self.size == self.capacity:
+            return False
+        rows = [
+            np.insert(arr, pos, val)[-self.capacity:]
+            for arr, val in zip(
+                (cols.timestamp, cols.open, cols.high, cols.low, cols.close, cols.volume),
+                (ts, o, h, l, c, v),
+            )
+        ]
+        self.clear()
+        for row in zip(*(r.tolist() for r in rows)):
+            self.append(*row)
+        return True
+
+    def overwrite(self, ts: int, o: float, h: float, l: float, c: float, v: int) -> bool:
+        """Overwrite OHLCV of a held bar by timestamp. Returns False if not held."""
+        slot = self._slot_of(ts)
+        if slot is None:
+            return False
+        self._write(slot, ts, o, h, l, c, v)
+        return True
+
+    def load(
+        self, ts: np.ndarray, o: np.ndarray, h: np.ndarray,
+        l: np.ndarray, c: np.ndarray, v: np.ndarray,
+    ):
+        """Replace contents with column arrays (oldest first), keeping the newest `capacity`."""
+        n = min(len(ts), self.capacity)
+        cap = self.capacity
+        for dst, src in zip(
+            (self._ts, self._open, self._high, self._low, self._close, self._volume),
+            (ts, o, h, l, c, v),
+        ):
+            src = src[len(src) - n:]
+            dst[:n] = src
+            dst[cap:cap + n] = src
+        self.size = n
+        self.head = n % cap
+        self._index = set(self._ts[:n].tolist())
+
+    def clear(self):
+        self.head = 0
+        self.size = 0
+        self._index.clear()
+
+    # ============================================
+    # Reads
+    # ============================================
+
+    def _window(self, n: Optional[int]) -> slice:
+        count = self.size if n is None else max(0, min(n, self.size))
+        end = self.head + self.capacity
+        return slice(end - count, end)
+
+    @staticmethod
+    def _ro(arr: np.ndarray) -> np.ndarray:
+        view = arr.view()
+        view.flags.writeable = False
+        return view
+
+    def columns(self, n: Optional[int] = None) -> BarColumns:
+        """Views over the most recent n bars (all bars if n is None)."""
+        w = self._window(n)
+        return BarColumns(
+            timestamp=self._ro(self._ts[w]),
+            open=self._ro(self._open[w]),
+            high=self._ro(self._high[w]),
+            low=self._ro(self._low[w]),
+            close=self._ro(self._close[w]),
+            volume=self._ro(self._volume[w]),
+        )
+
+    def closes(self, n: Optional[int] = None) -> np.ndarray:
+        return self._ro(self._close[self._window(n)])
+
+    def last_close(self, offset: int = 1) -> Optional[float]:
+        """Close of the bar `offset` positions from the end (1 = latest)."""
+        if offset < 1 or offset > self.size:
+            return None
+        return float(self._close[self.head + self.capacity - offset])
+
+    def last_timestamp(self) -> Optional[int]:
+        if not self.size:
+            return None
+        return int(self._ts[self.head + self.capacity - 1])
+
+    def last_row(self) -> Optional[Tuple[int, float, float, float, float, int]]:
+        """(timestamp, open, high, low, close, volume) of the newest bar."""
+        if not self.size:
+            return None
+        i = self.head + self.capacity - 1
+        return (
+            int(self._ts[i]), float(self._open[i]), float(self._high[i]),
+            float(self._low[i]), float(self._close[i]), int(self._volume[i]),
+        )
+
+    def row(self, ts: int) -> Optional[Tuple[int, float, float, float, float, int]]:
+        """(timestamp, open, high, low, close, volume) of the bar at `ts`, if held."""
+        slot = self._slot_of(ts)
+        if slot is None:
+            return None
+        return (
+            ts, float(self._open[slot]), float(self._high[slot]),
+            float(self._low[slot]), float(self._close[slot]), int(self._volume[slot]),
+        )
+
+    def _slot_of(self, ts: int) -> Optional[int]:
+        if ts not in self._index:
+            return None
+        pos = int(np.searchsorted(self._ts[self._window(None)], ts))
+        return (self.head - self.size + pos) % self.capacity
+
+    def to_bars(
+        self, symbol: str, timeframe: Timeframe, n: Optional[int] = None
+    ) -> List[PriceBar]:
+        """Materialize the most recent n bars as PriceBar objects (compat path)."""
+        cols = self.columns(n)
+        return [
+            PriceBar(
+                symbol=symbol,
+                timeframe=timeframe,
+                timestamp=from_epoch_us(ts),
+                open=o, high=h, low=l, close=c, volume=v,
+            )
+            for ts, o, h, l, c, v in zip(
+                cols.timestamp.tolist(), cols.open.tolist(), cols.high.tolist(),
+                cols.low.tolist(), cols.close.tolist(), cols.volume.tolist(),
+            )
+        ]
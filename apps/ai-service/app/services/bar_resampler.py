@@ -0,0 +1,146 @@
+"""
+Incremental 1m -> 5m/15m/30m/1h resampling for the Market State Manager.
+
+Buckets are anchored to HOSE/HNX session opens (09:00 and 13:00 ICT), so a
+bucket never spans the 11:30-13:00 lunch break or a day boundary: the 1h
+frame yields 09:00, 10:00, 11:00 (30 min) and 13:00, 14:00 (45 min) bars.
+
+Bar timestamps are naive UTC (as everywhere in the pipeline) and mark the
+start of the bar. Each new minute updates every frame in O(1).
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+from app.models.insight_models import Timeframe
+from app.services.bar_buffer import BarColumns, BarRingBuffer
+
+RESAMPLE_MINUTES: Dict[Timeframe, int] = {
+    Timeframe.INTRADAY_5M: 5,
+    Timeframe.INTRADAY_15M: 15,
+    Timeframe.INTRADAY_30M: 30,
+    Timeframe.INTRADAY_1H: 60,
+}
+
+# Alert CheckInterval value -> timeframe the condition should be evaluated on
+TIMEFRAME_BY_INTERVAL: Dict[str, Timeframe] = {
+    "1m": Timeframe.INTRADAY_1M,
+    "5m": Timeframe.INTRADAY_5M,
+    "15m": Timeframe.INTRADAY_15M,
+    "30m": Timeframe.INTRADAY_30M,
+    "1h": Timeframe.INTRADAY_1H,
+}
+
+_MINUTE_US = 60 * 1_000_000
+_DAY_US = 24 * 60 * _MINUTE_US
+_ICT_OFFSET_US = 7 * 60 * _MINUTE_US  # Asia/Ho_Chi_Minh, no DST
+
+MORNING_OPEN_MIN = 9 * 60      # 09:00 ICT
+AFTERNOON_OPEN_MIN = 13 * 60   # 13:00 ICT
+
+Row = Tuple[int, float, float, float, float, int]
+
+
+def bucket_start_us(ts: int, minutes: int) -> int:
+    """Start (epoch us, UTC) of the session-anchored bucket containing `ts`."""
+    local = ts + _ICT_OFFSET_US
+    day = local - local % _DAY_US
+    minute_of_day = (local - day) // _MINUTE_US
+    anchor = AFTERNOON_OPEN_MIN if minute_of_day >= AFTERNOON_OPEN_MIN else MORNING_OPEN_MIN
+    offset = (minute_of_day - anchor) // minutes * minutes
+    return day + (anchor + offset) * _MINUTE_US - _ICT_OFFSET_US
+
+
+def bucket_starts_us(ts: np.ndarray, minutes: int) -> np.ndarray:
+    """Vectorized bucket_start_us over an int64 array."""
+    local = ts + _ICT_OFFSET_US
+    day = local - local % _DAY_US
+    minute_of_day = (local - day) // _MINUTE_US
+    anchor = np.where(minute_of_day >= AFTERNOON_OPEN_MIN, AFTERNOON_OPEN_MIN, MORNING_OPEN_MIN)
+    offset = (minute_of_day - anchor) // minutes * minutes
+    return day + (anchor + offset) * _MINUTE_US - _ICT_OFFSET_US
+
+
+class BarResampler:
+    """Per-symbol coarser frames, fed by the symbol's 1m writes."""
+
+    def __init__(self, capacity: int, timeframes: Tuple[Timeframe, ...] = tuple(RESAMPLE_MINUTES)):
+        self.buffers: Dict[Timeframe, BarRingBuffer] = {
+            tf: BarRingBuffer(capacity) for tf in timeframes
+        }
+
+    def on_append(self, ts: int, o: float, h: float, l: float, c: float, v: int):
+        """A new latest minute: extend the open bucket or start a new one."""
+        for tf, buf in self.buffers.items():
+            bucket = bucket_start_us(ts, RESAMPLE_MINUTES[tf])
+            last = buf.last_row()
+            if last is not None and last[0] == bucket:
+                buf.replace_last(last[1], max(last[2], h), min(last[3], l), c, last[5] + v)
+            else:
+                buf.append(bucket, o, h, l, c, v)
+
+    def load(self, cols: BarColumns):
+        """Rebuild every frame from a 1m window in one vectorized group-by pass."""
+        n = len(cols)
+        for tf, buf in self.buffers.items():
+            if not n:
+                buf.clear()
+                continue
+            buckets = bucket_starts_us(cols.timestamp, RESAMPLE_MINUTES[tf])
+            starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+            ends = np.r_[starts[1:], n] - 1
+            buf.load(
+                buckets[starts],
+                cols.open[starts],
+                np.maximum.reduceat(cols.high, starts),
+                np.minimum.reduceat(cols.low, starts),
+                cols.close[ends],
+                np.add.reduceat(cols.volume, starts),
+            )
+
+    def on_replace(self, ts: int, prev: Row, row: Row):
+        """The forming minute was revised: swap its volume, widen high/low, move close."""
+        _, _, h, l, c, v = row
+        for tf, buf in self.buffers.items():
+            last = buf.last_row()
+            if last is None or last[0] != bucket_start_us(ts, RESAMPLE_MINUTES[tf]):
+                continue
+            buf.replace_last(last[1], max(last[2], h), min(last[3], l), c, last[5] + v - prev[5])
+
+    def on_insert(self, row: Row, bars_1m: BarRingBuffer):
+        """
+        A late minute landed inside the 1m window. Its bucket is rebuilt from
+        the 1m bars when all of the bucket's minutes are still retained,
+        otherwise the minute is merged into the existing aggregate.
+        """
+        ts, o, h, l, c, v = row
+        cols = bars_1m.columns()
+        for tf, buf in self.buffers.items():
+            minutes = RESAMPLE_MINUTES[tf]
+            bucket = bucket_start_us(ts, minutes)
+            existing = buf.row(bucket)
+
+            if int(cols.timestamp[0]) <= bucket or existing is None:
+                mask = bucket_starts_us(cols.timestamp, minutes) == bucket
+                idx = np.flatnonzero(mask)
+                agg = (
+                    bucket,
+                    float(cols.open[idx[0]]),
+                    float(cols.high[idx].max()),
+                    float(cols.low[idx].min()),
+                    float(cols.close[idx[-1]]),
+                    int(cols.volume[idx].sum()),
+                )
+            else:
+                agg = (
+                    bucket, existing[1], max(existing[2], h), min(existing[3], l),
+                    existing[4], existing[5] + v,
+                )
+
+            if existing is not None:
+                buf.overwrite(*agg)
+            elif buf.last_row() is None or bucket > buf.last_row()[0]:
+                buf.append(*agg)
+            else:
+                buf.insert(*agg)
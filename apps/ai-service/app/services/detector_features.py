@@ -0,0 +1,192 @@
+"""
+Shared detector features.
+
+Everything the insight detectors look at is computed once per analysis into a
+FeatureFrame: one row per symbol, so the same frame serves a single symbol
+(`features_from_bars`) and the whole universe (`compute_features` over the
+(symbols, bars) matrices of MarketStateManager.get_bar_matrix). Detectors are
+predicates over these arrays; a new detector reading existing features adds
+no bar walking.
+
+Values follow the v1 detector arithmetic exactly (same operations in float64,
+and sums added left to right like Python's sum(), not NumPy's pairwise
+reduction), so events built from features match the original per-bar code
+even where MA20 and MA50 tie. Features a
+symbol lacks the history for are NaN; comparisons against NaN are False.
+"""
+
+from dataclasses import dataclass, fields
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.models.insight_models import MarketSnapshot, PriceBar
+from app.services.indicators import latest
+
+CANDLES_1M = 5        # recent 1m bars the price-action detectors inspect
+VOLUME_LOOKBACK = 20  # daily bars for average volume / percentile / 20-day high
+MA_CROSS_BARS = 51    # MA50 of the previous bar needs 51 closes
+
+_OHLCV = ("open", "high", "low", "close", "volume")
+
+
+@dataclass
+class FeatureFrame:
+    """Detector features for a batch of symbols; arrays are (symbols,) unless noted."""
+    symbols: List[str]
+    n_1m: np.ndarray              # real 1m bars available
+    n_daily: np.ndarray           # real daily bars available
+
+    # Last CANDLES_1M 1m bars, (symbols, 5), oldest first
+    candle_high: np.ndarray
+    candle_close: np.ndarray
+    candle_range: np.ndarray      # high - low
+    body_ratio: np.ndarray        # |close - open| / range
+    upper_wick_ratio: np.ndarray  # (high - max(open, close)) / range
+    candle_change_pct: np.ndarray  # (close - open) / open * 100, 0 if open is 0
+    bullish: np.ndarray           # close > open
+
+    # Today's daily bar (the newest) and its context
+    today_open: np.ndarray
+    today_high: np.ndarray
+    today_close: np.ndarray
+    today_volume: np.ndarray
+    prev_close: np.ndarray
+    gap_pct: np.ndarray           # today open vs previous close
+    price_change_pct: np.ndarray  # today close vs today open
+    avg_volume: np.ndarray        # mean volume of the 19 days before today
+    volume_ratio: np.ndarray      # today / avg_volume, NaN if avg_volume is 0
+    volume_p95: np.ndarray        # 95th-percentile slot of the last 20 volumes (their max)
+    high_20d: np.ndarray          # highest high of the 19 days before today
+
+    # Moving averages / RSI: current from the snapshot, previous from closes
+    ma20: np.ndarray              # NaN when the snapshot has none
+    ma50: np.ndarray
+    prev_ma20: np.ndarray
+    prev_ma50: np.ndarray
+    rsi14: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def row(self, i: int) -> Dict:
+        """One symbol's features as Python scalars (candle features as lists)."""
+        return {
+            f.name: getattr(self, f.name)[i].tolist()
+            for f in fields(self) if f.name != "symbols"
+        }
+
+
+def _real_bars(matrix: np.ndarray) -> np.ndarray:
+    return (~np.isnan(matrix)).sum(axis=1)
+
+
+def _sum_in_order(matrix: np.ndarray) -> np.ndarray:
+    """Row sums added column by column, in v1's order (sum(values) in Python)."""
+    total = np.zeros(matrix.shape[0])
+    for j in range(matrix.shape[1]):
+        total = total + matrix[:, j]
+    return total
+
+
+def _snapshot_values(snapshots: Sequence[MarketSnapshot], attr: str, falsy_missing: bool) -> np.ndarray:
+    values = [getattr(s, attr) for s in snapshots]
+    missing = (lambda v: not v) if falsy_missing else (lambda v: v is None)
+    return np.array([np.nan if missing(v) else v for v in values], dtype=np.float64)
+
+
+def compute_features(
+    symbols: Sequence[str],
+    snapshots: Sequence[MarketSnapshot],
+    bars_1m: Dict[str, np.ndarray],
+    bars_daily: Dict[str, np.ndarray],
+) -> FeatureFrame:
+    """
+    Features from (symbols, bars) matrices, newest bar last, left-padded with
+    NaN (get_bar_matrix / stack_columns layout). Row i is symbols[i].
+    """
+    n_symbols = len(symbols)
+    nan = np.full(n_symbols, np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        o, h, l, c = (bars_1m[f][:, -CANDLES_1M:] for f in ("open", "high", "low", "close"))
+        candle_range = h - l
+        body_ratio = np.abs(c - o) / candle_range
+        upper_wick_ratio = (h - np.maximum(o, c)) / candle_range
+        candle_change_pct = np.where(o != 0, (c - o) / o * 100, 0.0)
+
+        d_open, d_high, d_close, d_vol = (bars_daily[f] for f in ("open", "high", "close", "volume"))
+        n_daily = _real_bars(d_close)
+        today_open, today_high, today_close, today_volume = (
+            latest(d_open), latest(d_high), latest(d_close), latest(d_vol)
+        )
+        prev_close = latest(d_close, 2)
+        gap_pct = np.where(prev_close != 0, (today_open - prev_close) / prev_close * 100, 0.0)
+        price_change_pct = np.where(today_open != 0, (today_close - today_open) / today_open * 100, 0.0)
+
+        if d_vol.shape[1] >= VOLUME_LOOKBACK:
+            vols = d_vol[:, -VOLUME_LOOKBACK:]
+            avg_volume = _sum_in_order(vols[:, :-1]) / (VOLUME_LOOKBACK - 1)
+            volume_p95 = vols.max(axis=1)
+            high_20d = d_high[:, -VOLUME_LOOKBACK:-1].max(axis=1)
+        else:
+            avg_volume = volume_p95 = high_20d = nan
+        volume_ratio = np.where(avg_volume > 0, today_volume / avg_volume, np.nan)
+
+        if (n_daily >= MA_CROSS_BARS).any():
+            prev_ma20 = _sum_in_order(d_close[:, -21:-1]) / 20
+            prev_ma50 = _sum_in_order(d_close[:, -51:-1]) / 50
+        else:
+            prev_ma20 = prev_ma50 = nan
+
+    return FeatureFrame(
+        symbols=list(symbols),
+        n_1m=_real_bars(bars_1m["close"]),
+        n_daily=n_daily,
+        candle_high=h,
+        candle_close=c,
+        candle_range=candle_range,
+        body_ratio=body_ratio,
+        upper_wick_ratio=upper_wick_ratio,
+        candle_change_pct=candle_change_pct,
+        bullish=c > o,
+        today_open=today_open,
+        today_high=today_high,
+        today_close=today_close,
+        today_volume=today_volume,
+        prev_close=prev_close,
+        gap_pct=gap_pct,
+        price_change_pct=price_change_pct,
+        avg_volume=avg_volume,
+        volume_ratio=volume_ratio,
+        volume_p95=volume_p95,
+        high_20d=high_20d,
+        ma20=_snapshot_values(snapshots, "ma20", falsy_missing=True),
+        ma50=_snapshot_values(snapshots, "ma50", falsy_missing=True),
+        prev_ma20=prev_ma20,
+        prev_ma50=prev_ma50,
+        rsi14=_snapshot_values(snapshots, "rsi14", falsy_missing=False),
+    )
+
+
+def _bar_matrix(bars: List[PriceBar], n: Optional[int] = None) -> Dict[str, np.ndarray]:
+    window = bars if n is None else bars[-n:]
+    if not window:
+        return {f: np.full((1, 1), np.nan) for f in _OHLCV}
+    rows = np.array([(b.open, b.high, b.low, b.close, b.volume) for b in window], dtype=np.float64)
+    return {f: rows[None, :, k] for k, f in enumerate(_OHLCV)}
+
+
+def features_from_bars(
+    symbol: str,
+    snapshot: MarketSnapshot,
+    bars_1m: List[PriceBar],
+    bars_daily: List[PriceBar],
+) -> FeatureFrame:
+    """Single-symbol frame from PriceBar lists (oldest first)."""
+    frame = compute_features(
+        [symbol], [snapshot], _bar_matrix(bars_1m, CANDLES_1M), _bar_matrix(bars_daily)
+    )
+    # Only the last candles are materialized; guards look at the full history
+    frame.n_1m = np.array([len(bars_1m)])
+    return frame
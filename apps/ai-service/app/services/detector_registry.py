@@ -0,0 +1,186 @@
+"""
+Insight detector registry.
+
+Detectors are registered with metadata instead of being hard-coded in the
+engine:
+  - code / timeframe / description
+  - min_bars_1m, min_bars_daily: history a symbol needs; symbols short of it
+    are masked out, and a detector with no eligible symbol is not invoked
+  - features: FeatureFrame fields it reads (checked at registration)
+  - sync or async: plain functions are called directly in the scan loop,
+    coroutine functions (detectors that need I/O) are awaited
+
+A detector is `detect(frame) -> (symbols,) bool mask` plus
+`build(symbol, features_row) -> InsightEvent` for each hit. The registry also
+owns per-detector enable/disable and cost accounting (calls, symbols
+evaluated, hits, time spent, skips, errors).
+"""
+
+import inspect
+import logging
+import time
+from dataclasses import dataclass, field, fields
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from app.models.insight_models import InsightEvent, Timeframe
+from app.services.detector_features import FeatureFrame
+
+logger = logging.getLogger(__name__)
+
+FEATURE_NAMES = frozenset(f.name for f in fields(FeatureFrame)) - {"symbols"}
+
+
+@dataclass
+class DetectorSpec:
+    """A detector and what it needs to run."""
+    code: str
+    detect: Callable  # (FeatureFrame) -> bool mask, sync or async
+    build: Callable[[str, Dict], InsightEvent]
+    timeframe: Timeframe
+    min_bars_1m: int = 0
+    min_bars_daily: int = 0
+    features: Tuple[str, ...] = ()
+    description: str = ""
+    enabled: bool = True
+    is_async: bool = field(init=False)
+
+    def __post_init__(self):
+        self.is_async = inspect.iscoroutinefunction(self.detect)
+        unknown = set(self.features) - FEATURE_NAMES
+        if unknown:
+            raise ValueError(f"Detector {self.code} requires unknown features: {sorted(unknown)}")
+
+
+@dataclass
+class UniverseScan:
+    """Hit mask (symbols, detectors) plus the features events are built from."""
+    hits: np.ndarray  # bool, one column per registered detector, registry order
+    features: FeatureFrame
+    specs: List[DetectorSpec]
+
+    @property
+    def symbols(self) -> List[str]:
+        return self.features.symbols
+
+    def hit_count(self) -> int:
+        return int(self.hits.sum())
+
+
+class DetectorRegistry:
+    """Ordered detector set with enable/disable and per-detector cost stats."""
+
+    def __init__(self, specs: Iterable[DetectorSpec] = ()):
+        self._specs: Dict[str, DetectorSpec] = {}
+        self._cost: Dict[str, Dict] = {}
+        for spec in specs:
+            self.register(spec)
+
+    # ============================================
+    # Registration
+    # ============================================
+
+    def register(self, spec: DetectorSpec) -> DetectorSpec:
+        if spec.code in self._specs:
+            raise ValueError(f"Detector {spec.code} already registered")
+        self._specs[spec.code] = spec
+        self._cost[spec.code] = {
+            "calls": 0,
+            "skipped": 0,
+            "symbols_evaluated": 0,
+            "hits": 0,
+            "errors": 0,
+            "time_ms": 0.0,
+        }
+        return spec
+
+    def detector(self, code: str, timeframe: Timeframe, **meta) -> Callable:
+        """Decorator form of register(): the decorated function is `detect`; pass `build=`."""
+        def wrap(detect: Callable) -> Callable:
+            self.register(DetectorSpec(code=code, detect=detect, timeframe=timeframe, **meta))
+            return detect
+        return wrap
+
+    def set_enabled(self, code: str, enabled: bool):
+        if code not in self._specs:
+            raise KeyError(f"Unknown detector: {code}")
+        self._specs[code].enabled = enabled
+
+    def enable(self, code: str):
+        self.set_enabled(code, True)
+
+    def disable(self, code: str):
+        self.set_enabled(code, False)
+
+    @property
+    def codes(self) -> Tuple[str, ...]:
+        return tuple(self._specs)
+
+    def specs(self) -> List[DetectorSpec]:
+        return list(self._specs.values())
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._specs
+
+    # ============================================
+    # Scan
+    # ============================================
+
+    async def scan(self, features: FeatureFrame) -> UniverseScan:
+        """Run every enabled detector over the frame, skipping ineligible symbols."""
+        specs = self.specs()
+        hits = np.zeros((len(features), len(specs)), dtype=bool)
+        for col, spec in enumerate(specs):
+            if not spec.enabled:
+                continue
+            cost = self._cost[spec.code]
+            eligible = (features.n_1m >= spec.min_bars_1m) & (features.n_daily >= spec.min_bars_daily)
+            evaluated = int(eligible.sum())
+            if not evaluated:
+                cost["skipped"] += 1
+                continue
+            start = time.perf_counter()
+            try:
+                with np.errstate(invalid="ignore"):
+                    mask = await spec.detect(features) if spec.is_async else spec.detect(features)
+                hits[:, col] = eligible & mask
+            except Exception as e:
+                cost["errors"] += 1
+                logger.error("Detector %s failed: %s", spec.code, e)
+            cost["time_ms"] += (time.perf_counter() - start) * 1000
+            cost["calls"] += 1
+            cost["symbols_evaluated"] += evaluated
+            cost["hits"] += int(hits[:, col].sum())
+        return UniverseScan(hits=hits, features=features, specs=specs)
+
+    def events(self, scan: UniverseScan) -> List[InsightEvent]:
+        """InsightEvents for every hit, symbol by symbol in registry order."""
+        events: List[InsightEvent] = []
+        for row in np.flatnonzero(scan.hits.any(axis=1)):
+            symbol = scan.symbols[row]
+            row_features = scan.features.row(row)
+            for col in np.flatnonzero(scan.hits[row]):
+                spec = scan.specs[col]
+                start = time.perf_counter()
+                try:
+                    events.append(spec.build(symbol, row_features))
+                except Exception as e:
+                    self._cost[spec.code]["errors"] += 1
+                    logger.error("Detector %s error for %s: %s", spec.code, symbol, e)
+                self._cost[spec.code]["time_ms"] += (time.perf_counter() - start) * 1000
+        return events
+
+    def get_stats(self) -> Dict:
+        return {
+            code: {
+                **self._cost[code],
+                "time_ms": round(self._cost[code]["time_ms"], 2),
+                "enabled": spec.enabled,
+                "async": spec.is_async,
+                "timeframe": spec.timeframe.value,
+                "min_bars_1m": spec.min_bars_1m,
+                "min_bars_daily": spec.min_bars_daily,
+            }
+            for code, spec in self._specs.items()
+        }
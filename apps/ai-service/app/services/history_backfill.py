@@ -0,0 +1,240 @@
+"""
+Historical daily backfill for the Market State Manager.
+Loads the daily window for the whole universe before polling starts, either
+from Supabase `stock_history` or from a local Parquet/CSV/NPZ export with
+columns symbol, date, open, high, low, close, volume.
+
+Supabase pages are keyset pages over the (symbol, date) index: each query
+resumes after the last (symbol, date) it received, so every page is one index
+seek instead of re-scanning the offset. PostgREST caps a page at ~1000 rows,
+so a full universe (~1,600 symbols x ~70 trading days) is ~110 queries; a
+local export is the fast path for cold starts.
+
+Backfilled bars are merged with what state already holds (e.g. a warm-restart
+snapshot): bars already in state win on the same date. Daily bars are stamped
+at 00:00 of the trading date, like polled daily bars.
+"""
+
+import asyncio
+import csv
+import logging
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.services.bar_buffer import BarColumns
+from app.services.supabase_client import Client, service_client
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+HISTORY_COLUMNS = ("symbol", "date", "open", "high", "low", "close", "volume")
+
+
+def _dates_to_us(dates) -> np.ndarray:
+    """'YYYY-MM-DD' strings / dates / datetime64 -> int64 epoch us at 00:00."""
+    return np.asarray(dates).astype("datetime64[D]").astype("datetime64[us]").astype(np.int64)
+
+
+class HistoryBackfill:
+    """Bulk daily-history loader: one pass over the source, one load per symbol."""
+
+    def __init__(
+        self,
+        state_manager,
+        window: int = 50,
+        page_size: int = 1000,
+        lookback_days: int = 100,
+        supabase_client: Optional["Client"] = None,
+    ):
+        self.state_manager = state_manager
+        self.window = window
+        self.page_size = page_size
+        self.lookback_days = lookback_days
+        self._supabase = supabase_client
+        self._stats = {
+            "source": None,
+            "rows_read": 0,
+            "queries": 0,
+            "symbols_loaded": 0,
+            "duration_ms": None,
+        }
+
+    # ============================================
+    # Entry point
+    # ============================================
+
+    async def run(self, source: str, symbols: Optional[Iterable[str]] = None) -> int:
+        """
+        Backfill from `source`: "supabase" or a path to a .parquet/.csv/.npz file.
+        `symbols=None` loads every symbol the source has. Returns symbols loaded.
+        """
+        start = time.perf_counter()
+        wanted = {s.upper() for s in symbols} if symbols is not None else None
+        self._stats["source"] = source
+        try:
+            if source == "supabase":
+                columns = await asyncio.to_thread(self.fetch_supabase, wanted)
+            else:
+                columns = await asyncio.to_thread(self.read_file, source)
+        except Exception as e:
+            logger.error("History backfill from %s failed: %s", source, e)
+            return 0
+        if columns is None:
+            return 0
+
+        loaded = self.apply(columns, wanted)
+        self._stats["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        logger.info("History backfill: %d symbols from %s (%d rows, %d queries) in %.0fms",
+                    loaded, source, self._stats["rows_read"], self._stats["queries"],
+                    self._stats["duration_ms"])
+        return loaded
+
+    # ============================================
+    # Sources
+    # ============================================
+
+    def _client(self) -> Optional["Client"]:
+        if self._supabase is None:
+            self._supabase = service_client()
+        return self._supabase
+
+    def fetch_supabase(self, symbols: Optional[set] = None) -> Optional[Dict[str, list]]:
+        """
+        Page through stock_history for the last `lookback_days` calendar days,
+        ordered by (symbol, date), resuming each page after the previous one's
+        last key.
+        """
+        client = self._client()
+        if client is None:
+            logger.warning("History backfill: Supabase not configured, skipping")
+            return None
+
+        since = (date.today() - timedelta(days=self.lookback_days)).isoformat()
+        columns: Dict[str, list] = {c: [] for c in HISTORY_COLUMNS}
+        last = None  # (symbol, date) of the last row received
+        while True:
+            query = (
+                client.table("stock_history")
+                .select(",".join(HISTORY_COLUMNS))
+                .gte("date", since)
+            )
+            if symbols is not None:
+                query = query.in_("symbol", sorted(symbols))
+            if last is not None:
+                query = query.or_(f"symbol.gt.{last[0]},and(symbol.eq.{last[0]},date.gt.{last[1]})")
+            rows = (
+                query.order("symbol").order("date")
+                .limit(self.page_size)
+                .execute()
+                .data
+            ) or []
+            self._stats["queries"] += 1
+            for row in rows:
+                for c in HISTORY_COLUMNS:
+                    columns[c].append(row.get(c))
+            if len(rows) < self.page_size:
+                break
+            last = (rows[-1]["symbol"], rows[-1]["date"])
+        return columns
+
+    def read_file(self, path: str) -> Dict[str, list]:
+        """Read a Parquet/CSV/NPZ export into columns."""
+        p = Path(path)
+        suffix = p.suffix.lower()
+        if suffix == ".npz":
+            with np.load(p, allow_pickle=False) as data:
+                return {c: data[c] for c in HISTORY_COLUMNS}
+        if suffix == ".parquet":
+            if not PARQUET_AVAILABLE:
+                raise RuntimeError("pyarrow is required to read Parquet history files")
+            table = pq.read_table(p, columns=list(HISTORY_COLUMNS))
+            return {c: table.column(c).to_numpy(zero_copy_only=False) for c in HISTORY_COLUMNS}
+        if suffix == ".csv":
+            columns: Dict[str, list] = {c: [] for c in HISTORY_COLUMNS}
+            with open(p, newline="") as f:
+                for row in csv.DictReader(f):
+                    for c in HISTORY_COLUMNS:
+                        columns[c].append(row[c] or None)
+            return columns
+        raise ValueError(f"Unsupported history file type: {suffix}")
+
+    # ============================================
+    # Load into state
+    # ============================================
+
+    def apply(self, columns: Dict[str, list], symbols: Optional[set] = None) -> int:
+        """Group rows by symbol and load the newest `window` bars of each. Returns symbols loaded."""
+        sym = np.char.upper(np.asarray(columns["symbol"]).astype(str))
+        n = len(sym)
+        self._stats["rows_read"] += n
+        if not n:
+            return 0
+
+        ts = _dates_to_us(columns["date"])
+        o = np.asarray(columns["open"], dtype=np.float64)
+        h = np.asarray(columns["high"], dtype=np.float64)
+        l = np.asarray(columns["low"], dtype=np.float64)
+        c = np.asarray(columns["close"], dtype=np.float64)
+        v = np.nan_to_num(np.asarray(columns["volume"], dtype=np.float64)).astype(np.int64)
+
+        # Rows without a close are unusable; a missing open/high/low falls back to it
+        keep = ~np.isnan(c)
+        o, h, l = (np.where(np.isnan(a), c, a) for a in (o, h, l))
+        if symbols is not None:
+            keep &= np.isin(sym, list(symbols))
+
+        # Sort by (symbol, date); for duplicate dates keep the last row read
+        order = np.flatnonzero(keep)
+        order = order[np.lexsort((ts[order], sym[order]))]
+        sym, ts, o, h, l, c, v = (a[order] for a in (sym, ts, o, h, l, c, v))
+        last_of_run = np.r_[(sym[1:] != sym[:-1]) | (ts[1:] != ts[:-1]), True]
+        sym, ts, o, h, l, c, v = (a[last_of_run] for a in (sym, ts, o, h, l, c, v))
+
+        if not len(sym):
+            return 0
+
+        starts = np.flatnonzero(np.r_[True, sym[1:] != sym[:-1]])
+        ends = np.r_[starts[1:], len(sym)]
+        loaded = 0
+        for s, e in zip(starts.tolist(), ends.tolist()):
+            s = max(s, e - self.window)
+            hist = BarColumns(ts[s:e], o[s:e], h[s:e], l[s:e], c[s:e], v[s:e])
+            self._load(str(sym[s]), hist)
+            loaded += 1
+
+        self._stats["symbols_loaded"] += loaded
+        return loaded
+
+    def _load(self, symbol: str, hist: BarColumns):
+        state = self.state_manager.get_symbol_state(symbol)
+        if state is not None and len(state.bars_daily):
+            hist = self._merge(hist, state.bars_daily.columns())
+        self.state_manager.load_symbol(symbol, daily=hist)
+
+    def _merge(self, hist: BarColumns, held: BarColumns) -> BarColumns:
+        """Union by date, bars already held winning over history; newest `window` kept."""
+        fields = ("timestamp", "open", "high", "low", "close", "volume")
+        both = [np.concatenate((getattr(hist, f), getattr(held, f))) for f in fields]
+        order = np.argsort(both[0], kind="stable")  # held rows sort after history rows
+        both = [a[order] for a in both]
+        last_of_run = np.r_[both[0][1:] != both[0][:-1], True]
+        return BarColumns(*(a[last_of_run][-self.window:] for a in both))
+
+    def loaded_symbols(self) -> List[str]:
+        """Symbols holding a full daily window (no SSI daily history needed)."""
+        return [
+            s for s in self.state_manager.get_tracked_symbols()
+            if self.state_manager.get_symbol_info(s)["bars_daily"] >= self.window
+        ]
+
+    def get_stats(self) -> Dict:
+        return dict(self._stats)
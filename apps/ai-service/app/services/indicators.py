@@ -0,0 +1,295 @@
+"""
+Technical indicator library: SMA/EMA/RSI/MACD/Bollinger/ATR/VWAP.
+
+Full-series functions take 2-D float arrays shaped (symbols, time), oldest bar
+first, and return arrays of the same shape. 1-D input is treated as a single
+symbol and returned 1-D. Symbols with shorter history are left-padded with NaN
+(see `stack_columns`); outputs are NaN until a symbol has enough bars, so one
+call covers the whole universe.
+
+`compute_latest` returns the newest (and previous) value of every indicator
+per symbol, which is what detectors and alert conditions consume.
+
+The scalar helpers at the bottom are the short-window fast path used by the
+state manager's per-append updates; they define the v1 rounding conventions.
+"""
+
+import math
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.services.bar_buffer import BarColumns
+
+RSI_METHODS = ("wilder", "simple")
+
+
+def _as_2d(x) -> Tuple[np.ndarray, bool]:
+    arr = np.asarray(x, dtype=np.float64)
+    if arr.ndim == 1:
+        return arr[None, :], True
+    if arr.ndim != 2:
+        raise ValueError("expected a (symbols, time) array")
+    return arr, False
+
+
+def _out(arr: np.ndarray, squeeze: bool) -> np.ndarray:
+    return arr[0] if squeeze else arr
+
+
+def _pad_front(values: np.ndarray, length: int) -> np.ndarray:
+    """Left-pad a (symbols, k) window result with NaN back to (symbols, length)."""
+    out = np.full((values.shape[0], length), np.nan)
+    if values.shape[1]:
+        out[:, length - values.shape[1]:] = values
+    return out
+
+
+def stack_columns(
+    columns: Sequence[Optional[BarColumns]], n: Optional[int] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Stack per-symbol bar columns into (symbols, n) float arrays, newest bar in
+    the last column, shorter (or missing) histories left-padded with NaN.
+    """
+    if n is None:
+        n = max((len(c) for c in columns if c is not None), default=0)
+    out = {f: np.full((len(columns), n), np.nan) for f in ("open", "high", "low", "close", "volume")}
+    for i, cols in enumerate(columns):
+        if cols is None or not len(cols) or not n:
+            continue
+        k = min(len(cols), n)
+        for f in out:
+            out[f][i, n - k:] = getattr(cols, f)[-k:]
+    return out
+
+
+# ============================================
+# Full-series indicators
+# ============================================
+
+def sma(x, period: int) -> np.ndarray:
+    """Simple moving average over the last `period` bars."""
+    arr, squeeze = _as_2d(x)
+    if arr.shape[1] < period:
+        return _out(np.full(arr.shape, np.nan), squeeze)
+    windows = sliding_window_view(arr, period, axis=1)
+    return _out(_pad_front(windows.sum(axis=2) / period, arr.shape[1]), squeeze)
+
+
+def rolling_std(x, period: int) -> np.ndarray:
+    """Population standard deviation over the last `period` bars."""
+    arr, squeeze = _as_2d(x)
+    if arr.shape[1] < period:
+        return _out(np.full(arr.shape, np.nan), squeeze)
+    windows = sliding_window_view(arr, period, axis=1)
+    return _out(_pad_front(windows.std(axis=2), arr.shape[1]), squeeze)
+
+
+def _smooth(arr: np.ndarray, period: int, alpha: float) -> np.ndarray:
+    """
+    Recursive smoothing seeded with the SMA of each symbol's first `period`
+    values: out[t] = alpha * x[t] + (1 - alpha) * out[t-1]. Loops over time,
+    vectorized over symbols.
+    """
+    seed = sma(arr, period)
+    out = np.full(arr.shape, np.nan)
+    prev = np.full(arr.shape[0], np.nan)
+    for t in range(arr.shape[1]):
+        x = arr[:, t]
+        step = alpha * x + (1 - alpha) * prev
+        prev = np.where(np.isnan(prev), seed[:, t], np.where(np.isnan(x), prev, step))
+        out[:, t] = prev
+    return out
+
+
+def ema(x, period: int) -> np.ndarray:
+    """Exponential moving average (alpha = 2 / (period + 1)), seeded with the SMA."""
+    arr, squeeze = _as_2d(x)
+    return _out(_smooth(arr, period, 2.0 / (period + 1)), squeeze)
+
+
+def rsi(x, period: int = 14, method: str = "wilder") -> np.ndarray:
+    """
+    RSI of closes.
+      - "wilder": Wilder-smoothed average gain/loss (TradingView convention)
+      - "simple": plain average over the last `period` deltas (v1 convention)
+    A window without losses reads 100.
+    """
+    if method not in RSI_METHODS:
+        raise ValueError(f"Unknown RSI method: {method}")
+    arr, squeeze = _as_2d(x)
+    delta = np.diff(arr, axis=1)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    gain[np.isnan(delta)] = np.nan
+    loss[np.isnan(delta)] = np.nan
+
+    if method == "wilder":
+        avg_gain = _smooth(gain, period, 1.0 / period)
+        avg_loss = _smooth(loss, period, 1.0 / period)
+    else:
+        avg_gain = sma(gain, period)
+        avg_loss = sma(loss, period)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+    values[np.isnan(avg_gain) | np.isnan(avg_loss)] = np.nan
+    return _out(_pad_front(values, arr.shape[1]), squeeze)
+
+
+def macd(
+    x, fast: int = 12, slow: int = 26, signal: int = 9
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(MACD line, signal line, histogram)."""
+    arr, squeeze = _as_2d(x)
+    line = _smooth(arr, fast, 2.0 / (fast + 1)) - _smooth(arr, slow, 2.0 / (slow + 1))
+    sig = _smooth(line, signal, 2.0 / (signal + 1))
+    return _out(line, squeeze), _out(sig, squeeze), _out(line - sig, squeeze)
+
+
+def bollinger(
+    x, period: int = 20, k: float = 2.0
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(upper, middle, lower) bands: SMA +/- k population standard deviations."""
+    mid = sma(x, period)
+    width = k * rolling_std(x, period)
+    return mid + width, mid, mid - width
+
+
+def atr(high, low, close, period: int = 14) -> np.ndarray:
+    """Average True Range with Wilder smoothing."""
+    h, squeeze = _as_2d(high)
+    l, _ = _as_2d(low)
+    c, _ = _as_2d(close)
+    prev_close = np.concatenate((np.full((c.shape[0], 1), np.nan), c[:, :-1]), axis=1)
+    tr = np.fmax(h - l, np.fmax(np.abs(h - prev_close), np.abs(l - prev_close)))
+    return _out(_smooth(tr, period, 1.0 / period), squeeze)
+
+
+def vwap(high, low, close, volume, reset: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Cumulative VWAP of the typical price (h + l + c) / 3. `reset` is an
+    optional boolean array, True where accumulation restarts (session open).
+    """
+    h, squeeze = _as_2d(high)
+    l, _ = _as_2d(low)
+    c, _ = _as_2d(close)
+    v, _ = _as_2d(volume)
+    tp = np.nan_to_num((h + l + c) / 3 * v)
+    vol = np.nan_to_num(v)
+
+    cum_pv = np.cumsum(tp, axis=1)
+    cum_v = np.cumsum(vol, axis=1)
+    if reset is not None:
+        r, _ = _as_2d(reset)
+        r = r.astype(bool)
+        # Subtract the running total as of the latest reset at or before t
+        idx = np.where(r, np.arange(r.shape[1]), 0)
+        idx = np.maximum.accumulate(idx, axis=1)
+        base_pv = np.take_along_axis(cum_pv - tp, idx, axis=1)
+        base_v = np.take_along_axis(cum_v - vol, idx, axis=1)
+        cum_pv = cum_pv - base_pv
+        cum_v = cum_v - base_v
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = np.where(cum_v > 0, cum_pv / cum_v, np.nan)
+    values[np.isnan(c)] = np.nan
+    return _out(values, squeeze)
+
+
+# ============================================
+# Latest values
+# ============================================
+
+def latest(series: np.ndarray, offset: int = 1) -> np.ndarray:
+    """Value `offset` bars from the end per symbol (1 = newest)."""
+    arr = np.asarray(series)
+    if arr.shape[-1] < offset:
+        return np.full(arr.shape[:-1], np.nan)
+    return arr[..., -offset]
+
+
+def compute_latest(
+    close,
+    high=None,
+    low=None,
+    volume=None,
+    ma_periods: Sequence[int] = (20, 50, 200),
+    rsi_period: int = 14,
+    rsi_method: str = "wilder",
+) -> Dict[str, np.ndarray]:
+    """
+    Every indicator for the whole universe in one pass. Returns name -> 1-D
+    array over symbols (NaN where not enough history). Keys: ma{p}, prev_ma{p},
+    ema12, ema26, rsi, prev_rsi, macd_line, macd_signal, macd_histogram,
+    prev_macd_line, prev_macd_signal, bb_upper, bb_middle, bb_lower, and,
+    when high/low (/volume) are given, atr and vwap.
+    """
+    out: Dict[str, np.ndarray] = {}
+    for p in ma_periods:
+        series = sma(close, p)
+        out[f"ma{p}"] = latest(series)
+        out[f"prev_ma{p}"] = latest(series, 2)
+    out["ema12"] = latest(ema(close, 12))
+    out["ema26"] = latest(ema(close, 26))
+
+    r = rsi(close, rsi_period, rsi_method)
+    out["rsi"] = latest(r)
+    out["prev_rsi"] = latest(r, 2)
+
+    line, sig, hist = macd(close)
+    out["macd_line"] = latest(line)
+    out["macd_signal"] = latest(sig)
+    out["macd_histogram"] = latest(hist)
+    out["prev_macd_line"] = latest(line, 2)
+    out["prev_macd_signal"] = latest(sig, 2)
+
+    upper, mid, lower = bollinger(close)
+    out["bb_upper"] = latest(upper)
+    out["bb_middle"] = latest(mid)
+    out["bb_lower"] = latest(lower)
+
+    if high is not None and low is not None:
+        out["atr"] = latest(atr(high, low, close))
+        if volume is not None:
+            out["vwap"] = latest(vwap(high, low, close, volume))
+    return out
+
+
+def to_optional(value) -> Optional[float]:
+    """NaN -> None, numpy scalar -> float."""
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+# ============================================
+# Scalar fast path (one short series)
+# ============================================
+
+def calc_ma(closes: Sequence[float], period: int) -> Optional[float]:
+    if len(closes) < period:
+        return None
+    return round(sum(closes[-period:]) / period, 2)
+
+
+def calc_rsi(closes: Sequence[float], period: int = 14) -> Optional[float]:
+    """Simple-average RSI over the last `period` deltas."""
+    if len(closes) < period + 1:
+        return None
+    deltas = [closes[i] - closes[i - 1] for i in range(1, len(closes))]
+    recent = deltas[-(period):]
+    gains = [d for d in recent if d > 0]
+    losses = [-d for d in recent if d < 0]
+    avg_gain = sum(gains) / period if gains else 0
+    avg_loss = sum(losses) / period if losses else 0
+    return rsi_from_averages(avg_gain, avg_loss)
+
+
+def rsi_from_averages(avg_gain: float, avg_loss: float) -> float:
+    if avg_loss == 0:
+        return 100.0
+    rs = avg_gain / avg_loss
+    return round(100 - (100 / (1 + rs)), 2)
+
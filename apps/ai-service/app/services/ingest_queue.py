@@ -0,0 +1,225 @@
+"""
+Bounded ingestion stage between polling and the state manager.
+
+Fetch workers `put()` each symbol's bars as soon as they arrive; one consumer
+task drains them in micro-batches of up to `batch_size` symbols and awaits
+the bars callback. A slow consumer no longer stalls fetching until the queue
+is full, and one slow symbol no longer holds back everyone else's bars.
+
+Policies:
+  - coalesce: a symbol still waiting in the queue absorbs newer bars for it
+    (same timeframe + timestamp: the newer bar wins, exactly what the state
+    manager would do applying both), so depth is bounded by distinct symbols
+  - overflow, when `max_symbols` entries are pending:
+      "block"        put() waits for room (backpressure into the fetch workers)
+      "drop_oldest"  the oldest pending symbol is discarded (freshness first)
+
+Batching is opportunistic: whatever is pending when the consumer is free
+forms the next batch, so batches grow only under load. `max_wait` > 0 holds
+a partial batch up to that many seconds for more symbols.
+
+Ingest latency = put() -> consumer callback returned, one sample per queued
+entry; every bar in an entry shares it.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Coroutine, Deque, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from app.models.insight_models import PriceBar
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("block", "drop_oldest")
+
+
+class IngestQueue:
+    """Per-symbol bounded hand-off with micro-batched consumption."""
+
+    def __init__(
+        self,
+        consumer: Callable[[List[PriceBar]], Coroutine],
+        max_symbols: int = 2000,
+        batch_size: int = 20,
+        max_wait: float = 0.0,
+        overflow: str = "block",
+        coalesce: bool = True,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.consumer = consumer
+        self.max_symbols = max(1, max_symbols)
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.overflow = overflow
+        self.coalesce = coalesce
+
+        # key -> (enqueued at, bars); key is the symbol when coalescing
+        self._pending: "OrderedDict[Hashable, Tuple[float, List[PriceBar]]]" = OrderedDict()
+        self._seq = 0
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._batch_ready = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task: Optional[asyncio.Task] = None
+        self._latency_ms: Deque[float] = deque(maxlen=1024)
+        self._stats = {
+            "symbols_enqueued": 0,
+            "bars_enqueued": 0,
+            "batches": 0,
+            "bars_ingested": 0,
+            "coalesced": 0,
+            "bars_coalesced": 0,
+            "dropped_symbols": 0,
+            "dropped_bars": 0,
+            "blocked_puts": 0,
+            "blocked_ms_total": 0.0,
+            "max_depth": 0,
+            "consumer_errors": 0,
+        }
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    # ============================================
+    # Producer side
+    # ============================================
+
+    def _coalesce_into(self, symbol: str, bars: List[PriceBar]) -> bool:
+        entry = self._pending.get(symbol)
+        if entry is None:
+            return False
+        enqueued_at, old = entry
+        merged = {(b.timeframe, b.timestamp): b for b in old}
+        for bar in bars:
+            merged[(bar.timeframe, bar.timestamp)] = bar
+        # Keeps its place and its original enqueue time (latency stays honest)
+        self._pending[symbol] = (enqueued_at, list(merged.values()))
+        self._stats["coalesced"] += 1
+        self._stats["bars_coalesced"] += len(old) + len(bars) - len(merged)
+        return True
+
+    async def put(self, symbol: str, bars: List[PriceBar]):
+        """Queue one symbol's freshly fetched bars."""
+        if not bars:
+            return
+        self._stats["symbols_enqueued"] += 1
+        self._stats["bars_enqueued"] += len(bars)
+        while True:
+            if self.coalesce and self._coalesce_into(symbol, bars):
+                return
+            if len(self._pending) < self.max_symbols:
+                break
+            if self.overflow == "drop_oldest":
+                _, (_, dropped) = self._pending.popitem(last=False)
+                self._stats["dropped_symbols"] += 1
+                self._stats["dropped_bars"] += len(dropped)
+                continue
+            self._stats["blocked_puts"] += 1
+            start = time.monotonic()
+            self._not_full.clear()
+            await self._not_full.wait()
+            self._stats["blocked_ms_total"] += (time.monotonic() - start) * 1000
+
+        if self.coalesce:
+            key = symbol
+        else:
+            self._seq += 1
+            key = (symbol, self._seq)
+        self._pending[key] = (time.monotonic(), list(bars))
+        self._stats["max_depth"] = max(self._stats["max_depth"], len(self._pending))
+        self._idle.clear()
+        self._not_empty.set()
+        if len(self._pending) >= self.batch_size:
+            self._batch_ready.set()
+
+    # ============================================
+    # Consumer side
+    # ============================================
+
+    def _take_batch(self) -> List[Tuple[float, List[PriceBar]]]:
+        batch = []
+        while self._pending and len(batch) < self.batch_size:
+            batch.append(self._pending.popitem(last=False)[1])
+        if not self._pending:
+            self._not_empty.clear()
+        if len(self._pending) < self.batch_size:
+            self._batch_ready.clear()
+        if len(self._pending) < self.max_symbols:
+            self._not_full.set()
+        return batch
+
+    async def _consume(self, batch: List[Tuple[float, List[PriceBar]]]):
+        bars = [bar for _, entry in batch for bar in entry]
+        try:
+            await self.consumer(bars)
+        except Exception as e:
+            self._stats["consumer_errors"] += 1
+            logger.error("Ingest consumer failed for %d bars: %s", len(bars), e)
+        done = time.monotonic()
+        for enqueued_at, _ in batch:
+            self._latency_ms.append((done - enqueued_at) * 1000)
+        self._stats["batches"] += 1
+        self._stats["bars_ingested"] += len(bars)
+
+    async def _run(self):
+        while True:
+            try:
+                await self._not_empty.wait()
+                if self.max_wait > 0 and len(self._pending) < self.batch_size:
+                    try:
+                        await asyncio.wait_for(self._batch_ready.wait(), timeout=self.max_wait)
+                    except asyncio.TimeoutError:
+                        pass
+                await self._consume(self._take_batch())
+                if not self._pending:
+                    self._idle.set()
+            except asyncio.CancelledError:
+                break
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def drain(self):
+        """Wait until everything queued so far has been consumed."""
+        await self._idle.wait()
+
+    async def stop(self, timeout: float = 10.0):
+        """Deliver what is still queued (up to `timeout`), then stop the consumer."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self.drain(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Ingest queue stopped with %d symbols undelivered", len(self._pending))
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def _latency_stats(self) -> Dict:
+        if not self._latency_ms:
+            return {"avg": None, "p95": None, "max": None}
+        values = np.fromiter(self._latency_ms, dtype=np.float64)
+        return {
+            "avg": round(float(values.mean()), 1),
+            "p95": round(float(np.percentile(values, 95)), 1),
+            "max": round(float(values.max()), 1),
+        }
+
+    def get_stats(self) -> Dict:
+        return {
+            **self._stats,
+            "blocked_ms_total": round(self._stats["blocked_ms_total"], 1),
+            "depth": len(self._pending),
+            "max_symbols": self.max_symbols,
+            "overflow": self.overflow,
+            "latency_ms": self._latency_stats(),
+        }
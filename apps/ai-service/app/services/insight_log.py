@@ -0,0 +1,234 @@
+"""
+Batched, rotating JSONL log for insight events.
+
+`write()` only appends a serialized line to an in-memory queue; a worker
+thread flushes the queue to disk in batches when `batch_size` lines are
+pending or every `flush_interval` seconds, whichever comes first. During
+market-wide bursts (ATO gaps on every symbol) the event loop no longer opens
+and appends to the file once per insight.
+
+Rotation keeps the active file at `path` (tail -f keeps working):
+  - by size: before a batch would push the file past `max_bytes`
+  - by date: when the first batch of a new (UTC) day arrives
+Rotated segments are named `<stem>.<YYYY-MM-DD>[.<n>]<suffix>` after the day
+they cover and, with `compress=True`, gzipped by the worker thread.
+
+The queue is bounded (`max_pending` lines); beyond that new lines are dropped
+and counted rather than growing memory without limit. `close()` flushes
+everything still queued; call it on shutdown.
+"""
+
+import asyncio
+import gzip
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class InsightLogWriter:
+    """Queue + worker thread writing JSONL lines in batches, with rotation."""
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_bytes: int = 50 * 1024 * 1024,
+        rotate_daily: bool = True,
+        compress: bool = False,
+        max_pending: int = 100_000,
+        clock: Callable[[], datetime] = datetime.utcnow,
+    ):
+        self.path = Path(path)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+        self.compress = compress
+        self.max_pending = max_pending
+        self.clock = clock
+
+        self._pending: List[str] = []
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()  # one flush at a time (worker or explicit)
+        self._thread: Optional[threading.Thread] = None
+        self._closing = False
+
+        self._file = None
+        self._size = 0
+        self._file_date: Optional[date] = None
+        self._stats = {
+            "lines_queued": 0,
+            "lines_written": 0,
+            "bytes_written": 0,
+            "batches": 0,
+            "dropped": 0,
+            "write_errors": 0,
+            "rotations": 0,
+            "compressed": 0,
+            "max_pending_seen": 0,
+            "last_flush_ms": None,
+        }
+
+    # ============================================
+    # Producer side (event loop)
+    # ============================================
+
+    def write(self, line: str):
+        """Queue one JSON line. Never touches the disk."""
+        with self._cond:
+            if self._closing:
+                return
+            if len(self._pending) >= self.max_pending:
+                self._stats["dropped"] += 1
+                return
+            self._pending.append(line)
+            self._stats["lines_queued"] += 1
+            pending = len(self._pending)
+            if pending > self._stats["max_pending_seen"]:
+                self._stats["max_pending_seen"] = pending
+            if pending >= self.batch_size:
+                self._cond.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="insight-log", daemon=True)
+                self._thread.start()
+
+    # ============================================
+    # Worker thread
+    # ============================================
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closing or len(self._pending) >= self.batch_size,
+                    timeout=self.flush_interval,
+                )
+                closing = self._closing
+            self.flush()
+            if closing:
+                break
+
+    def flush(self):
+        """Write everything queued so far (blocking; worker thread or shutdown)."""
+        with self._io_lock:
+            with self._cond:
+                lines, self._pending = self._pending, []
+            if not lines:
+                return
+            start = time.perf_counter()
+            try:
+                self._write_lines([(line + "\n").encode("utf-8") for line in lines])
+            except OSError as e:
+                self._stats["write_errors"] += 1
+                logger.error("Failed to write %d insight log lines: %s", len(lines), e)
+            self._stats["batches"] += 1
+            self._stats["last_flush_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    # ============================================
+    # File + rotation (called under _io_lock)
+    # ============================================
+
+    def _write_lines(self, encoded: List[bytes]):
+        """Append lines, rotating in between so no segment passes max_bytes."""
+        i = 0
+        while i < len(encoded):
+            self._rotate_if_needed(len(encoded[i]))
+            room = self.max_bytes - self._size if self.max_bytes else None
+            j, size = i, 0
+            # Always take one line, so an oversized line still gets written
+            while j < len(encoded) and (j == i or room is None or size + len(encoded[j]) <= room):
+                size += len(encoded[j])
+                j += 1
+            self._file.write(b"".join(encoded[i:j]))
+            self._size += size
+            self._stats["lines_written"] += j - i
+            self._stats["bytes_written"] += size
+            i = j
+        self._file.flush()
+
+    def _open(self):
+        """Open the active file; a non-empty one covers the day it was last written."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "ab")
+        self._size = self._file.tell()
+        if self._size:
+            self._file_date = datetime.utcfromtimestamp(self.path.stat().st_mtime).date()
+        else:
+            self._file_date = self.clock().date()
+
+    def _rotate_if_needed(self, incoming: int):
+        if self._file is None:
+            self._open()
+        new_day = self.rotate_daily and self.clock().date() != self._file_date
+        too_big = self.max_bytes and self._size and self._size + incoming > self.max_bytes
+        if new_day or too_big:
+            self._rotate()
+            self._open()
+
+    def _segment_path(self) -> Path:
+        label = (self._file_date or self.clock().date()).isoformat()
+        base = self.path.with_name(f"{self.path.stem}.{label}")
+        n = 0
+        while True:
+            candidate = Path(f"{base}{'.' + str(n) if n else ''}{self.path.suffix}")
+            if not candidate.exists() and not Path(f"{candidate}.gz").exists():
+                return candidate
+            n += 1
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        segment = self._segment_path()
+        os.replace(self.path, segment)
+        self._stats["rotations"] += 1
+        if self.compress:
+            try:
+                with open(segment, "rb") as src, gzip.open(f"{segment}.gz", "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                segment.unlink()
+                self._stats["compressed"] += 1
+            except OSError as e:
+                logger.error("Failed to compress insight log %s: %s", segment, e)
+
+    # ============================================
+    # Lifecycle
+    # ============================================
+
+    async def drain(self):
+        """Flush what is queued now, off the event loop."""
+        await asyncio.to_thread(self.flush)
+
+    async def close(self, timeout: float = 10.0):
+        """Stop accepting lines, flush the queue and close the file."""
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+            thread = self._thread
+        if thread:
+            await asyncio.to_thread(thread.join, timeout)
+        await asyncio.to_thread(self._close_file)
+
+    def _close_file(self):
+        self.flush()
+        with self._io_lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            pending = len(self._pending)
+        return {
+            **self._stats,
+            "pending": pending,
+            "path": str(self.path),
+            "size_bytes": self._size,
+        }
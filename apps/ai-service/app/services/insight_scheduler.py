@@ -0,0 +1,137 @@
+"""
+Event-driven insight analysis.
+
+The state manager's ingest summary marks symbols whose bars changed as
+dirty; one worker analyzes the dirty set in batches. A quiet worker starts a
+batch as soon as something is marked (detection lag ~ one ingest cycle), and
+batches start at most once per `batch_window` seconds, so a symbol marked
+many times inside a window is analyzed once. CPU follows market activity,
+not universe size.
+
+Detection lag = first mark of a symbol -> its analysis done (insights
+published, subscribers notified).
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class InsightScheduler:
+    """Coalescing dirty-symbol queue in front of InsightEngine."""
+
+    def __init__(self, insight_engine, state_manager, batch_window: float = 1.0):
+        self.engine = insight_engine
+        self.state_manager = state_manager
+        self.batch_window = batch_window
+
+        # Symbol -> monotonic time it was first marked since its last analysis
+        self._dirty: Dict[str, float] = {}
+        self._wakeup = asyncio.Event()
+        self._last_batch_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        self._lag_ms: Deque[float] = deque(maxlen=1024)
+        self._stats = {
+            "marks": 0,
+            "marks_coalesced": 0,
+            "batches": 0,
+            "symbols_analyzed": 0,
+            "insights": 0,
+            "last_batch_symbols": 0,
+            "last_batch_ms": None,
+        }
+
+    # ============================================
+    # Marking
+    # ============================================
+
+    def mark_dirty(self, symbols: Iterable[str]):
+        now = time.monotonic()
+        for symbol in symbols:
+            self._stats["marks"] += 1
+            if symbol in self._dirty:
+                self._stats["marks_coalesced"] += 1
+            else:
+                self._dirty[symbol] = now
+        if self._dirty:
+            self._wakeup.set()
+
+    def mark_changed(self, summary: Dict):
+        """Mark symbols from a MarketStateManager.update_bars summary that changed."""
+        self.mark_dirty(symbol for symbol, change in summary.items() if change.changed)
+
+    # ============================================
+    # Worker
+    # ============================================
+
+    async def run_batch(self) -> int:
+        """Analyze the current dirty set. Returns the number of symbols analyzed."""
+        dirty, self._dirty = self._dirty, {}
+        self._wakeup.clear()
+        if not dirty:
+            return 0
+        start = time.perf_counter()
+        self._last_batch_at = time.monotonic()
+        insights = await self.engine.analyze_symbols(self.state_manager, list(dirty))
+        done = time.monotonic()
+        for marked_at in dirty.values():
+            self._lag_ms.append((done - marked_at) * 1000)
+        self._stats["batches"] += 1
+        self._stats["symbols_analyzed"] += len(dirty)
+        self._stats["insights"] += len(insights)
+        self._stats["last_batch_symbols"] = len(dirty)
+        self._stats["last_batch_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return len(dirty)
+
+    async def _loop(self):
+        while self._running:
+            try:
+                await self._wakeup.wait()
+                if self._last_batch_at is not None:
+                    wait = self._last_batch_at + self.batch_window - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(wait)  # marks in the meantime coalesce
+                await self.run_batch()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error("Insight analysis batch failed: %s", e)
+
+    async def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _lag_stats(self) -> Dict:
+        if not self._lag_ms:
+            return {"avg": None, "p95": None, "max": None}
+        values = np.fromiter(self._lag_ms, dtype=np.float64)
+        return {
+            "avg": round(float(values.mean()), 1),
+            "p95": round(float(np.percentile(values, 95)), 1),
+            "max": round(float(values.max()), 1),
+        }
+
+    def get_stats(self) -> Dict:
+        return {
+            **self._stats,
+            "dirty": len(self._dirty),
+            "batch_window": self.batch_window,
+            "detection_lag_ms": self._lag_stats(),
+            "running": self._running,
+        }
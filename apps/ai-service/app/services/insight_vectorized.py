@@ -0,0 +1,249 @@
+"""
+Built-in insight detectors (PA/VA/TM) as vectorized predicates over a FeatureFrame.
+
+Each detector is a pair: `hits(frame)` returns a (symbols,) boolean mask and
+`event(symbol, features)` builds the InsightEvent for one hit from that
+symbol's feature row. Bar-count guards are registry metadata (min_bars_*), so
+predicates only see symbols with enough history. One registry scan evaluates
+all 10 detectors for every symbol at once; a single-symbol analysis is the
+same scan on a one-row frame. Events keep the signals and wording of the v1
+detectors.
+"""
+
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+from app.models.insight_models import InsightEvent, InsightSeverity, Timeframe
+from app.services.detector_features import CANDLES_1M, MA_CROSS_BARS, VOLUME_LOOKBACK, FeatureFrame
+from app.services.detector_registry import DetectorRegistry, DetectorSpec
+
+
+def _event(code: str, symbol: str, timeframe: Timeframe, severity: InsightSeverity,
+           signals: Dict, explanation: str) -> InsightEvent:
+    return InsightEvent(
+        insight_code=code,
+        symbol=symbol,
+        timeframe=timeframe,
+        severity=severity,
+        signals=signals,
+        raw_explanation=explanation,
+    )
+
+
+def _first(flags: List[bool]) -> int:
+    """Index of the first (oldest) candle that qualified."""
+    return flags.index(True)
+
+
+# ============================================
+# Price Action (PA)
+# ============================================
+
+def _strong_bullish(f) -> np.ndarray:
+    return (f.candle_range != 0) & f.bullish & (f.body_ratio > 0.70)
+
+
+def _pa01_hits(f: FeatureFrame) -> np.ndarray:
+    """PA01: Strong bullish candle (body >70% of range) in the last 5 1m bars."""
+    return _strong_bullish(f).any(axis=1)
+
+
+def _pa01_event(symbol: str, s: Dict) -> InsightEvent:
+    j = _first([r != 0 and b and ratio > 0.70
+                for r, b, ratio in zip(s["candle_range"], s["bullish"], s["body_ratio"])])
+    body_pct, change_pct = s["body_ratio"][j], s["candle_change_pct"][j]
+    return _event(
+        "PA01", symbol, Timeframe.INTRADAY_1M,
+        InsightSeverity.HIGH if body_pct > 0.85 else InsightSeverity.MEDIUM,
+        {"body_percent": round(body_pct, 2), "close_change_pct": round(change_pct, 2),
+         "range": s["candle_range"][j]},
+        f"Strong bullish candle: body {body_pct:.0%} of range, {change_pct:+.1f}% gain",
+    )
+
+
+def _pa02_hits(f: FeatureFrame) -> np.ndarray:
+    """PA02: Long upper wick (rejection >50% of range) in the last 5 1m bars."""
+    return ((f.candle_range != 0) & (f.upper_wick_ratio > 0.50)).any(axis=1)
+
+
+def _pa02_event(symbol: str, s: Dict) -> InsightEvent:
+    j = _first([r != 0 and w > 0.50 for r, w in zip(s["candle_range"], s["upper_wick_ratio"])])
+    wick_pct, high = s["upper_wick_ratio"][j], s["candle_high"][j]
+    return _event(
+        "PA02", symbol, Timeframe.INTRADAY_1M,
+        InsightSeverity.HIGH if wick_pct > 0.65 else InsightSeverity.MEDIUM,
+        {"upper_wick_percent": round(wick_pct, 2), "high": high, "close": s["candle_close"][j]},
+        f"Upper wick rejection: {wick_pct:.0%} of range, rejected at {high}",
+    )
+
+
+def _pa03_hits(f: FeatureFrame) -> np.ndarray:
+    """PA03: Gap up/down (daily, >1% gap)."""
+    return np.abs(f.gap_pct) > 1.0
+
+
+def _pa03_event(symbol: str, s: Dict) -> InsightEvent:
+    gap_pct, prev_close, today_open = s["gap_pct"], s["prev_close"], s["today_open"]
+    direction = "up" if gap_pct > 0 else "down"
+    return _event(
+        "PA03", symbol, Timeframe.DAILY,
+        InsightSeverity.HIGH if abs(gap_pct) > 2.0 else InsightSeverity.MEDIUM,
+        {"gap_percent": round(gap_pct, 2), "prev_close": prev_close, "today_open": today_open},
+        f"Gap {direction}: {gap_pct:+.1f}% (prev close {prev_close} → open {today_open})",
+    )
+
+
+def _pa04_hits(f: FeatureFrame) -> np.ndarray:
+    """PA04: Failed breakout (touches 20-day high but closes lower)."""
+    return (f.today_high >= f.high_20d) & (f.today_close < f.today_open)
+
+
+def _pa04_event(symbol: str, s: Dict) -> InsightEvent:
+    return _event(
+        "PA04", symbol, Timeframe.DAILY, InsightSeverity.MEDIUM,
+        {"high_20d": s["high_20d"], "today_high": s["today_high"], "today_close": s["today_close"]},
+        f"Failed breakout: hit 20d high {s['high_20d']} but closed at {s['today_close']}",
+    )
+
+
+# ============================================
+# Volume Analysis (VA)
+# ============================================
+
+def _va01_hits(f: FeatureFrame) -> np.ndarray:
+    """VA01: High volume breakout (>2x avg + price move >0.5%)."""
+    return (f.volume_ratio > 2.0) & (np.abs(f.price_change_pct) > 0.5)
+
+
+def _va01_event(symbol: str, s: Dict) -> InsightEvent:
+    vol_ratio, price_change = s["volume_ratio"], s["price_change_pct"]
+    return _event(
+        "VA01", symbol, Timeframe.DAILY,
+        InsightSeverity.HIGH if vol_ratio > 3.0 else InsightSeverity.MEDIUM,
+        {"volume_ratio": round(vol_ratio, 2), "price_change_pct": round(price_change, 2),
+         "volume": int(s["today_volume"])},
+        f"High volume breakout: {vol_ratio:.1f}x avg volume, price {price_change:+.1f}%",
+    )
+
+
+def _va02_hits(f: FeatureFrame) -> np.ndarray:
+    """VA02: Price up but volume down (divergence)."""
+    return (f.price_change_pct > 0.8) & (f.volume_ratio < 0.65)
+
+
+def _va02_event(symbol: str, s: Dict) -> InsightEvent:
+    vol_ratio, price_change = s["volume_ratio"], s["price_change_pct"]
+    return _event(
+        "VA02", symbol, Timeframe.DAILY, InsightSeverity.MEDIUM,
+        {"price_change_pct": round(price_change, 2), "volume_ratio": round(vol_ratio, 2)},
+        f"Price up {price_change:+.1f}% but volume only {vol_ratio:.0%} of average",
+    )
+
+
+def _va03_hits(f: FeatureFrame) -> np.ndarray:
+    """VA03: Volume climax (top 5% of last 20 bars)."""
+    return f.today_volume >= f.volume_p95
+
+
+def _va03_event(symbol: str, s: Dict) -> InsightEvent:
+    volume = int(s["today_volume"])
+    return _event(
+        "VA03", symbol, Timeframe.DAILY, InsightSeverity.MEDIUM,
+        {"volume": volume, "threshold_95pct": int(s["volume_p95"])},
+        f"Volume climax: {volume:,} (top 5% of 20-day range)",
+    )
+
+
+# ============================================
+# Technical/Momentum (TM)
+# ============================================
+
+def _golden(f) -> np.ndarray:
+    return (f.prev_ma20 <= f.prev_ma50) & (f.ma20 > f.ma50)
+
+
+def _tm02_hits(f: FeatureFrame) -> np.ndarray:
+    """TM02: MA20/MA50 cross (golden/death cross)."""
+    death = (f.prev_ma20 >= f.prev_ma50) & (f.ma20 < f.ma50)
+    return _golden(f) | death
+
+
+def _tm02_event(symbol: str, s: Dict) -> InsightEvent:
+    ma20, ma50 = s["ma20"], s["ma50"]
+    if s["prev_ma20"] <= s["prev_ma50"] and ma20 > ma50:
+        cross, text = "golden", f"Golden cross: MA20 ({ma20:.0f}) crossed above MA50 ({ma50:.0f})"
+    else:
+        cross, text = "death", f"Death cross: MA20 ({ma20:.0f}) crossed below MA50 ({ma50:.0f})"
+    return _event("TM02", symbol, Timeframe.DAILY, InsightSeverity.HIGH,
+                  {"ma20": ma20, "ma50": ma50, "cross_type": cross}, text)
+
+
+def _tm04_hits(f: FeatureFrame) -> np.ndarray:
+    """TM04: RSI > 70 (overbought)."""
+    return f.rsi14 > 70
+
+
+def _tm04_event(symbol: str, s: Dict) -> InsightEvent:
+    rsi14 = s["rsi14"]
+    return _event(
+        "TM04", symbol, Timeframe.DAILY,
+        InsightSeverity.HIGH if rsi14 > 80 else InsightSeverity.MEDIUM,
+        {"rsi14": rsi14}, f"RSI overbought: {rsi14:.1f} (>70)",
+    )
+
+
+def _tm05_hits(f: FeatureFrame) -> np.ndarray:
+    """TM05: RSI < 30 (oversold)."""
+    return f.rsi14 < 30
+
+
+def _tm05_event(symbol: str, s: Dict) -> InsightEvent:
+    rsi14 = s["rsi14"]
+    return _event(
+        "TM05", symbol, Timeframe.DAILY,
+        InsightSeverity.HIGH if rsi14 < 20 else InsightSeverity.MEDIUM,
+        {"rsi14": rsi14}, f"RSI oversold: {rsi14:.1f} (<30)",
+    )
+
+
+# ============================================
+# Registration
+# ============================================
+
+_PA_1M = dict(timeframe=Timeframe.INTRADAY_1M, min_bars_1m=CANDLES_1M)
+_DAILY_20 = dict(timeframe=Timeframe.DAILY, min_bars_daily=VOLUME_LOOKBACK)
+
+BUILTIN_DETECTORS: List[Dict] = [
+    dict(code="PA01", detect=_pa01_hits, build=_pa01_event, **_PA_1M,
+         features=("candle_range", "bullish", "body_ratio", "candle_change_pct")),
+    dict(code="PA02", detect=_pa02_hits, build=_pa02_event, **_PA_1M,
+         features=("candle_range", "upper_wick_ratio", "candle_high", "candle_close")),
+    dict(code="PA03", detect=_pa03_hits, build=_pa03_event, timeframe=Timeframe.DAILY, min_bars_daily=2,
+         features=("gap_pct", "prev_close", "today_open")),
+    dict(code="PA04", detect=_pa04_hits, build=_pa04_event, **_DAILY_20,
+         features=("high_20d", "today_high", "today_close", "today_open")),
+    dict(code="VA01", detect=_va01_hits, build=_va01_event, **_DAILY_20,
+         features=("volume_ratio", "price_change_pct", "today_volume")),
+    dict(code="VA02", detect=_va02_hits, build=_va02_event, **_DAILY_20,
+         features=("volume_ratio", "price_change_pct")),
+    dict(code="VA03", detect=_va03_hits, build=_va03_event, **_DAILY_20,
+         features=("today_volume", "volume_p95")),
+    dict(code="TM02", detect=_tm02_hits, build=_tm02_event, timeframe=Timeframe.DAILY,
+         min_bars_daily=MA_CROSS_BARS, features=("ma20", "ma50", "prev_ma20", "prev_ma50")),
+    dict(code="TM04", detect=_tm04_hits, build=_tm04_event, timeframe=Timeframe.DAILY,
+         features=("rsi14",)),
+    dict(code="TM05", detect=_tm05_hits, build=_tm05_event, timeframe=Timeframe.DAILY,
+         features=("rsi14",)),
+]
+DETECTOR_CODES = tuple(d["code"] for d in BUILTIN_DETECTORS)
+
+
+def create_default_registry(disabled: Iterable[str] = ()) -> DetectorRegistry:
+    """Registry with the 10 built-in detectors; `disabled` codes start switched off."""
+    registry = DetectorRegistry(
+        DetectorSpec(description=meta["detect"].__doc__ or "", **meta) for meta in BUILTIN_DETECTORS
+    )
+    for code in disabled:
+        registry.disable(code)
+    return registry
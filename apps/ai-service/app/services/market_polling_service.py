@@ -2,19 +2,71 @@
 Sprint A.1: Market Polling Service
 Multi-tier polling to replace SSI IDS streaming (on-hold).
 Tiers: default=60s, watchlist=30s, hot=15s.
+
+With a StreamSource wired to `push_bars`, polling is the fallback: a due
+symbol's intraday fetch is skipped while the stream delivered it within
+`stream_gap` seconds and polling has caught up to the stream's first bar, so
+only symbols with gaps in the stream are polled for 1m bars. Daily bars are
+always polled, and cursors follow polled bars only: a fallback poll re-fetches
+everything since the last poll, replacing tick-built bars with SSI's.
+
+Fetch modes:
+  - "concurrent": up to `max_in_flight` symbols fetched at once, every SSI
+    request paced by a shared token bucket sized to the FastConnect quota
+  - "serial": one symbol at a time with `rate_limit_delay` between symbols (v1)
+
+Scheduling: one min-heap of (next due time, symbol) for every tier. A
+dispatcher pops due symbols into a queue drained by a worker pool, and
+schedules each symbol's next poll exactly one tier interval after the
+previous due time, so cadence does not drift with fetch time. A tier's
+symbols are staggered evenly across its interval; a tier change reschedules
+the symbol immediately.
+
+With a TradingCalendar polling follows the HOSE/HNX session: tier cadence
+while the market is open (optionally faster in the ATO/ATC auctions), one
+reconciliation poll of every symbol when the lunch break or close begins,
+then idle until the next session phase.
+
+Change detection: the newest delivered bar of every symbol/timeframe is
+fingerprinted (timestamp + OHLCV). A re-fetched cursor bar that still
+matches is dropped right after decoding, so a symbol that has not traded
+since its last poll reaches neither the state manager nor the insight engine.
+
+Scheduled polls hand each symbol's bars to a bounded IngestQueue as soon as
+they are fetched; its consumer delivers micro-batches (up to `batch_size`
+symbols) to the bars callback, so a slow consumer applies backpressure
+instead of stalling every worker behind one batch. Cursors and fingerprints
+advance only once the callback has taken the polled bars: bars dropped by the
+queue (drop_oldest) or lost to a failing callback are fetched again next poll.
 """
 
 import asyncio
+import heapq
 import logging
 import time
-from typing import Callable, Coroutine, Dict, List, Optional, Set
-from datetime import datetime, timedelta
+from collections import deque
+from typing import Callable, Coroutine, Deque, Dict, List, Optional, Set, Tuple
+from datetime import datetime
 from enum import Enum
 
+import numpy as np
+
 from app.models.insight_models import PriceBar, Timeframe
+from app.services.bar_buffer import BarColumns, from_epoch_us, to_epoch_us
+from app.services.ingest_queue import IngestQueue
+from app.services.rate_limiter import TokenBucket
+from app.services.trading_calendar import ACTIVE_PHASES, AUCTION_PHASES, SessionPhase, TradingCalendar
 
 logger = logging.getLogger(__name__)
 
+FETCH_MODES = ("concurrent", "serial")
+
+# SSI requests per symbol poll: intraday + daily
+REQUESTS_PER_POLL = 2
+
+# Longest idle sleep before the session phase is re-checked (clock jumps, holiday edits)
+IDLE_RECHECK_SECONDS = 3600
+
 
 class PollingTier(str, Enum):
     DEFAULT = "default"      # 60s
@@ -36,7 +88,25 @@ class MarketPollingService:
         interval_hot: int = 15,
         batch_size: int = 20,
         rate_limit_delay: float = 0.15,
+        intraday_count: int = 60,
+        daily_count: int = 50,
+        daily_refresh_count: int = 2,
+        fetch_mode: str = "concurrent",
+        max_in_flight: int = 8,
+        rate_limit_per_sec: float = 10.0,
+        rate_limit_burst: Optional[int] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        calendar: Optional[TradingCalendar] = None,
+        auction_interval: Optional[int] = None,
+        clock: Optional[Callable[[], datetime]] = None,
+        ingest_max_symbols: int = 2000,
+        ingest_overflow: str = "block",
+        ingest_max_wait: float = 0.0,
+        change_filter: bool = True,
+        stream_gap: float = 90.0,
     ):
+        if fetch_mode not in FETCH_MODES:
+            raise ValueError(f"Unknown fetch mode: {fetch_mode}")
         self.ssi_client = ssi_client
         self.intervals = {
             PollingTier.DEFAULT: interval_default,
@@ -45,6 +115,46 @@ class MarketPollingService:
         }
         self.batch_size = batch_size
         self.rate_limit_delay = rate_limit_delay
+        self.intraday_count = intraday_count
+        self.daily_count = daily_count
+        self.daily_refresh_count = daily_refresh_count
+        self.fetch_mode = fetch_mode
+        self.max_in_flight = max(1, max_in_flight)
+        # One bucket for all tiers: they spend the same SSI quota
+        self.rate_limiter = rate_limiter or TokenBucket(rate_limit_per_sec, rate_limit_burst)
+        # Session awareness: None polls around the clock (v1)
+        self.calendar = calendar
+        self.auction_interval = auction_interval
+        self._clock = clock or datetime.utcnow
+        # True once the reconciliation poll ran for the current idle phase
+        self._idle = False
+
+        # Symbols whose daily history is already in state (backfill / snapshot):
+        # only the latest bars are fetched for them, not the full window
+        self._daily_backfilled: Set[str] = set()
+
+        # Symbol -> newest delivered bar timestamp, per timeframe: each poll asks
+        # only for bars since then (the cursor bar is re-fetched while it forms)
+        self._cursors: Dict[Timeframe, Dict[str, datetime]] = {
+            Timeframe.INTRADAY_1M: {},
+            Timeframe.DAILY: {},
+        }
+        # (symbol, timeframe) -> newest polled bar not yet delivered; cursors
+        # advance when the ingest consumer hands this very bar to the callback
+        self._undelivered: Dict[Tuple[str, Timeframe], PriceBar] = {}
+        # Symbol -> (timestamp us, OHLCV) of the newest bar delivered, per timeframe
+        self.change_filter = change_filter
+        self._fingerprints: Dict[Timeframe, Dict[str, Tuple]] = {
+            Timeframe.INTRADAY_1M: {},
+            Timeframe.DAILY: {},
+        }
+
+        # Symbol -> monotonic time a stream source last delivered it
+        self.stream_gap = stream_gap
+        self._stream_seen: Dict[str, float] = {}
+        # Symbol -> first stream 1m bar of the current streak; intraday polls
+        # continue until the cursor reaches it (the gap before the stream)
+        self._stream_from: Dict[str, datetime] = {}
 
         # Symbol -> tier mapping
         self._symbol_tiers: Dict[str, PollingTier] = {}
@@ -52,6 +162,25 @@ class MarketPollingService:
         self._watchlist_symbols: Set[str] = set()
         self._hot_symbols: Set[str] = set()
 
+        # Scheduler: heap of (due, seq, symbol); an entry is live only while
+        # _next_due[symbol] still equals its due time (lazy deletion)
+        self._heap: List[Tuple[float, int, str]] = []
+        self._seq = 0
+        self._next_due: Dict[str, float] = {}
+        self._last_due: Dict[str, float] = {}
+        self._queue: "asyncio.Queue[Tuple[str, float]]" = asyncio.Queue()
+        self._queued: Set[str] = set()
+        self._wakeup = asyncio.Event()
+        self._in_flight = 0
+        self.ingest = IngestQueue(
+            self._ingest,
+            max_symbols=ingest_max_symbols,
+            batch_size=batch_size,
+            max_wait=ingest_max_wait,
+            overflow=ingest_overflow,
+        )
+        self._lateness_ms: Deque[float] = deque(maxlen=1024)
+
         # Callbacks
         self._on_bars_update: Optional[Callable] = None
 
@@ -63,174 +192,526 @@ class MarketPollingService:
             "polls_success": 0,
             "polls_error": 0,
             "bars_fetched": 0,
+            "bars_requested": 0,
+            "bars_skipped_old": 0,
+            "daily_history_fetches": 0,
+            "ssi_requests": 0,
             "last_poll_at": None,
+            "reconciliation_polls": 0,
+            "symbols_polled": 0,
+            "overruns": 0,
+            "symbol_fetches": 0,
+            "symbols_unchanged": 0,
+            "bars_unchanged": 0,
+            "stream_bars": 0,
+            "intraday_skipped_streaming": 0,
         }
 
     def set_on_bars_update(self, callback: Callable[[List[PriceBar]], Coroutine]):
         """Set callback for when new bars are fetched."""
         self._on_bars_update = callback
 
-    def set_symbols(self, symbols: List[str], tier: PollingTier = PollingTier.DEFAULT):
-        """Set symbols for a given polling tier."""
-        tier_set = {
+    def _tier_set(self, tier: PollingTier) -> Set[str]:
+        return {
             PollingTier.DEFAULT: self._default_symbols,
             PollingTier.WATCHLIST: self._watchlist_symbols,
             PollingTier.HOT: self._hot_symbols,
         }[tier]
+
+    def set_symbols(self, symbols: List[str], tier: PollingTier = PollingTier.DEFAULT):
+        """Set symbols for a given polling tier."""
+        tier_set = self._tier_set(tier)
+        wanted = {s.upper() for s in symbols}
+        for s in tier_set - wanted:
+            self._unschedule(s)
+        now = time.monotonic()
+        added = sorted(s for s in wanted if s not in self._symbol_tiers)
+        for s in wanted:
+            if s in self._symbol_tiers and self._symbol_tiers[s] != tier:
+                self._move(s, tier, now)
         tier_set.clear()
-        tier_set.update(s.upper() for s in symbols)
-        for s in tier_set:
+        tier_set.update(wanted)
+        for s in added:
             self._symbol_tiers[s] = tier
+        self._stagger(added, tier, now)
 
     def add_symbol(self, symbol: str, tier: PollingTier = PollingTier.DEFAULT):
         """Add a symbol to a polling tier."""
         symbol = symbol.upper()
-        # Remove from other tiers
-        self._default_symbols.discard(symbol)
-        self._watchlist_symbols.discard(symbol)
-        self._hot_symbols.discard(symbol)
-        # Add to target tier
-        {
-            PollingTier.DEFAULT: self._default_symbols,
-            PollingTier.WATCHLIST: self._watchlist_symbols,
-            PollingTier.HOT: self._hot_symbols,
-        }[tier].add(symbol)
-        self._symbol_tiers[symbol] = tier
+        if self._symbol_tiers.get(symbol) == tier:
+            return
+        self._move(symbol, tier, time.monotonic())
+
+    def get_symbol_tiers(self) -> Dict[str, PollingTier]:
+        return dict(self._symbol_tiers)
+
+    def mark_daily_backfilled(self, symbols: List[str]):
+        """Daily history for these symbols is in state; poll only the latest daily bars."""
+        self._daily_backfilled.update(s.upper() for s in symbols)
 
     def remove_symbol(self, symbol: str):
         """Remove a symbol from all tiers."""
         symbol = symbol.upper()
-        self._default_symbols.discard(symbol)
-        self._watchlist_symbols.discard(symbol)
-        self._hot_symbols.discard(symbol)
-        self._symbol_tiers.pop(symbol, None)
+        self._unschedule(symbol)
+        for cursors in self._cursors.values():
+            cursors.pop(symbol, None)
+        for fingerprints in self._fingerprints.values():
+            fingerprints.pop(symbol, None)
+        for timeframe in self._cursors:
+            self._undelivered.pop((symbol, timeframe), None)
+        self._stream_seen.pop(symbol, None)
+        self._stream_from.pop(symbol, None)
 
     async def start(self):
-        """Start polling loops for all tiers."""
+        """Start the scheduler and its worker pool."""
         if self._running:
             return
         self._running = True
         logger.info("MarketPollingService starting...")
 
-        for tier in PollingTier:
-            task = asyncio.create_task(self._poll_loop(tier))
-            self._tasks.append(task)
+        self._restagger(time.monotonic())
+        await self.ingest.start()
+        workers = 1 if self.fetch_mode == "serial" else self.max_in_flight
+        self._tasks.append(asyncio.create_task(self._dispatch_loop()))
+        for _ in range(workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
 
-        logger.info("MarketPollingService started with %d tiers", len(self._tasks))
+        logger.info("MarketPollingService started: %d symbols, %d workers",
+                    len(self._symbol_tiers), workers)
 
     async def stop(self):
-        """Stop all polling loops."""
+        """Stop the scheduler and workers."""
         self._running = False
         for task in self._tasks:
             task.cancel()
         if self._tasks:
             await asyncio.gather(*self._tasks, return_exceptions=True)
         self._tasks.clear()
+        # Bars already fetched still reach state
+        await self.ingest.stop()
         logger.info("MarketPollingService stopped")
 
-    async def _poll_loop(self, tier: PollingTier):
-        """Main polling loop for a tier."""
+    def session_phase(self) -> Optional[SessionPhase]:
+        """Current session phase, or None without a calendar."""
+        if self.calendar is None:
+            return None
+        return self.calendar.phase_at(self._clock())
+
+    def _tier_interval(self, tier: PollingTier, phase: Optional[SessionPhase]) -> int:
         interval = self.intervals[tier]
+        if self.auction_interval and phase in AUCTION_PHASES:
+            interval = min(interval, self.auction_interval)
+        return interval
+
+    # ============================================
+    # Scheduler
+    # ============================================
+
+    def _schedule(self, symbol: str, due: float):
+        self._next_due[symbol] = due
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, symbol))
+        self._wakeup.set()
+
+    def _unschedule(self, symbol: str):
+        tier = self._symbol_tiers.pop(symbol, None)
+        if tier is not None:
+            self._tier_set(tier).discard(symbol)
+        self._next_due.pop(symbol, None)
+        self._last_due.pop(symbol, None)
+
+    def _move(self, symbol: str, tier: PollingTier, now: float):
+        """Tier change takes effect now: next poll one new interval after the last one."""
+        old = self._symbol_tiers.get(symbol)
+        if old is not None:
+            self._tier_set(old).discard(symbol)
+        self._tier_set(tier).add(symbol)
+        self._symbol_tiers[symbol] = tier
+        last = self._last_due.get(symbol)
+        self._schedule(symbol, now if last is None else max(now, last + self.intervals[tier]))
+
+    def _stagger(self, symbols: List[str], tier: PollingTier, now: float):
+        """Spread first polls evenly over one tier interval."""
+        step = self.intervals[tier] / len(symbols) if symbols else 0
+        for i, symbol in enumerate(symbols):
+            self._schedule(symbol, now + i * step)
+
+    def _restagger(self, now: float):
+        """Reschedule every symbol from `now` (start-up, end of an idle phase)."""
+        self._heap.clear()
+        self._next_due.clear()
+        for tier in PollingTier:
+            self._stagger(sorted(self._tier_set(tier)), tier, now)
+
+    def _pop_due(self, now: float, phase: Optional[SessionPhase]) -> List[Tuple[str, float]]:
+        """Pop every symbol due at `now`, scheduling its next poll on the same cadence."""
+        due: List[Tuple[str, float]] = []
+        while self._heap and self._heap[0][0] <= now:
+            t, _, symbol = heapq.heappop(self._heap)
+            if self._next_due.get(symbol) != t:
+                continue  # superseded by a tier change / removal
+            interval = self._tier_interval(self._symbol_tiers[symbol], phase)
+            # Skip slots missed while late instead of bursting to catch up
+            missed = max(0.0, (now - t) // interval)
+            self._schedule(symbol, t + (missed + 1) * interval)
+            self._last_due[symbol] = t
+            if symbol in self._queued:
+                self._stats["overruns"] += 1
+                continue
+            due.append((symbol, t))
+        return due
+
+    def _enqueue(self, symbol: str, due: float):
+        if symbol in self._queued:
+            return
+        self._queued.add(symbol)
+        self._queue.put_nowait((symbol, due))
+
+    def _dispatch(self, now: float) -> float:
+        """Queue due symbols (or the idle-phase reconciliation); returns seconds to sleep."""
+        phase = self.session_phase()
+        until_change = (
+            self.calendar.seconds_until_change(self._clock()) if self.calendar else None
+        )
+        if phase is not None and phase not in ACTIVE_PHASES:
+            if not self._idle:
+                self._idle = True
+                self._stats["reconciliation_polls"] += 1
+                for symbol in sorted(self._symbol_tiers):
+                    self._enqueue(symbol, now)
+            return min(IDLE_RECHECK_SECONDS, until_change)
+        if self._idle:
+            self._idle = False
+            self._restagger(now)
+
+        for symbol, due in self._pop_due(now, phase):
+            self._enqueue(symbol, due)
+
+        wait = self._heap[0][0] - now if self._heap else IDLE_RECHECK_SECONDS
+        if until_change is not None:
+            wait = min(wait, until_change)
+        return max(0.0, wait)
+
+    async def _dispatch_loop(self):
         while self._running:
             try:
-                symbols = list({
-                    PollingTier.DEFAULT: self._default_symbols,
-                    PollingTier.WATCHLIST: self._watchlist_symbols,
-                    PollingTier.HOT: self._hot_symbols,
-                }[tier])
-
-                if symbols:
-                    await self._poll_symbols(symbols, tier)
-
-                await asyncio.sleep(interval)
+                wait = self._dispatch(time.monotonic())
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                logger.error("Polling error [%s]: %s", tier.value, e)
-                await asyncio.sleep(interval)
-
-    async def _poll_symbols(self, symbols: List[str], tier: PollingTier):
-        """Fetch bars for a batch of symbols."""
-        all_bars: List[PriceBar] = []
+                logger.error("Polling scheduler error: %s", e)
+                await asyncio.sleep(1)
 
-        # Process in batches
-        for i in range(0, len(symbols), self.batch_size):
-            batch = symbols[i:i + self.batch_size]
-            for symbol in batch:
-                try:
-                    bars = await self._fetch_symbol_bars(symbol)
-                    all_bars.extend(bars)
-                    self._stats["bars_fetched"] += len(bars)
-                    # Rate limiting
+    async def _worker(self):
+        while True:
+            symbol, due = await self._queue.get()
+            self._in_flight += 1
+            try:
+                self._lateness_ms.append(max(0.0, time.monotonic() - due) * 1000)
+                intraday = not self._stream_covers_intraday(symbol, time.monotonic())
+                if not intraday:
+                    self._stats["intraday_skipped_streaming"] += 1
+                bars = await self._fetch_one(symbol, intraday=intraday)
+                self._stats["symbols_polled"] += 1
+                # May wait here when the ingest queue is full (backpressure)
+                await self.ingest.put(symbol, bars)
+                if self.fetch_mode == "serial":
                     await asyncio.sleep(self.rate_limit_delay)
-                except Exception as e:
-                    logger.error("Error fetching %s: %s", symbol, e)
-                    self._stats["polls_error"] += 1
-
+            finally:
+                self._in_flight -= 1
+                self._queued.discard(symbol)
+                self._queue.task_done()
+
+    # ============================================
+    # Streaming fallback
+    # ============================================
+
+    async def push_bars(self, bars: List[PriceBar]):
+        """
+        StreamSource callback: bars go through the same ingest queue but never
+        move the cursors, which only follow polled bars.
+        """
+        now = time.monotonic()
+        by_symbol: Dict[str, List[PriceBar]] = {}
+        for bar in bars:
+            by_symbol.setdefault(bar.symbol.upper(), []).append(bar)
+        for symbol, symbol_bars in by_symbol.items():
+            if not self._stream_covers(symbol, now):
+                self._stream_from.pop(symbol, None)  # new streak
+            minutes = [b.timestamp for b in symbol_bars if b.timeframe == Timeframe.INTRADAY_1M]
+            if minutes and symbol not in self._stream_from:
+                self._stream_from[symbol] = from_epoch_us(to_epoch_us(min(minutes)))
+            self._stream_seen[symbol] = now
+            self._stats["stream_bars"] += len(symbol_bars)
+            await self.ingest.put(symbol, symbol_bars)
+
+    def _stream_covers(self, symbol: str, now: float) -> bool:
+        seen = self._stream_seen.get(symbol)
+        return seen is not None and now - seen < self.stream_gap
+
+    def _stream_covers_intraday(self, symbol: str, now: float) -> bool:
+        """Stream is live for 1m bars and polling has delivered everything before it."""
+        start = self._stream_from.get(symbol)
+        cursor = self._cursors[Timeframe.INTRADAY_1M].get(symbol)
+        return (self._stream_covers(symbol, now) and start is not None
+                and cursor is not None and cursor >= start)
+
+    async def _ingest(self, bars: List[PriceBar]):
+        """IngestQueue consumer: one micro-batch of symbols."""
+        await self._deliver(bars)
+
+    async def _deliver(self, bars: List[PriceBar]):
+        """
+        Hand bars to the callback, then advance cursors past them. A failing
+        callback propagates (the ingest queue counts it) and leaves the cursors
+        where they were, so the next poll fetches those bars again.
+        """
+        if bars and self._on_bars_update:
+            await self._on_bars_update(bars)
+        self._commit(bars)
+
+    # ============================================
+    # Fetching
+    # ============================================
+
+    async def _fetch_one(self, symbol: str, intraday: bool = True) -> List[PriceBar]:
+        """Fetch one symbol; a failure only costs that symbol's bars."""
         self._stats["polls_total"] += 1
-        self._stats["polls_success"] += 1
         self._stats["last_poll_at"] = datetime.utcnow().isoformat() + "Z"
+        try:
+            bars = await self._fetch_symbol_bars(symbol, intraday=intraday)
+        except Exception as e:
+            logger.error("Error fetching %s: %s", symbol, e)
+            self._stats["polls_error"] += 1
+            return []
+        self._stats["polls_success"] += 1
+        self._stats["bars_fetched"] += len(bars)
+        return bars
 
-        if all_bars and self._on_bars_update:
-            try:
-                await self._on_bars_update(all_bars)
-            except Exception as e:
-                logger.error("Error in on_bars_update callback: %s", e)
+    async def _ssi_call(self, method, **kwargs):
+        """Every SSI request spends one token from the shared bucket."""
+        if self.fetch_mode == "concurrent":
+            await self.rate_limiter.acquire()
+        self._stats["ssi_requests"] += 1
+        return await method(**kwargs)
+
+    # ============================================
+    # Fetch cursors
+    # ============================================
+
+    def set_cursor(self, symbol: str, timeframe: Timeframe, timestamp: datetime):
+        """
+        Record the newest bar already delivered for symbol/timeframe (never moves
+        back). Stored as naive UTC, whatever timezone the bar carried.
+        """
+        cursors = self._cursors[timeframe]
+        symbol = symbol.upper()
+        timestamp = from_epoch_us(to_epoch_us(timestamp))
+        if symbol not in cursors or timestamp > cursors[symbol]:
+            cursors[symbol] = timestamp
+
+    async def seed_cursors(self, state_manager):
+        """
+        Start cursors from bars already in state (snapshot restore / backfill).
+        A daily cursor is only seeded for a full history window; shorter
+        histories still get one full daily fetch.
+        """
+        for symbol in state_manager.get_tracked_symbols():
+            cols = await state_manager.get_recent_columns(symbol, Timeframe.INTRADAY_1M, 1)
+            if cols is not None and len(cols):
+                self.set_cursor(symbol, Timeframe.INTRADAY_1M, from_epoch_us(cols.timestamp[-1]))
+            cols = await state_manager.get_recent_columns(symbol, Timeframe.DAILY, self.daily_count)
+            if cols is not None and len(cols) >= self.daily_count:
+                self.set_cursor(symbol, Timeframe.DAILY, from_epoch_us(cols.timestamp[-1]))
+
+    def _intraday_count(self, symbol: str) -> int:
+        """Minutes since the last ingested 1m bar, plus that bar (it may still be forming)."""
+        cursor = self._cursors[Timeframe.INTRADAY_1M].get(symbol)
+        if cursor is None:
+            return self.intraday_count
+        elapsed = (to_epoch_us(self._clock()) - to_epoch_us(cursor)) // 60_000_000
+        return max(1, min(self.intraday_count, elapsed + 1))
+
+    def _daily_count(self, symbol: str) -> int:
+        """Trading days since the last ingested daily bar, plus that bar; full window once."""
+        cursor = self._cursors[Timeframe.DAILY].get(symbol)
+        if cursor is None:
+            if symbol in self._daily_backfilled:
+                return self.daily_refresh_count
+            return self.daily_count
+        holidays = sorted(self.calendar.holidays) if self.calendar else []
+        missed = int(np.busday_count(cursor.date(), self._clock().date(), holidays=holidays))
+        return max(1, min(self.daily_count, missed + 1))
+
+    def _rows_to_bars(self, symbol: str, timeframe: Timeframe, rows) -> List[PriceBar]:
+        """Build bars for rows at or after the cursor; older rows are already in state."""
+        cursor = self._cursors[timeframe].get(symbol)
+        if isinstance(rows, BarColumns):
+            return self._columns_to_bars(symbol, timeframe, rows, cursor)
+        bars: List[PriceBar] = []
+        for bar_data in rows or ():
+            ts = bar_data["timestamp"]
+            if isinstance(ts, str):
+                ts = datetime.fromisoformat(ts)
+            if ts.tzinfo is not None:
+                ts = from_epoch_us(to_epoch_us(ts))
+            if cursor is not None and ts < cursor:
+                self._stats["bars_skipped_old"] += 1
+                continue
+            if ts == cursor and self._unchanged(
+                symbol, timeframe, to_epoch_us(ts), bar_data["open"], bar_data["high"],
+                bar_data["low"], bar_data["close"], bar_data.get("volume", 0),
+            ):
+                continue
+            bars.append(PriceBar(
+                symbol=symbol,
+                timeframe=timeframe,
+                timestamp=ts,
+                open=bar_data["open"],
+                high=bar_data["high"],
+                low=bar_data["low"],
+                close=bar_data["close"],
+                volume=bar_data.get("volume", 0),
+            ))
+        if bars:
+            self._undelivered[(symbol, timeframe)] = max(bars, key=lambda b: b.timestamp)
+        return bars
 
-    async def _fetch_symbol_bars(self, symbol: str) -> List[PriceBar]:
-        """Fetch intraday + daily bars for a symbol from SSI."""
+    def _unchanged(self, symbol: str, timeframe: Timeframe, ts_us: int, *ohlcv) -> bool:
+        """True (and counted) if this is the newest delivered bar, unchanged."""
+        if not self.change_filter:
+            return False
+        if self._fingerprints[timeframe].get(symbol) != (int(ts_us), *map(float, ohlcv)):
+            return False
+        self._stats["bars_unchanged"] += 1
+        return True
+
+    def _remember(self, symbol: str, timeframe: Timeframe, ts_us: int, *ohlcv):
+        self._fingerprints[timeframe][symbol] = (int(ts_us), *map(float, ohlcv))
+
+    def _commit(self, bars: List[PriceBar]):
+        """
+        Delivered bars: where the newest polled bar of a symbol/timeframe is
+        among them, advance the cursor to it and fingerprint it. Polled bars
+        dropped or failed on the way never get here, so the next poll
+        re-fetches them; stream bars are never polled bars.
+        """
+        for bar in bars:
+            key = (bar.symbol, bar.timeframe)
+            if self._undelivered.get(key) is not bar:
+                continue
+            del self._undelivered[key]
+            self.set_cursor(bar.symbol, bar.timeframe, bar.timestamp)
+            self._remember(bar.symbol, bar.timeframe, to_epoch_us(bar.timestamp),
+                           bar.open, bar.high, bar.low, bar.close, bar.volume)
+
+    def _columns_to_bars(
+        self, symbol: str, timeframe: Timeframe, cols: BarColumns, cursor: Optional[datetime]
+    ) -> List[PriceBar]:
+        """Columnar client response: cursor filter is one mask, PriceBars only for new rows."""
+        if not len(cols):
+            return []
+        keep = np.ones(len(cols), dtype=bool) if cursor is None else cols.timestamp >= to_epoch_us(cursor)
+        self._stats["bars_skipped_old"] += int(len(cols) - np.count_nonzero(keep))
+        if cursor is not None:
+            # Only the re-fetched cursor bar can repeat what was delivered
+            for i in np.flatnonzero(cols.timestamp == to_epoch_us(cursor)):
+                if self._unchanged(symbol, timeframe, cols.timestamp[i], cols.open[i], cols.high[i],
+                                   cols.low[i], cols.close[i], cols.volume[i]):
+                    keep[i] = False
+        idx = np.flatnonzero(keep)
+        if not len(idx):
+            return []
+        ts = cols.timestamp[idx]
+        o, h, l, c = (a[idx].tolist() for a in (cols.open, cols.high, cols.low, cols.close))
+        v = cols.volume[idx].tolist()
+        bars = [
+            PriceBar(symbol=symbol, timeframe=timeframe, timestamp=from_epoch_us(ts[i]),
+                     open=o[i], high=h[i], low=l[i], close=c[i], volume=v[i])
+            for i in range(len(idx))
+        ]
+        self._undelivered[(symbol, timeframe)] = bars[int(np.argmax(ts))]
+        return bars
+
+    async def _fetch_symbol_bars(self, symbol: str, intraday: bool = True) -> List[PriceBar]:
+        """
+        Fetch intraday + daily bars for a symbol from SSI, only what is new
+        since the cursors; daily only when the stream covers intraday.
+        """
         bars: List[PriceBar] = []
 
         if not self.ssi_client:
             return bars
+        self._stats["symbol_fetches"] += 1
+        fetched = 0
 
-        try:
-            # Fetch intraday 1m bars
-            intraday = await self.ssi_client.get_intraday_ohlc(
-                symbol=symbol, resolution="1", count=60
-            )
-            if intraday:
-                for bar_data in intraday:
-                    bars.append(PriceBar(
-                        symbol=symbol,
-                        timeframe=Timeframe.INTRADAY_1M,
-                        timestamp=bar_data["timestamp"],
-                        open=bar_data["open"],
-                        high=bar_data["high"],
-                        low=bar_data["low"],
-                        close=bar_data["close"],
-                        volume=bar_data.get("volume", 0),
-                    ))
-        except Exception as e:
-            logger.error("Error fetching intraday for %s: %s", symbol, e)
+        if intraday:
+            try:
+                # Fetch intraday 1m bars
+                count = self._intraday_count(symbol)
+                self._stats["bars_requested"] += count
+                rows = await self._ssi_call(
+                    self.ssi_client.get_intraday_ohlc, symbol=symbol, resolution="1", count=count
+                )
+                bars.extend(self._rows_to_bars(symbol, Timeframe.INTRADAY_1M, rows))
+                fetched += 1
+            except Exception as e:
+                logger.error("Error fetching intraday for %s: %s", symbol, e)
 
         try:
-            # Fetch daily bars (50 days for indicators)
-            daily = await self.ssi_client.get_daily_ohlc(
-                symbol=symbol, count=50
+            # Fetch daily bars: the full window once, then only the latest bars
+            count = self._daily_count(symbol)
+            if symbol not in self._cursors[Timeframe.DAILY] and symbol not in self._daily_backfilled:
+                self._stats["daily_history_fetches"] += 1
+            self._stats["bars_requested"] += count
+            daily = await self._ssi_call(
+                self.ssi_client.get_daily_ohlc, symbol=symbol, count=count
             )
-            if daily:
-                for bar_data in daily:
-                    bars.append(PriceBar(
-                        symbol=symbol,
-                        timeframe=Timeframe.DAILY,
-                        timestamp=bar_data["timestamp"],
-                        open=bar_data["open"],
-                        high=bar_data["high"],
-                        low=bar_data["low"],
-                        close=bar_data["close"],
-                        volume=bar_data.get("volume", 0),
-                    ))
+            bars.extend(self._rows_to_bars(symbol, Timeframe.DAILY, daily))
+            fetched += 1
         except Exception as e:
             logger.error("Error fetching daily for %s: %s", symbol, e)
 
+        if fetched == (2 if intraday else 1) and not bars:
+            self._stats["symbols_unchanged"] += 1
         return bars
 
+    def _lateness_stats(self) -> Dict:
+        if not self._lateness_ms:
+            return {"avg": None, "p95": None, "max": None}
+        values = np.fromiter(self._lateness_ms, dtype=np.float64)
+        return {
+            "avg": round(float(values.mean()), 1),
+            "p95": round(float(np.percentile(values, 95)), 1),
+            "max": round(float(values.max()), 1),
+        }
+
     def get_stats(self) -> Dict:
+        phase = self.session_phase()
         return {
             **self._stats,
             "symbols_default": len(self._default_symbols),
             "symbols_watchlist": len(self._watchlist_symbols),
             "symbols_hot": len(self._hot_symbols),
+            "fetch_mode": self.fetch_mode,
+            "max_in_flight": self.max_in_flight,
+            "rate_limiter": self.rate_limiter.get_stats(),
+            "session_phase": phase.value if phase else None,
+            "scheduled": len(self._next_due),
+            "queue_depth": self._queue.qsize(),
+            "in_flight": self._in_flight,
+            "lateness_ms": self._lateness_stats(),
+            "ingest": self.ingest.get_stats(),
+            "suppression_rate": round(
+                self._stats["symbols_unchanged"] / max(1, self._stats["symbol_fetches"]), 3
+            ),
+            "stream_covered": sum(
+                1 for s in self._symbol_tiers if self._stream_covers(s, time.monotonic())
+            ),
             "running": self._running,
         }
@@ -1,28 +1,83 @@
 """
 Sprint A.2: Market State Manager
 Central state storage with rolling window approach.
-Stores 1m bars (60 bars = 1h) and daily bars (50 = ~2 months).
-Computes snapshots with MA20/MA50/RSI14 on-demand.
+Stores 1m bars (60 bars = 1h) and daily bars (50 = ~2 months)
+in columnar NumPy ring buffers (see bar_buffer.py).
+5m/15m/30m/1h bars are resampled from the 1m stream (see bar_resampler.py).
+MA20/MA50/RSI14 are maintained incrementally on append (see rolling_indicators.py),
+so snapshots read cached values.
 """
 
 import asyncio
 import logging
-from collections import deque
-from typing import Dict, List, Optional, Deque
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
 from datetime import datetime, timedelta
 
+import numpy as np
+
 from app.models.insight_models import PriceBar, MarketSnapshot, Timeframe
+from app.services.bar_buffer import BarColumns, BarRingBuffer, BarWrite, to_epoch_us
+from app.services.bar_resampler import BarResampler
+from app.services.indicators import stack_columns
+from app.services.rolling_indicators import RollingIndicators
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class SymbolChange:
+    """Per-symbol result of one ingest batch."""
+    symbol: str
+    appended: int = 0
+    replaced: int = 0
+    inserted: int = 0
+    unchanged: int = 0
+    timeframes: Set[Timeframe] = field(default_factory=set)  # timeframes that changed
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.appended or self.replaced or self.inserted)
+
+    @property
+    def status(self) -> str:
+        """One of: new_bars, updated_last, untouched."""
+        if self.appended or self.inserted:
+            return "new_bars"
+        if self.replaced:
+            return "updated_last"
+        return "untouched"
+
+    def record(self, timeframe: Timeframe, result: BarWrite):
+        if result == BarWrite.UNCHANGED:
+            self.unchanged += 1
+            return
+        self.timeframes.add(timeframe)
+        if result == BarWrite.APPENDED:
+            self.appended += 1
+        elif result == BarWrite.REPLACED:
+            self.replaced += 1
+        else:
+            self.inserted += 1
+
+
 class SymbolState:
     """Per-symbol state with rolling windows and session tracking."""
 
-    def __init__(self, symbol: str, max_1m: int = 60, max_daily: int = 50):
+    def __init__(
+        self,
+        symbol: str,
+        max_1m: int = 60,
+        max_daily: int = 50,
+        indicator_mode: str = "exact",
+        max_resampled: int = 60,
+    ):
         self.symbol = symbol
-        self.bars_1m: Deque[PriceBar] = deque(maxlen=max_1m)
-        self.bars_daily: Deque[PriceBar] = deque(maxlen=max_daily)
+        self.bars_1m = BarRingBuffer(max_1m)
+        self.bars_daily = BarRingBuffer(max_daily)
+        self.resampler = BarResampler(max_resampled)
+        self.indicators = RollingIndicators(max_daily, mode=indicator_mode)
         self.lock = asyncio.Lock()
 
         # Session tracking
@@ -34,11 +89,17 @@ class SymbolState:
 
         self.last_updated: Optional[datetime] = None
 
-    def _seen_timestamps_1m(self) -> set:
-        return {b.timestamp for b in self.bars_1m}
+        # Bumped (from the manager-wide sequence) whenever bar data changes
+        self.version: int = 0
+        self._snapshot: Optional[MarketSnapshot] = None
+        self._snapshot_key: Optional[tuple] = None
 
-    def _seen_timestamps_daily(self) -> set:
-        return {b.timestamp for b in self.bars_daily}
+    def buffer_for(self, timeframe: Timeframe) -> BarRingBuffer:
+        if timeframe == Timeframe.INTRADAY_1M:
+            return self.bars_1m
+        if timeframe == Timeframe.DAILY:
+            return self.bars_daily
+        return self.resampler.buffers[timeframe]
 
 
 class MarketStateManager:
@@ -52,36 +113,170 @@ class MarketStateManager:
         rolling_window_1m: int = 60,
         rolling_window_daily: int = 50,
         stale_threshold: int = 300,
+        indicator_mode: str = "exact",
+        rolling_window_resampled: int = 60,
     ):
         self.rolling_window_1m = rolling_window_1m
         self.rolling_window_daily = rolling_window_daily
+        self.rolling_window_resampled = rolling_window_resampled
         self.stale_threshold = stale_threshold
+        self.indicator_mode = indicator_mode
         self._states: Dict[str, SymbolState] = {}
 
+        # Version sequence: symbol -> version, ordered by most recent change last
+        self._version = 0
+        self._changes: "OrderedDict[str, int]" = OrderedDict()
+
     def _get_or_create(self, symbol: str) -> SymbolState:
         if symbol not in self._states:
             self._states[symbol] = SymbolState(
-                symbol, self.rolling_window_1m, self.rolling_window_daily
+                symbol, self.rolling_window_1m, self.rolling_window_daily,
+                indicator_mode=self.indicator_mode,
+                max_resampled=self.rolling_window_resampled,
             )
         return self._states[symbol]
 
-    async def update_bars(self, bars: List[PriceBar]):
-        """Update state with new bars. Deduplicates by timestamp."""
+    async def update_bars(self, bars: List[PriceBar]) -> Dict[str, SymbolChange]:
+        """
+        Update state with new bars. Deduplicates by timestamp.
+        A bar with the same timestamp as the latest one replaces it (still-forming bar).
+
+        Bars are grouped by (symbol, timeframe) and written in timestamp order
+        with one lock acquisition per symbol. Returns a change summary per symbol.
+        """
+        groups: Dict[str, Dict[Timeframe, List[PriceBar]]] = defaultdict(lambda: defaultdict(list))
         for bar in bars:
-            state = self._get_or_create(bar.symbol)
+            groups[bar.symbol][bar.timeframe].append(bar)
+
+        summary: Dict[str, SymbolChange] = {}
+        for symbol, by_tf in groups.items():
+            state = self._get_or_create(symbol)
+            change = SymbolChange(symbol)
             async with state.lock:
-                if bar.timeframe == Timeframe.INTRADAY_1M:
-                    if bar.timestamp not in state._seen_timestamps_1m():
-                        state.bars_1m.append(bar)
-                        self._update_session(state, bar)
-                elif bar.timeframe == Timeframe.DAILY:
-                    if bar.timestamp not in state._seen_timestamps_daily():
-                        state.bars_daily.append(bar)
+                for timeframe, tf_bars in by_tf.items():
+                    tf_bars.sort(key=lambda b: b.timestamp)
+                    for bar in tf_bars:
+                        change.record(timeframe, self._write_bar(state, bar))
                 state.last_updated = datetime.utcnow()
+                if change.changed:
+                    self._bump_version(state)
+            summary[symbol] = change
+        return summary
+
+    def load_symbol(
+        self,
+        symbol: str,
+        intraday: Optional[BarColumns] = None,
+        daily: Optional[BarColumns] = None,
+        session: Optional[Dict] = None,
+        last_updated: Optional[datetime] = None,
+    ) -> SymbolState:
+        """
+        Bulk-load bar windows for a symbol (warm restart, backfill), replacing
+        what is held for the given timeframes. Indicators and resampled frames
+        are rebuilt from the loaded bars. Synchronous: meant for startup, before polling.
+        """
+        state = self._get_or_create(symbol)
+        if intraday is not None:
+            state.bars_1m.load(intraday.timestamp, intraday.open, intraday.high,
+                               intraday.low, intraday.close, intraday.volume)
+            state.resampler.load(state.bars_1m.columns())
+        if daily is not None:
+            state.bars_daily.load(daily.timestamp, daily.open, daily.high,
+                                  daily.low, daily.close, daily.volume)
+            state.indicators.rebuild(state.bars_daily.closes())
+        if session:
+            state.session_date = session.get("date")
+            state.session_open = session.get("open", 0.0)
+            state.session_high = session.get("high", 0.0)
+            state.session_low = session.get("low", float('inf'))
+            state.session_volume = session.get("volume", 0)
+        if last_updated is not None:
+            state.last_updated = last_updated
+        self._bump_version(state)
+        return state
+
+    # ============================================
+    # Versioning
+    # ============================================
+
+    @property
+    def version(self) -> int:
+        """Latest version handed out. Use as the cursor for changed_since()."""
+        return self._version
+
+    def _bump_version(self, state: SymbolState):
+        self._version += 1
+        state.version = self._version
+        self._changes[state.symbol] = self._version
+        self._changes.move_to_end(state.symbol)
+
+    def changed_since(self, version: int) -> List[str]:
+        """
+        Symbols whose bar data changed after `version`, oldest change first.
+        Typical use: `symbols = sm.changed_since(cursor); cursor = sm.version`.
+        """
+        changed = []
+        for symbol, v in reversed(self._changes.items()):
+            if v <= version:
+                break
+            changed.append(symbol)
+        changed.reverse()
+        return changed
+
+    def _write_bar(self, state: SymbolState, bar: PriceBar) -> BarWrite:
+        """
+        Apply one bar to its ring buffer (+ session / indicators / resampled frames).
+        Only 1m and daily bars are ingested; coarser frames are derived. Caller holds the lock.
+        """
+        if bar.timeframe not in (Timeframe.INTRADAY_1M, Timeframe.DAILY):
+            return BarWrite.UNCHANGED
+        buf = state.buffer_for(bar.timeframe)
+        is_daily = bar.timeframe == Timeframe.DAILY
+        ts = to_epoch_us(bar.timestamp)
+        last = buf.last_row()
+        row = (bar.open, bar.high, bar.low, bar.close, bar.volume)
+
+        if last is None or ts > last[0]:
+            if is_daily:
+                state.indicators.append(bar.close, buf.closes())
+            buf.append(ts, *row)
+            result = BarWrite.APPENDED
+        elif ts == last[0]:
+            if last[1:] == row:
+                return BarWrite.UNCHANGED
+            if is_daily:
+                state.indicators.replace_last(bar.close, buf.closes())
+            buf.replace_last(*row)
+            result = BarWrite.REPLACED
+        elif ts in buf:
+            return BarWrite.UNCHANGED
+        else:
+            if not buf.insert(ts, *row):
+                return BarWrite.UNCHANGED
+            if is_daily:
+                state.indicators.rebuild(buf.closes())
+            result = BarWrite.INSERTED
+
+        if not is_daily:
+            if result == BarWrite.APPENDED:
+                state.resampler.on_append(ts, *row)
+            elif result == BarWrite.REPLACED:
+                state.resampler.on_replace(ts, last, (ts,) + row)
+            else:
+                state.resampler.on_insert((ts,) + row, buf)
+
+            if result == BarWrite.REPLACED:
+                self._revise_session(state, bar, prev_volume=last[5])
+            else:
+                self._update_session(state, bar)
+        return result
 
     def _update_session(self, state: SymbolState, bar: PriceBar):
         """Update intraday session high/low/volume."""
         today = bar.timestamp.strftime("%Y-%m-%d")
+        if state.session_date is not None and today < state.session_date:
+            return  # late bar from an earlier session
         if state.session_date != today:
             # New session
             state.session_date = today
@@ -94,58 +289,95 @@ class MarketStateManager:
             state.session_low = min(state.session_low, bar.low)
             state.session_volume += bar.volume
 
+    def _revise_session(self, state: SymbolState, bar: PriceBar, prev_volume: int):
+        """The forming 1m bar was updated: swap its volume, widen high/low."""
+        if state.session_date != bar.timestamp.strftime("%Y-%m-%d"):
+            return
+        state.session_high = max(state.session_high, bar.high)
+        state.session_low = min(state.session_low, bar.low)
+        state.session_volume += bar.volume - prev_volume
+
     async def get_snapshot(self, symbol: str) -> Optional[MarketSnapshot]:
-        """Compute snapshot for a symbol."""
+        """
+        Snapshot for a symbol, cached per data version.
+        The same object is returned until new bars arrive (or staleness flips),
+        so callers must treat it as read-only.
+        """
         state = self._states.get(symbol.upper() if symbol else symbol)
         if not state:
             return None
+        is_stale = self._is_stale(state)
+        if state._snapshot_key == (state.version, state.last_updated, is_stale):
+            return state._snapshot
 
         async with state.lock:
-            last_bar = state.bars_1m[-1] if state.bars_1m else (
-                state.bars_daily[-1] if state.bars_daily else None
-            )
-            if not last_bar:
-                return None
-
-            # Compute prev_close from daily
-            prev_close = 0.0
-            if len(state.bars_daily) >= 2:
-                prev_close = list(state.bars_daily)[-2].close
-            elif state.bars_daily:
-                prev_close = list(state.bars_daily)[-1].close
-
-            last_price = last_bar.close
-            change_pct = ((last_price - prev_close) / prev_close * 100) if prev_close else 0.0
-
-            # Technical indicators from daily bars
-            daily_closes = [b.close for b in state.bars_daily]
-            ma20 = self._calc_ma(daily_closes, 20)
-            ma50 = self._calc_ma(daily_closes, 50)
-            rsi14 = self._calc_rsi(daily_closes, 14)
-
-            # Stale detection
-            is_stale = False
-            if state.last_updated:
-                elapsed = (datetime.utcnow() - state.last_updated).total_seconds()
-                is_stale = elapsed > self.stale_threshold
-
-            return MarketSnapshot(
-                symbol=symbol,
-                last_price=last_price,
-                open_price=state.session_open,
-                high_price=state.session_high,
-                low_price=state.session_low if state.session_low != float('inf') else 0.0,
-                volume=state.session_volume,
-                change_pct=round(change_pct, 2),
-                prev_close=prev_close,
-                ma20=ma20,
-                ma50=ma50,
-                rsi14=rsi14,
-                last_updated=state.last_updated,
-                is_stale=is_stale,
-                bar_count_1m=len(state.bars_1m),
-                bar_count_daily=len(state.bars_daily),
-            )
+            return self._cache_snapshot(state, is_stale)
+
+    def get_cached_snapshot(self, symbol: str) -> Optional[MarketSnapshot]:
+        """
+        get_snapshot() for synchronous callers on the event loop (shared-state
+        publisher): same per-version cache, no lock, since no writer awaits
+        while holding one.
+        """
+        state = self._states.get(symbol.upper() if symbol else symbol)
+        if not state:
+            return None
+        is_stale = self._is_stale(state)
+        if state._snapshot_key == (state.version, state.last_updated, is_stale):
+            return state._snapshot
+        return self._cache_snapshot(state, is_stale)
+
+    def _is_stale(self, state: SymbolState) -> bool:
+        if not state.last_updated:
+            return False
+        elapsed = (datetime.utcnow() - state.last_updated).total_seconds()
+        return elapsed > self.stale_threshold
+
+    def _cache_snapshot(self, state: SymbolState, is_stale: bool) -> Optional[MarketSnapshot]:
+        snapshot = self._build_snapshot(state, is_stale)
+        state._snapshot = snapshot
+        state._snapshot_key = (state.version, state.last_updated, is_stale)
+        return snapshot
+
+    def _build_snapshot(self, state: SymbolState, is_stale: bool) -> Optional[MarketSnapshot]:
+        """Build a MarketSnapshot from state. Caller holds the lock."""
+        last_price = state.bars_1m.last_close()
+        if last_price is None:
+            last_price = state.bars_daily.last_close()
+        if last_price is None:
+            return None
+
+        # Compute prev_close from daily
+        prev_close = 0.0
+        if len(state.bars_daily) >= 2:
+            prev_close = state.bars_daily.last_close(2)
+        elif len(state.bars_daily):
+            prev_close = state.bars_daily.last_close()
+
+        change_pct = ((last_price - prev_close) / prev_close * 100) if prev_close else 0.0
+
+        # Technical indicators, maintained on append
+        ma20 = state.indicators.ma[20]
+        ma50 = state.indicators.ma[50]
+        rsi14 = state.indicators.rsi
+
+        return MarketSnapshot(
+            symbol=state.symbol,
+            last_price=last_price,
+            open_price=state.session_open,
+            high_price=state.session_high,
+            low_price=state.session_low if state.session_low != float('inf') else 0.0,
+            volume=state.session_volume,
+            change_pct=round(change_pct, 2),
+            prev_close=prev_close,
+            ma20=ma20,
+            ma50=ma50,
+            rsi14=rsi14,
+            last_updated=state.last_updated,
+            is_stale=is_stale,
+            bar_count_1m=len(state.bars_1m),
+            bar_count_daily=len(state.bars_daily),
+        )
 
     async def get_recent_bars(
         self, symbol: str, timeframe: Timeframe, n: int = 20
@@ -156,9 +388,44 @@ class MarketStateManager:
             return []
 
         async with state.lock:
-            source = state.bars_1m if timeframe == Timeframe.INTRADAY_1M else state.bars_daily
-            bars = list(source)
-            return bars[-n:]
+            return state.buffer_for(timeframe).to_bars(symbol, timeframe, n)
+
+    async def get_recent_columns(
+        self, symbol: str, timeframe: Timeframe, n: int = 20
+    ) -> Optional[BarColumns]:
+        """
+        Get most recent n bars as column arrays, without building PriceBar objects.
+        Arrays are read-only views, valid until the next update for this symbol.
+        """
+        state = self._states.get(symbol)
+        if not state:
+            return None
+
+        async with state.lock:
+            return state.buffer_for(timeframe).columns(n)
+
+    async def get_bar_matrix(
+        self, symbols: List[str], timeframe: Timeframe, n: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Bars of many symbols stacked into (symbols, n) arrays (open/high/low/
+        close/volume), newest bar last, left-padded with NaN. Feed to indicators.py
+        to compute the whole universe in one call. Unknown symbols are all-NaN rows.
+        """
+        columns = []
+        for symbol in symbols:
+            state = self._states.get(symbol)
+            if not state:
+                columns.append(None)
+                continue
+            async with state.lock:
+                columns.append(state.buffer_for(timeframe).columns(n))
+        if n is None:
+            n = {
+                Timeframe.INTRADAY_1M: self.rolling_window_1m,
+                Timeframe.DAILY: self.rolling_window_daily,
+            }.get(timeframe, self.rolling_window_resampled)
+        return stack_columns(columns, n)
 
     async def get_all_snapshots(self) -> List[MarketSnapshot]:
         """Get snapshots for all tracked symbols."""
@@ -172,23 +439,24 @@ class MarketStateManager:
     def get_tracked_symbols(self) -> List[str]:
         return list(self._states.keys())
 
-    @staticmethod
-    def _calc_ma(closes: List[float], period: int) -> Optional[float]:
-        if len(closes) < period:
-            return None
-        return round(sum(closes[-period:]) / period, 2)
+    def get_symbol_state(self, symbol: str) -> Optional[SymbolState]:
+        """
+        Live state of one symbol, for synchronous readers on the event loop
+        (snapshot / shared-state writers, backfill). Writers never await while
+        holding a symbol lock, so code that does not await sees it consistent.
+        Read-only: mutate through update_bars() / load_symbol().
+        """
+        return self._states.get(symbol)
 
-    @staticmethod
-    def _calc_rsi(closes: List[float], period: int = 14) -> Optional[float]:
-        if len(closes) < period + 1:
+    def get_symbol_info(self, symbol: str) -> Optional[Dict]:
+        """Bar counts, version and freshness for one symbol (ops/debug views)."""
+        state = self._states.get(symbol)
+        if not state:
             return None
-        deltas = [closes[i] - closes[i - 1] for i in range(1, len(closes))]
-        recent = deltas[-(period):]
-        gains = [d for d in recent if d > 0]
-        losses = [-d for d in recent if d < 0]
-        avg_gain = sum(gains) / period if gains else 0
-        avg_loss = sum(losses) / period if losses else 0
-        if avg_loss == 0:
-            return 100.0
-        rs = avg_gain / avg_loss
-        return round(100 - (100 / (1 + rs)), 2)
+        return {
+            "bars_1m": len(state.bars_1m),
+            "bars_daily": len(state.bars_daily),
+            "bars_resampled": {tf.value: len(buf) for tf, buf in state.resampler.buffers.items()},
+            "version": state.version,
+            "last_updated": state.last_updated,
+        }
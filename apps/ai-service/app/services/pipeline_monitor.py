@@ -67,6 +67,7 @@ class PipelineMonitor:
         insight_engine=None,
         alert_evaluator=None,
         ai_explain_service=None,
+        insight_scheduler=None,
     ):
         """Register service references for status reporting."""
         if polling_service:
@@ -79,6 +80,8 @@ class PipelineMonitor:
             self._alert_evaluator = alert_evaluator
         if ai_explain_service:
             self._ai_explain_service = ai_explain_service
+        if insight_scheduler:
+            self._insight_scheduler = insight_scheduler
 
     def get_full_status(
         self,
@@ -128,16 +131,17 @@ class PipelineMonitor:
             tracked = state_manager.get_tracked_symbols()
             stale_count = 0
             for sym in tracked:
-                st = state_manager._states.get(sym)
-                if st and st.last_updated:
+                info = state_manager.get_symbol_info(sym)
+                if info and info["last_updated"]:
                     from datetime import datetime, timedelta
-                    elapsed = (datetime.utcnow() - st.last_updated).total_seconds()
+                    elapsed = (datetime.utcnow() - info["last_updated"]).total_seconds()
                     if elapsed > state_manager.stale_threshold:
                         stale_count += 1
             state_status = {
                 "available": True,
                 "symbols_in_state": len(tracked),
                 "stale_symbols": stale_count,
+                "version": getattr(state_manager, "version", 0),
             }
 
         # Insight Engine
@@ -151,7 +155,11 @@ class PipelineMonitor:
                 "insights_deduplicated": ie_stats.get("insights_deduplicated", 0),
                 "analyses_run": ie_stats.get("analyses_run", 0),
                 "insights_by_code": ie_stats.get("insights_by_code", {}),
+                "detectors": ie_stats.get("detectors", {}),
             }
+            insight_scheduler = getattr(self, "_insight_scheduler", None)
+            if insight_scheduler:
+                insight_status["scheduler"] = insight_scheduler.get_stats()
 
         # Alert Evaluator
         alert_status = {"available": False}
@@ -0,0 +1,56 @@
+"""
+Async token-bucket rate limiter.
+One bucket is shared by every caller that spends the same upstream quota
+(e.g. all SSI FastConnect requests), so concurrent fetchers can never exceed
+it together. Waiters are served in FIFO order.
+"""
+
+import asyncio
+import time
+from typing import Dict
+
+
+class TokenBucket:
+    """`rate` tokens per second, bursting up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self._stats = {
+            "acquired": 0,
+            "waits": 0,
+            "wait_ms_total": 0.0,
+        }
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0):
+        """Wait until `tokens` are available, then spend them."""
+        if tokens > self.capacity:
+            raise ValueError("cannot acquire more tokens than the bucket holds")
+        async with self._lock:
+            self._refill()
+            if self._tokens < tokens:
+                wait = (tokens - self._tokens) / self.rate
+                self._stats["waits"] += 1
+                self._stats["wait_ms_total"] += wait * 1000
+                await asyncio.sleep(wait)
+                self._refill()
+            self._tokens -= tokens
+            self._stats["acquired"] += 1
+
+    def get_stats(self) -> Dict:
+        return {
+            **self._stats,
+            "wait_ms_total": round(self._stats["wait_ms_total"], 1),
+            "rate": self.rate,
+            "capacity": self.capacity,
+        }
@@ -0,0 +1,174 @@
+"""
+Incremental MA20/MA50/RSI14 for the Market State Manager.
+Indicators are updated when a daily bar is appended, so snapshots read
+cached values in O(1) instead of rescanning the daily window. Formulas and
+rounding come from indicators.py (scalar fast path).
+
+Modes:
+  - "exact":  simple-average RSI + plain window sums, recomputed over the
+              last max(MA period, RSI period + 1) closes (51) on each append:
+              O(51) per append, not O(1), but bit-for-bit identical to the
+              original on-demand math (detector thresholds unchanged).
+  - "wilder": running sums for the MAs and Wilder-smoothed avg gain/loss
+              for RSI. O(1) per append regardless of period.
+
+"exact" stays the default: snapshot RSI feeds the overbought/oversold
+detectors, and Wilder values would move their thresholds. The O(51) cost is
+paid once per daily-bar write (append or forming-bar update), not per 1m bar,
+so it is small next to the fetch it follows. Set STATE_INDICATOR_MODE=wilder
+to trade v1 parity for O(1).
+"""
+
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.indicators import calc_ma, calc_rsi, rsi_from_averages
+
+INDICATOR_MODES = ("exact", "wilder")
+
+# Wilder mode: re-sum MA windows exactly every N appends to cap float drift
+_REANCHOR_EVERY = 1000
+
+
+class RollingIndicators:
+    """
+    Daily-close indicators for one symbol, maintained bar by bar.
+
+    The owner calls `append(close, window)` *before* writing the bar into its
+    ring buffer, passing the closes currently held (oldest first). Readiness
+    follows the buffer: an MA is only reported once the buffer holds
+    `period` closes, exactly like the on-demand calculation.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        ma_periods: Tuple[int, ...] = (20, 50),
+        rsi_period: int = 14,
+        mode: str = "exact",
+    ):
+        if mode not in INDICATOR_MODES:
+            raise ValueError(f"Unknown indicator mode: {mode}")
+        self.capacity = capacity
+        self.ma_periods = ma_periods
+        self.rsi_period = rsi_period
+        self.mode = mode
+
+        self.ma: Dict[int, Optional[float]] = {p: None for p in ma_periods}
+        self.rsi: Optional[float] = None
+
+        # Wilder mode state
+        self._sums: Dict[int, float] = {p: 0.0 for p in ma_periods}
+        self._appends = 0
+        self._last_close: Optional[float] = None
+        self._n_deltas = 0
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+        self._undo: Optional[Tuple[float, float, int, Optional[float]]] = None
+
+    def append(self, close: float, window: np.ndarray):
+        """Account for a new close; `window` holds the closes before it."""
+        size_after = min(len(window) + 1, self.capacity)
+
+        if self.mode == "exact":
+            closes = self._tail(window, keep=self._exact_tail - 1)
+            closes.append(close)
+            self._recompute(closes[-size_after:])
+        else:
+            self._append_wilder(close, window, size_after)
+
+    def replace_last(self, close: float, window: np.ndarray):
+        """
+        The newest close changed (forming bar). Unlike append(), `window` holds
+        the closes *including* the old newest close: window[-1] is the value
+        being replaced.
+        """
+        if self.mode == "exact":
+            closes = self._tail(window, keep=self._exact_tail)
+            closes[-1] = close
+            self._recompute(closes)
+            return
+
+        old = float(window[-1])
+        for p in self.ma_periods:
+            self._sums[p] += close - old
+            self.ma[p] = round(self._sums[p] / p, 2) if len(window) >= p else None
+        if self._undo is not None:
+            self._avg_gain, self._avg_loss, self._n_deltas, self._last_close = self._undo
+        self._step_rsi(close)
+
+    def rebuild(self, window: np.ndarray):
+        """Recompute from scratch after an out-of-order insert. O(len(window))."""
+        self.ma = {p: None for p in self.ma_periods}
+        self.rsi = None
+        self._sums = {p: 0.0 for p in self.ma_periods}
+        self._last_close = None
+        self._n_deltas = 0
+        self._avg_gain = 0.0
+        self._avg_loss = 0.0
+        self._undo = None
+        if self.mode == "exact":
+            self._recompute(self._tail(window, keep=self._exact_tail))
+            return
+        for i in range(len(window)):
+            self.append(float(window[i]), window[:i])
+
+    # ============================================
+    # Internals
+    # ============================================
+
+    @property
+    def _exact_tail(self) -> int:
+        return max(self.ma_periods + (self.rsi_period + 1,))
+
+    @staticmethod
+    def _tail(window: np.ndarray, keep: int) -> List[float]:
+        return window[-keep:].tolist() if keep > 0 else []
+
+    def _recompute(self, closes: List[float]):
+        for p in self.ma_periods:
+            self.ma[p] = calc_ma(closes, p)
+        self.rsi = calc_rsi(closes, self.rsi_period)
+
+    def _append_wilder(self, close: float, window: np.ndarray, size_after: int):
+        self._appends += 1
+        reanchor = self._appends % _REANCHOR_EVERY == 0
+        n = len(window)
+        for p in self.ma_periods:
+            if reanchor:
+                tail = self._tail(window, keep=min(p, size_after) - 1)
+                self._sums[p] = math.fsum(tail + [close])
+            else:
+                # The close leaving a p-window is window[-p] (if the window is that long)
+                if n >= p:
+                    self._sums[p] -= float(window[-p])
+                self._sums[p] += close
+            self.ma[p] = round(self._sums[p] / p, 2) if size_after >= p else None
+        self._step_rsi(close)
+
+    def _step_rsi(self, close: float):
+        """One Wilder step; remembers the prior state so the step can be redone."""
+        self._undo = (self._avg_gain, self._avg_loss, self._n_deltas, self._last_close)
+        if self._last_close is not None:
+            delta = close - self._last_close
+            gain = delta if delta > 0 else 0.0
+            loss = -delta if delta < 0 else 0.0
+            period = self.rsi_period
+            self._n_deltas += 1
+            if self._n_deltas <= period:
+                # Seed phase: plain sums, averaged once `period` deltas are in
+                self._avg_gain += gain
+                self._avg_loss += loss
+                if self._n_deltas == period:
+                    self._avg_gain /= period
+                    self._avg_loss /= period
+            else:
+                self._avg_gain = (self._avg_gain * (period - 1) + gain) / period
+                self._avg_loss = (self._avg_loss * (period - 1) + loss) / period
+            self.rsi = (
+                rsi_from_averages(self._avg_gain, self._avg_loss)
+                if self._n_deltas >= period else None
+            )
+        self._last_close = close
@@ -0,0 +1,651 @@
+"""
+Shared-memory market state for multi-worker deployments.
+One process (the writer) owns polling and the MarketStateManager, and publishes
+every changed symbol into a `multiprocessing.shared_memory` segment. API workers
+attach a SharedStateReader, which serves the same read API as the manager
+straight from the segment: no polling, no per-worker copy of the state.
+
+Segment layout (little-endian, fixed at creation):
+  header  64 bytes: magic, format version, slot/capacity sizes, writer pid, state version
+  slots   one fixed-size record per symbol, assigned on first publish, never reused
+
+Each record starts with a sequence counter (seqlock): the writer makes it odd
+while rewriting the record and even when done. Readers retry, backing off, until they see
+the same even value before and after reading, so they never see a torn record;
+a record that stays busy serves its last good meta (or nothing) instead.
+
+Roles (STATE_SHARED_MODE):
+  - "writer": create the segment, poll, publish
+  - "reader": attach to the segment, serve reads only
+  - "auto":   the first worker to create the segment becomes the writer, the
+              rest attach as readers (`uvicorn --workers N`)
+"""
+
+import logging
+import os
+import time
+from datetime import datetime
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.models.insight_models import MarketSnapshot, PriceBar, Timeframe
+from app.services.bar_buffer import BarColumns, from_epoch_us, to_epoch_us
+from app.services.bar_resampler import BarResampler
+from app.services.indicators import stack_columns
+from app.services.state_snapshot import BAR_DTYPE
+
+logger = logging.getLogger(__name__)
+
+SHARED_MODES = ("off", "writer", "reader", "auto")
+
+MAGIC = b"STMSHARE"
+FORMAT_VERSION = 1
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("format", "<u4"),
+    ("max_symbols", "<u4"),
+    ("count", "<u4"),
+    ("cap_1m", "<u4"),
+    ("cap_daily", "<u4"),
+    ("closed", "<u4"),
+    ("writer_pid", "<i8"),
+    ("published_at_us", "<i8"),
+    ("version", "<u8"),
+    ("_reserved", "V8"),
+])  # 64 bytes
+
+# Snapshot fields, published alongside the bars so readers never recompute them.
+# NaN encodes None for indicators; NaN last_price means "no snapshot yet".
+META_DTYPE = np.dtype([
+    ("version", "<u8"),
+    ("symbol", "S16"),
+    ("n_1m", "<u4"),
+    ("n_daily", "<u4"),
+    ("last_updated_us", "<i8"),
+    ("last_price", "<f8"),
+    ("prev_close", "<f8"),
+    ("change_pct", "<f8"),
+    ("open_price", "<f8"),
+    ("high_price", "<f8"),
+    ("low_price", "<f8"),
+    ("volume", "<i8"),
+    ("ma20", "<f8"),
+    ("ma50", "<f8"),
+    ("rsi14", "<f8"),
+], align=True)
+
+# Reader retries on a record that keeps changing under it: the first
+# _SPIN_RETRIES only yield the CPU, the rest sleep _BACKOFF_BASE s doubling up
+# to _BACKOFF_MAX s (~10 ms in total) before falling back to the last good copy.
+_MAX_READ_RETRIES = 16
+_SPIN_RETRIES = 4
+_BACKOFF_BASE = 50e-6
+_BACKOFF_MAX = 2e-3
+
+# Segments created by this process (their resource tracker registration is the writer's)
+_OWNED: set = set()
+
+
+def slot_dtype(cap_1m: int, cap_daily: int) -> np.dtype:
+    return np.dtype([
+        ("seq", "<u8"),
+        ("meta", META_DTYPE),
+        ("bars_1m", BAR_DTYPE, (cap_1m,)),
+        ("bars_daily", BAR_DTYPE, (cap_daily,)),
+    ], align=True)
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _opt(value: Optional[float]) -> float:
+    return np.nan if value is None else value
+
+
+def _unopt(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+
+class _Segment:
+    """Header + slot views over one shared memory block."""
+
+    def __init__(self, shm: shared_memory.SharedMemory):
+        self.shm = shm
+        self.header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=shm.buf)[0]
+        self.dtype = slot_dtype(int(self.header["cap_1m"]), int(self.header["cap_daily"]))
+        self.slots = np.ndarray(
+            (int(self.header["max_symbols"]),), dtype=self.dtype,
+            buffer=shm.buf, offset=HEADER_DTYPE.itemsize,
+        )
+
+    @staticmethod
+    def size_for(max_symbols: int, cap_1m: int, cap_daily: int) -> int:
+        return HEADER_DTYPE.itemsize + max_symbols * slot_dtype(cap_1m, cap_daily).itemsize
+
+    def close(self):
+        # Drop our numpy views first; SharedMemory.close() refuses while buffers are exported
+        self.header = None
+        self.slots = None
+        self.shm.close()
+
+
+# ============================================
+# Writer
+# ============================================
+
+class SharedStateWriter:
+    """Publishes changed symbols from a MarketStateManager into shared memory."""
+
+    def __init__(self, segment: _Segment):
+        self._seg = segment
+        self._slots: Dict[str, int] = {}
+        self._cursor = 0
+        self._stats = {
+            "publishes": 0,
+            "records_written": 0,
+            "records_dropped": 0,
+            "last_publish_ms": None,
+        }
+
+    @classmethod
+    def create(
+        cls, name: str, max_symbols: int, cap_1m: int, cap_daily: int
+    ) -> "SharedStateWriter":
+        """Create the segment, replacing any leftover one with the same name."""
+        size = _Segment.size_for(max_symbols, cap_1m, cap_daily)
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        return cls(cls._init_segment(shm, max_symbols, cap_1m, cap_daily))
+
+    @staticmethod
+    def _init_segment(
+        shm: shared_memory.SharedMemory, max_symbols: int, cap_1m: int, cap_daily: int
+    ) -> _Segment:
+        _OWNED.add(shm._name)
+        header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=shm.buf)
+        header[0] = np.zeros((), dtype=HEADER_DTYPE)
+        header["max_symbols"] = max_symbols
+        header["cap_1m"] = cap_1m
+        header["cap_daily"] = cap_daily
+        header["writer_pid"] = os.getpid()
+        header["format"] = FORMAT_VERSION
+        header["magic"] = MAGIC  # last: readers check it before trusting the rest
+        del header
+        return _Segment(shm)
+
+    @property
+    def name(self) -> str:
+        return self._seg.shm.name
+
+    def publish(self, state_manager) -> int:
+        """
+        Copy every symbol changed since the last publish into its slot.
+        Synchronous with no awaits, so it sees a consistent state on the event loop.
+        Returns the number of records written.
+        """
+        start = time.perf_counter()
+        symbols = state_manager.changed_since(self._cursor)
+        self._cursor = state_manager.version
+        header = self._seg.header
+        written = 0
+
+        for symbol in symbols:
+            slot = self._slots.get(symbol)
+            if slot is None:
+                if len(self._slots) >= len(self._seg.slots):
+                    if not self._stats["records_dropped"]:
+                        logger.warning("Shared state full (%d symbols); %s and later symbols "
+                                       "are not published", len(self._slots), symbol)
+                    self._stats["records_dropped"] += 1
+                    continue
+                slot = len(self._slots)
+                self._slots[symbol] = slot
+            self._write_slot(self._seg.slots[slot], state_manager.get_symbol_state(symbol),
+                             state_manager.get_cached_snapshot(symbol))
+            written += 1
+            if slot >= int(header["count"]):
+                header["count"] = slot + 1
+
+        header["version"] = self._cursor
+        header["published_at_us"] = to_epoch_us(datetime.utcnow())
+        self._stats["publishes"] += 1
+        self._stats["records_written"] += written
+        self._stats["last_publish_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return written
+
+    @staticmethod
+    def _write_slot(rec, state, snap):
+        rec["seq"] += 1  # odd: write in progress
+
+        meta = rec["meta"]
+        meta["version"] = state.version
+        meta["symbol"] = state.symbol.encode()[:16]
+        meta["last_updated_us"] = to_epoch_us(state.last_updated) if state.last_updated else 0
+        if snap is None:
+            meta["last_price"] = np.nan
+        else:
+            meta["last_price"] = snap.last_price
+            meta["prev_close"] = snap.prev_close
+            meta["change_pct"] = snap.change_pct
+            meta["open_price"] = snap.open_price
+            meta["high_price"] = snap.high_price
+            meta["low_price"] = snap.low_price
+            meta["volume"] = snap.volume
+            meta["ma20"] = _opt(snap.ma20)
+            meta["ma50"] = _opt(snap.ma50)
+            meta["rsi14"] = _opt(snap.rsi14)
+
+        for field, count, buf in (
+            ("bars_1m", "n_1m", state.bars_1m),
+            ("bars_daily", "n_daily", state.bars_daily),
+        ):
+            cols = buf.columns()
+            n = min(len(cols), rec[field].shape[0])
+            meta[count] = n
+            bars = rec[field]
+            bars["ts"][:n] = cols.timestamp[len(cols) - n:]
+            bars["open"][:n] = cols.open[len(cols) - n:]
+            bars["high"][:n] = cols.high[len(cols) - n:]
+            bars["low"][:n] = cols.low[len(cols) - n:]
+            bars["close"][:n] = cols.close[len(cols) - n:]
+            bars["volume"][:n] = cols.volume[len(cols) - n:]
+
+        rec["seq"] += 1  # even: consistent
+
+    def close(self, unlink: bool = True):
+        """Mark the segment closed so readers detach, then release it."""
+        if self._seg is None:
+            return
+        self._seg.header["closed"] = 1
+        shm = self._seg.shm
+        self._seg.close()
+        self._seg = None
+        if unlink:
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+            _OWNED.discard(shm._name)
+
+    def get_stats(self) -> Dict:
+        return {
+            **self._stats,
+            "role": "writer",
+            "symbols_published": len(self._slots),
+            "max_symbols": len(self._seg.slots) if self._seg is not None else 0,
+        }
+
+
+# ============================================
+# Reader
+# ============================================
+
+class SharedStateReader:
+    """
+    Read-only MarketStateManager stand-in backed by a writer's segment.
+    Attaches lazily, so workers may start before the writer; detaches when
+    the writer closes the segment or dies, and re-attaches to its successor.
+    """
+
+    def __init__(self, name: str, stale_threshold: int = 300, rolling_window_resampled: int = 60):
+        self.name = name
+        self.stale_threshold = stale_threshold
+        self.rolling_window_resampled = rolling_window_resampled
+        self._seg: Optional[_Segment] = None
+        self._symbols: List[str] = []
+        self._slot_of: Dict[str, int] = {}
+        self._snapshots: Dict[int, Tuple[tuple, Optional[MarketSnapshot]]] = {}
+        # Slot -> last consistent meta record, served when a meta read gives up
+        self._last_meta: Dict[int, np.ndarray] = {}
+        self._last_check = 0.0
+        self._stats = {"attaches": 0, "read_retries": 0, "read_fallbacks": 0}
+
+    # ============================================
+    # Segment lifecycle
+    # ============================================
+
+    def _attach(self) -> bool:
+        try:
+            shm = shared_memory.SharedMemory(name=self.name)
+        except FileNotFoundError:
+            return False
+        # Attaching registers the segment with this process's resource tracker,
+        # which would unlink it when we exit. Only the writer owns it.
+        if shm._name not in _OWNED:
+            resource_tracker.unregister(shm._name, "shared_memory")
+
+        header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=shm.buf)[0]
+        ok = header["magic"] == MAGIC and int(header["format"]) == FORMAT_VERSION
+        del header
+        if not ok:
+            shm.close()
+            return False
+        self._seg = _Segment(shm)
+        self._symbols = []
+        self._slot_of = {}
+        self._snapshots = {}
+        self._last_meta = {}
+        self._stats["attaches"] += 1
+        return True
+
+    def _detach(self):
+        if self._seg is not None:
+            self._seg.close()
+            self._seg = None
+        self._symbols = []
+        self._slot_of = {}
+        self._snapshots = {}
+        self._last_meta = {}
+
+    def _segment(self) -> Optional[_Segment]:
+        """Current segment, (re)attaching at most once per second."""
+        now = time.monotonic()
+        if now - self._last_check >= 1.0:
+            self._last_check = now
+            if self._seg is not None:
+                header = self._seg.header
+                if int(header["closed"]) or not _pid_alive(int(header["writer_pid"])):
+                    self._detach()
+            if self._seg is None:
+                self._attach()
+        return self._seg
+
+    def _sync_symbols(self, seg: _Segment):
+        count = int(seg.header["count"])
+        for slot in range(len(self._symbols), count):
+            meta = self._read(seg, slot, "meta")
+            if meta is None:
+                break  # slot still being written; pick it up on the next sync
+            symbol = meta["symbol"].decode()
+            self._symbols.append(symbol)
+            self._slot_of[symbol] = slot
+
+    def _read(self, seg: _Segment, slot: int, *fields: str) -> Optional[np.ndarray]:
+        """
+        Consistent copy of the given fields of one record (seqlock read).
+        If the record stays busy through every retry, a meta-only read returns
+        the last consistent meta record; anything else (bar windows are too
+        large to keep a spare copy of) returns None.
+        """
+        rec = seg.slots[slot]
+        delay = _BACKOFF_BASE
+        for attempt in range(_MAX_READ_RETRIES):
+            if attempt:
+                self._stats["read_retries"] += 1
+                if attempt <= _SPIN_RETRIES:
+                    time.sleep(0)
+                else:
+                    time.sleep(delay)
+                    delay = min(delay * 2, _BACKOFF_MAX)
+            before = int(rec["seq"])
+            if before & 1:
+                continue
+            view = seg.slots[slot:slot + 1]
+            data = (view[list(fields)] if len(fields) > 1 else view[fields[0]]).copy()[0]
+            if int(rec["seq"]) == before:
+                if fields == ("meta",):
+                    self._last_meta[slot] = data
+                return data
+
+        self._stats["read_fallbacks"] += 1
+        fallback = self._last_meta.get(slot) if fields == ("meta",) else None
+        logger.warning("Shared state slot %d kept changing during read; serving %s",
+                       slot, "last good copy" if fallback is not None else "nothing")
+        return fallback
+
+    def _lookup(self, symbol: str) -> Optional[Tuple[_Segment, int]]:
+        seg = self._segment()
+        if seg is None or not symbol:
+            return None
+        slot = self._slot_of.get(symbol.upper())
+        if slot is None:
+            self._sync_symbols(seg)
+            slot = self._slot_of.get(symbol.upper())
+        return None if slot is None else (seg, slot)
+
+    # ============================================
+    # MarketStateManager read API
+    # ============================================
+
+    @property
+    def version(self) -> int:
+        seg = self._segment()
+        return int(seg.header["version"]) if seg is not None else 0
+
+    def changed_since(self, version: int) -> List[str]:
+        seg = self._segment()
+        if seg is None:
+            return []
+        self._sync_symbols(seg)
+        versions = seg.slots["meta"]["version"][:len(self._symbols)]
+        idx = np.flatnonzero(versions > version)
+        idx = idx[np.argsort(versions[idx], kind="stable")]
+        return [self._symbols[i] for i in idx.tolist()]
+
+    def get_tracked_symbols(self) -> List[str]:
+        seg = self._segment()
+        if seg is None:
+            return []
+        self._sync_symbols(seg)
+        return list(self._symbols)
+
+    async def get_snapshot(self, symbol: str) -> Optional[MarketSnapshot]:
+        found = self._lookup(symbol)
+        if found is None:
+            return None
+        seg, slot = found
+        meta = self._read(seg, slot, "meta")
+        if meta is None or np.isnan(meta["last_price"]):
+            return None
+
+        last_us = int(meta["last_updated_us"])
+        last_updated = from_epoch_us(last_us) if last_us else None
+        is_stale = False
+        if last_updated:
+            is_stale = (datetime.utcnow() - last_updated).total_seconds() > self.stale_threshold
+
+        key = (int(meta["version"]), last_us, is_stale)
+        cached = self._snapshots.get(slot)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        snapshot = MarketSnapshot(
+            symbol=meta["symbol"].decode(),
+            last_price=float(meta["last_price"]),
+            open_price=float(meta["open_price"]),
+            high_price=float(meta["high_price"]),
+            low_price=float(meta["low_price"]),
+            volume=int(meta["volume"]),
+            change_pct=float(meta["change_pct"]),
+            prev_close=float(meta["prev_close"]),
+            ma20=_unopt(meta["ma20"]),
+            ma50=_unopt(meta["ma50"]),
+            rsi14=_unopt(meta["rsi14"]),
+            last_updated=last_updated,
+            is_stale=is_stale,
+            bar_count_1m=int(meta["n_1m"]),
+            bar_count_daily=int(meta["n_daily"]),
+        )
+        self._snapshots[slot] = (key, snapshot)
+        return snapshot
+
+    async def get_all_snapshots(self) -> List[MarketSnapshot]:
+        snapshots = []
+        for symbol in self.get_tracked_symbols():
+            snap = await self.get_snapshot(symbol)
+            if snap:
+                snapshots.append(snap)
+        return snapshots
+
+    def _columns(self, symbol: str, timeframe: Timeframe) -> Optional[BarColumns]:
+        found = self._lookup(symbol)
+        if found is None:
+            return None
+        seg, slot = found
+        is_daily = timeframe == Timeframe.DAILY
+        field = "bars_daily" if is_daily else "bars_1m"
+        data = self._read(seg, slot, "meta", field)
+        if data is None:
+            return None
+        bars = data[field][:int(data["meta"]["n_daily" if is_daily else "n_1m"])]
+        cols = BarColumns(
+            timestamp=bars["ts"], open=bars["open"], high=bars["high"],
+            low=bars["low"], close=bars["close"], volume=bars["volume"],
+        )
+        if timeframe in (Timeframe.INTRADAY_1M, Timeframe.DAILY):
+            return cols
+        resampler = BarResampler(self.rolling_window_resampled, (timeframe,))
+        resampler.load(cols)
+        return resampler.buffers[timeframe].columns()
+
+    async def get_recent_columns(
+        self, symbol: str, timeframe: Timeframe, n: int = 20
+    ) -> Optional[BarColumns]:
+        """Most recent n bars as column arrays (a private copy, safe to keep)."""
+        cols = self._columns(symbol, timeframe)
+        if cols is None:
+            return None
+        k = max(0, min(n, len(cols)))
+        return BarColumns(*(arr[len(arr) - k:] for arr in (
+            cols.timestamp, cols.open, cols.high, cols.low, cols.close, cols.volume,
+        )))
+
+    async def get_recent_bars(
+        self, symbol: str, timeframe: Timeframe, n: int = 20
+    ) -> List[PriceBar]:
+        cols = await self.get_recent_columns(symbol, timeframe, n)
+        if cols is None:
+            return []
+        return [
+            PriceBar(
+                symbol=symbol, timeframe=timeframe, timestamp=from_epoch_us(ts),
+                open=o, high=h, low=l, close=c, volume=v,
+            )
+            for ts, o, h, l, c, v in zip(
+                cols.timestamp.tolist(), cols.open.tolist(), cols.high.tolist(),
+                cols.low.tolist(), cols.close.tolist(), cols.volume.tolist(),
+            )
+        ]
+
+    async def get_bar_matrix(
+        self, symbols: List[str], timeframe: Timeframe, n: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        seg = self._segment()
+        if n is None and seg is not None:
+            n = {
+                Timeframe.INTRADAY_1M: int(seg.header["cap_1m"]),
+                Timeframe.DAILY: int(seg.header["cap_daily"]),
+            }.get(timeframe, self.rolling_window_resampled)
+        return stack_columns([self._columns(s, timeframe) for s in symbols], n or 0)
+
+    def get_symbol_info(self, symbol: str) -> Optional[Dict]:
+        found = self._lookup(symbol)
+        if found is None:
+            return None
+        seg, slot = found
+        meta = self._read(seg, slot, "meta")
+        if meta is None:
+            return None
+        last_us = int(meta["last_updated_us"])
+        return {
+            "bars_1m": int(meta["n_1m"]),
+            "bars_daily": int(meta["n_daily"]),
+            "version": int(meta["version"]),
+            "last_updated": from_epoch_us(last_us) if last_us else None,
+        }
+
+    def close(self):
+        self._detach()
+
+    def get_stats(self) -> Dict:
+        seg = self._seg
+        published_us = int(seg.header["published_at_us"]) if seg is not None else 0
+        return {
+            **self._stats,
+            "role": "reader",
+            "attached": seg is not None,
+            "writer_pid": int(seg.header["writer_pid"]) if seg is not None else None,
+            "symbols": len(self._symbols),
+            "last_publish_at": (
+                from_epoch_us(published_us).isoformat() + "Z" if published_us else None
+            ),
+        }
+
+
+def _writer_alive(name: str) -> bool:
+    """Whether the segment `name` belongs to a live writer (allowing it time to initialize)."""
+    probe = SharedStateReader(name)
+    for _ in range(3):
+        if probe._attach():
+            header = probe._seg.header
+            alive = not int(header["closed"]) and _pid_alive(int(header["writer_pid"]))
+            probe.close()
+            return alive
+        time.sleep(0.05)
+    return False
+
+
+def open_shared_state(
+    mode: str,
+    name: str,
+    max_symbols: int,
+    cap_1m: int,
+    cap_daily: int,
+    stale_threshold: int = 300,
+    rolling_window_resampled: int = 60,
+) -> Tuple[Optional[SharedStateWriter], Optional[SharedStateReader]]:
+    """
+    Resolve this process's role. Returns (writer, None), (None, reader) or
+    (None, None) for mode "off".
+    """
+    if mode not in SHARED_MODES:
+        raise ValueError(f"Unknown shared state mode: {mode}")
+    if mode == "off":
+        return None, None
+
+    def reader() -> SharedStateReader:
+        return SharedStateReader(name, stale_threshold, rolling_window_resampled)
+
+    if mode == "reader":
+        return None, reader()
+    if mode == "writer":
+        return SharedStateWriter.create(name, max_symbols, cap_1m, cap_daily), None
+
+    # auto: creating the segment is the election; a dead or closed writer's
+    # segment is taken over
+    size = _Segment.size_for(max_symbols, cap_1m, cap_daily)
+    for _ in range(2):
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            if _writer_alive(name):
+                return None, reader()
+            try:
+                stale = shared_memory.SharedMemory(name=name)
+                stale.close()
+                stale.unlink()
+            except FileNotFoundError:
+                pass
+            continue
+        writer = SharedStateWriter(
+            SharedStateWriter._init_segment(shm, max_symbols, cap_1m, cap_daily)
+        )
+        return writer, None
+    return None, reader()
@@ -0,0 +1,303 @@
+"""
+Async SSI FastConnect Data client.
+
+One shared httpx.AsyncClient (keep-alive, bounded connection pool) for every
+request. The access token is fetched in `start()` and refreshed in the
+background ahead of expiry, so neither connection setup nor token fetches sit
+on the polling path; a 401 triggers one single-flight refresh and a retry.
+Transport errors, 429 and 5xx are retried with full-jitter exponential
+backoff.
+
+OHLC responses are decoded straight into BarColumns (int64 epoch us, float64
+prices). Intraday times are ICT and converted to naive UTC; daily bars are
+stamped at 00:00 of the trading date, like everywhere else in the pipeline.
+
+Endpoints (FastConnect Data v2):
+  POST api/v2/Market/AccessToken   {consumerID, consumerSecret}
+  GET  api/v2/Market/IntradayOhlc  symbol, fromDate, toDate, pageIndex, pageSize, ascending, resollution
+  GET  api/v2/Market/DailyOhlc     symbol, fromDate, toDate, pageIndex, pageSize, ascending
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from app.services.bar_buffer import BarColumns
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATH = "api/v2/Market/AccessToken"
+INTRADAY_PATH = "api/v2/Market/IntradayOhlc"
+DAILY_PATH = "api/v2/Market/DailyOhlc"
+
+ICT_OFFSET_US = 7 * 3600 * 1_000_000
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
+
+_FORCE = object()
+
+
+class SSIError(Exception):
+    """Non-retryable SSI API error (bad request, rejected credentials, ...)."""
+
+
+def _token_expiry(token: str) -> Optional[float]:
+    """`exp` claim of a JWT access token (epoch seconds), if it has one."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except Exception:
+        return None
+
+
+def _ssi_date(d: date) -> str:
+    return d.strftime("%d/%m/%Y")
+
+
+def decode_ohlc(rows: List[Dict], intraday: bool) -> BarColumns:
+    """SSI OHLC rows (any order, numbers possibly as strings) -> BarColumns, oldest first."""
+    if not rows:
+        empty = np.empty(0)
+        return BarColumns(np.empty(0, dtype=np.int64), empty, empty, empty, empty,
+                          np.empty(0, dtype=np.int64))
+    # TradingDate "dd/mm/yyyy" (+ Time "HH:MM:SS") -> ISO -> datetime64
+    iso = [
+        f"{r['TradingDate'][6:10]}-{r['TradingDate'][3:5]}-{r['TradingDate'][0:2]}"
+        + (f"T{r['Time']}" if intraday else "")
+        for r in rows
+    ]
+    ts = np.array(iso, dtype="datetime64[us]").astype(np.int64)
+    if intraday:
+        ts -= ICT_OFFSET_US
+
+    def col(name):
+        return np.asarray([r[name] for r in rows], dtype=np.float64)
+
+    order = np.argsort(ts, kind="stable")
+    return BarColumns(
+        ts[order],
+        col("Open")[order],
+        col("High")[order],
+        col("Low")[order],
+        col("Close")[order],
+        col("Volume")[order].astype(np.int64),
+    )
+
+
+class SSIFastConnectClient:
+    """Pooled FastConnect Data client with cached, proactively refreshed token."""
+
+    def __init__(
+        self,
+        consumer_id: str,
+        consumer_secret: str,
+        base_url: str = "https://fc-data.ssi.com.vn",
+        max_connections: int = 8,
+        timeout: float = 10.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.25,
+        backoff_cap: float = 4.0,
+        token_refresh_margin: float = 300.0,
+        token_ttl_fallback: float = 1800.0,
+        daily_lookback_factor: float = 1.6,
+        rate_limiter=None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.consumer_id = consumer_id
+        self.consumer_secret = consumer_secret
+        self.base_url = base_url.rstrip("/") + "/"
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.token_refresh_margin = token_refresh_margin
+        self.token_ttl_fallback = token_ttl_fallback
+        # Calendar days requested per trading day wanted (weekends, holidays)
+        self.daily_lookback_factor = daily_lookback_factor
+        # Retries spend quota too; the first attempt is paced by the caller
+        self.rate_limiter = rate_limiter
+        self._transport = transport
+
+        self._http: Optional[httpx.AsyncClient] = None
+        self._token: Optional[str] = None
+        self._token_expires: float = 0.0
+        self._token_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._stats = {
+            "requests": 0,
+            "retries": 0,
+            "errors": 0,
+            "token_refreshes": 0,
+            "unauthorized": 0,
+            "bars_decoded": 0,
+        }
+
+    # ============================================
+    # Lifecycle
+    # ============================================
+
+    async def start(self):
+        """Open the pool and fetch the first token (off the polling path)."""
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=60.0,
+                ),
+                headers={"Accept": "application/json"},
+                transport=self._transport,
+            )
+        if self._refresh_task is None:
+            # Keeps retrying in the background if the first fetch below fails
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+        if self._token is None:
+            await self._refresh_token(stale=None)
+
+    async def close(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    # ============================================
+    # Token
+    # ============================================
+
+    async def _refresh_token(self, stale=_FORCE):
+        """
+        Fetch a new token. With `stale`, only if the cached token is still that
+        one, so concurrent callers that saw the same bad token share one fetch.
+        """
+        async with self._token_lock:
+            if stale is not _FORCE and self._token != stale:
+                return  # someone else refreshed while we waited
+            response = await self._send(
+                "POST", TOKEN_PATH, auth=False,
+                json={"consumerID": self.consumer_id, "consumerSecret": self.consumer_secret},
+            )
+            token = (response.get("data") or {}).get("accessToken")
+            if not token:
+                raise SSIError(f"SSI token request failed: {response.get('message')}")
+            self._token = token
+            self._token_expires = _token_expiry(token) or time.time() + self.token_ttl_fallback
+            self._stats["token_refreshes"] += 1
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                wait = self._token_expires - self.token_refresh_margin - time.time()
+                await asyncio.sleep(max(wait, 5.0))
+                if time.time() >= self._token_expires - self.token_refresh_margin:
+                    await self._refresh_token()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error("SSI token refresh failed: %s", e)
+                await asyncio.sleep(10)
+
+    # ============================================
+    # Requests
+    # ============================================
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    async def _send(self, method: str, path: str, auth: bool = True, **kwargs) -> Dict:
+        if self._http is None:
+            raise SSIError("SSI client not started")
+        unauthorized_retry = auth
+        attempt = 0
+        while True:
+            if attempt and self.rate_limiter is not None:
+                await self.rate_limiter.acquire()
+            if auth and self._token is None:
+                await self._refresh_token(stale=None)  # cold start only
+            token = self._token
+            headers = {"Authorization": f"Bearer {token}"} if auth else None
+            self._stats["requests"] += 1
+            try:
+                response = await self._http.request(method, path, headers=headers, **kwargs)
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    self._stats["errors"] += 1
+                    raise
+                error = e
+            else:
+                if response.status_code == 401 and unauthorized_retry:
+                    self._stats["unauthorized"] += 1
+                    unauthorized_retry = False
+                    await self._refresh_token(stale=token)
+                    continue
+                if response.status_code in RETRY_STATUS and attempt < self.max_retries:
+                    error = f"HTTP {response.status_code}"
+                else:
+                    if response.status_code >= 400:
+                        self._stats["errors"] += 1
+                        raise SSIError(f"SSI {path}: HTTP {response.status_code}")
+                    body = response.json()
+                    status = body.get("status")
+                    if status is not None and str(status) != "200":
+                        self._stats["errors"] += 1
+                        raise SSIError(f"SSI {path}: {body.get('message')}")
+                    return body
+            self._stats["retries"] += 1
+            delay = self._backoff(attempt)
+            attempt += 1
+            logger.debug("SSI %s failed (%s), retry %d in %.2fs", path, error, attempt, delay)
+            await asyncio.sleep(delay)
+
+    async def _ohlc(self, path: str, params: Dict, intraday: bool) -> BarColumns:
+        body = await self._send("GET", path, params=params)
+        cols = decode_ohlc(body.get("data") or [], intraday)
+        self._stats["bars_decoded"] += len(cols)
+        return cols
+
+    async def get_intraday_ohlc(self, symbol: str, resolution: str = "1", count: int = 60) -> BarColumns:
+        """Newest `count` intraday bars of today's session."""
+        today = _ssi_date((datetime.utcnow() + timedelta(hours=7)).date())
+        return await self._ohlc(INTRADAY_PATH, {
+            "symbol": symbol,
+            "fromDate": today,
+            "toDate": today,
+            "pageIndex": 1,
+            "pageSize": count,
+            "ascending": "false",
+            "resollution": resolution,  # sic: SSI's parameter name
+        }, intraday=True)
+
+    async def get_daily_ohlc(self, symbol: str, count: int = 50) -> BarColumns:
+        """Newest `count` daily bars."""
+        today = (datetime.utcnow() + timedelta(hours=7)).date()
+        since = today - timedelta(days=int(count * self.daily_lookback_factor) + 7)
+        return await self._ohlc(DAILY_PATH, {
+            "symbol": symbol,
+            "fromDate": _ssi_date(since),
+            "toDate": _ssi_date(today),
+            "pageIndex": 1,
+            "pageSize": count,
+            "ascending": "false",
+        }, intraday=False)
+
+    def get_stats(self) -> Dict:
+        return {
+            **self._stats,
+            "connected": self._http is not None,
+            "token_expires_in": (
+                round(self._token_expires - time.time()) if self._token else None
+            ),
+        }
@@ -0,0 +1,299 @@
+"""
+Streaming market-data sources.
+
+A stream source connects to a push feed, turns its messages into PriceBars
+and hands them to the same `set_on_bars_update` callback contract as the
+polling service. With a stream wired in, MarketPollingService becomes the
+fallback: a scheduled poll is skipped while the stream has delivered the
+symbol recently, and resumes by itself for symbols the stream leaves gaps in
+(illiquid names, dropped subscriptions, a dead connection).
+
+Message format (JSON objects, or lists of them):
+  {"type": "tick", "symbol": "FPT", "timestamp": "2024-01-19T02:15:07",
+   "price": 101.5, "volume": 300}
+  {"type": "bar", "symbol": "FPT", "timeframe": "intraday_1m",
+   "timestamp": "2024-01-19T02:15:00", "open": ..., "high": ..., "low": ...,
+   "close": ..., "volume": ...}
+Timestamps are naive UTC like everywhere else in the pipeline. Ticks are
+aggregated into the forming 1m bar; every tick pushes the updated forming bar
+(the state manager replaces a bar with the same timestamp). A feed joined
+mid-session only sees part of the day and of its first minute, so ticks build
+no daily bars (those stay with polling) and the minute a symbol's first tick
+falls in after each (re)connect is not pushed; polling fills it.
+
+Adapters:
+  - SSEStreamSource:       text/event-stream over httpx (`data:` lines)
+  - WebSocketStreamSource: `websockets` client, optional subscribe message
+  - ReplayStreamSource:    recorded messages (list or JSONL file), paced by
+                           their timestamps / `speed`; for tests and demos
+Network adapters reconnect with jittered exponential backoff.
+"""
+
+import abc
+import asyncio
+import json
+import logging
+import random
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Callable, Coroutine, Dict, Iterable, List, Optional, Union
+
+import httpx
+
+from app.models.insight_models import PriceBar, Timeframe
+
+logger = logging.getLogger(__name__)
+
+try:
+    import websockets
+    WEBSOCKETS_AVAILABLE = True
+except ImportError:
+    WEBSOCKETS_AVAILABLE = False
+
+STREAM_KINDS = ("sse", "websocket", "replay")
+
+
+def _parse_ts(value) -> datetime:
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+class TickAggregator:
+    """Ticks -> forming 1m bar per symbol; the partial first minute is held back."""
+
+    def __init__(self):
+        # symbol -> forming bar
+        self._bars: Dict[str, PriceBar] = {}
+        # symbol -> minute of its first tick (missed the ticks before it)
+        self._first_minute: Dict[str, datetime] = {}
+
+    def add(self, symbol: str, ts: datetime, price: float, volume: int) -> List[PriceBar]:
+        minute = ts.replace(second=0, microsecond=0)
+        first = self._first_minute.setdefault(symbol, minute)
+        bar = self._bars.get(symbol)
+        if bar is None or minute > bar.timestamp:
+            bar = PriceBar(symbol=symbol, timeframe=Timeframe.INTRADAY_1M, timestamp=minute,
+                           open=price, high=price, low=price, close=price, volume=volume)
+        elif minute < bar.timestamp:
+            return []  # late tick for a closed bar: already delivered
+        else:
+            bar = bar.model_copy(update={
+                "high": max(bar.high, price),
+                "low": min(bar.low, price),
+                "close": price,
+                "volume": bar.volume + volume,
+            })
+        self._bars[symbol] = bar
+        return [] if minute == first else [bar]
+
+
+class StreamSource(abc.ABC):
+    """Base class: connect, decode messages, push bars; reconnect on failure."""
+
+    kind = "base"
+    reconnect = True
+
+    def __init__(self, reconnect_base: float = 1.0, reconnect_cap: float = 30.0):
+        self.reconnect_base = reconnect_base
+        self.reconnect_cap = reconnect_cap
+        self._aggregator = TickAggregator()
+        self._on_bars_update: Optional[Callable] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        self._connected = False
+        self._stats = {
+            "messages": 0,
+            "ticks": 0,
+            "bars": 0,
+            "ticks_unpushed": 0,
+            "bad_messages": 0,
+            "connects": 0,
+            "disconnects": 0,
+            "last_message_at": None,
+        }
+
+    def set_on_bars_update(self, callback: Callable[[List[PriceBar]], Coroutine]):
+        """Same contract as MarketPollingService.set_on_bars_update."""
+        self._on_bars_update = callback
+
+    @abc.abstractmethod
+    def _messages(self) -> AsyncIterator[Dict]:
+        """Yield decoded JSON messages until the feed ends or fails (an async generator)."""
+
+    def _decode(self, msg: Dict) -> List[PriceBar]:
+        kind = msg.get("type")
+        symbol = str(msg["symbol"]).upper()
+        if kind == "tick":
+            self._stats["ticks"] += 1
+            bars = self._aggregator.add(symbol, _parse_ts(msg["timestamp"]),
+                                        float(msg["price"]), int(msg.get("volume", 0)))
+            if not bars:
+                self._stats["ticks_unpushed"] += 1
+            return bars
+        if kind == "bar":
+            self._stats["bars"] += 1
+            return [PriceBar(
+                symbol=symbol,
+                timeframe=Timeframe(msg.get("timeframe", Timeframe.INTRADAY_1M.value)),
+                timestamp=_parse_ts(msg["timestamp"]),
+                open=msg["open"], high=msg["high"], low=msg["low"], close=msg["close"],
+                volume=msg.get("volume", 0),
+            )]
+        raise ValueError(f"unknown message type {kind!r}")
+
+    async def _handle(self, msg: Dict):
+        self._stats["messages"] += 1
+        self._stats["last_message_at"] = datetime.utcnow().isoformat() + "Z"
+        try:
+            bars = self._decode(msg)
+        except Exception as e:
+            self._stats["bad_messages"] += 1
+            logger.debug("Stream %s: bad message %r: %s", self.kind, msg, e)
+            return
+        if bars and self._on_bars_update:
+            try:
+                await self._on_bars_update(bars)
+            except Exception as e:
+                logger.error("Error in stream on_bars_update callback: %s", e)
+
+    async def _run(self):
+        attempt = 0
+        while self._running:
+            try:
+                self._stats["connects"] += 1
+                self._aggregator = TickAggregator()  # ticks missed while down: first minutes partial again
+                async for msg in self._messages():
+                    self._connected = True
+                    attempt = 0
+                    for item in (msg if isinstance(msg, list) else [msg]):
+                        await self._handle(item)
+                self._connected = False
+                if not self.reconnect:
+                    break
+                self._stats["disconnects"] += 1
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                self._connected = False
+                self._stats["disconnects"] += 1
+                logger.warning("Stream %s disconnected: %s", self.kind, e)
+            delay = random.uniform(0, min(self.reconnect_cap, self.reconnect_base * 2 ** attempt))
+            attempt += 1
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                break
+        self._connected = False
+
+    async def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._task = asyncio.create_task(self._run())
+        logger.info("Stream source %s started", self.kind)
+
+    async def stop(self):
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def wait_closed(self):
+        """Wait for a finite source (replay) to run out."""
+        if self._task:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def get_stats(self) -> Dict:
+        return {
+            **self._stats,
+            "kind": self.kind,
+            "connected": self._connected,
+            "running": self._running,
+        }
+
+
+class SSEStreamSource(StreamSource):
+    """Server-sent events: one JSON message per `data:` line."""
+
+    kind = "sse"
+
+    def __init__(self, url: str, headers: Optional[Dict[str, str]] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+        self.headers = {"Accept": "text/event-stream", **(headers or {})}
+        self._transport = transport
+
+    async def _messages(self) -> AsyncIterator[Dict]:
+        timeout = httpx.Timeout(10.0, read=None)
+        async with httpx.AsyncClient(timeout=timeout, transport=self._transport) as client:
+            async with client.stream("GET", self.url, headers=self.headers) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line.startswith("data:"):
+                        yield json.loads(line[5:].strip())
+
+
+class WebSocketStreamSource(StreamSource):
+    """WebSocket feed of JSON text frames; sends `subscribe` after connecting."""
+
+    kind = "websocket"
+
+    def __init__(self, url: str, subscribe: Optional[Dict] = None, **kwargs):
+        if not WEBSOCKETS_AVAILABLE:
+            raise RuntimeError("websockets package not installed")
+        super().__init__(**kwargs)
+        self.url = url
+        self.subscribe = subscribe
+
+    async def _messages(self) -> AsyncIterator[Dict]:
+        async with websockets.connect(self.url) as ws:
+            if self.subscribe:
+                await ws.send(json.dumps(self.subscribe))
+            async for raw in ws:
+                yield json.loads(raw)
+
+
+class ReplayStreamSource(StreamSource):
+    """Replays recorded messages; `speed` x real time (0 = as fast as possible)."""
+
+    kind = "replay"
+    reconnect = False
+
+    def __init__(self, messages: Union[str, Iterable[Dict]], speed: float = 0.0, **kwargs):
+        super().__init__(**kwargs)
+        self.messages = messages
+        self.speed = speed
+
+    def _load(self) -> Iterable[Dict]:
+        if isinstance(self.messages, str):
+            lines = Path(self.messages).read_text().splitlines()
+            return [json.loads(line) for line in lines if line.strip()]
+        return self.messages
+
+    async def _messages(self) -> AsyncIterator[Dict]:
+        first_ts = None
+        started = time.monotonic()
+        for msg in self._load():
+            if self.speed > 0 and "timestamp" in msg:
+                ts = _parse_ts(msg["timestamp"])
+                first_ts = first_ts or ts
+                due = started + (ts - first_ts).total_seconds() / self.speed
+                delay = due - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            else:
+                await asyncio.sleep(0)
+            yield msg
+
+
+def create_stream_source(kind: str, url: str = "", **kwargs) -> StreamSource:
+    """Build a source from config: sse | websocket (url) or replay (url = JSONL path)."""
+    if kind == "sse":
+        return SSEStreamSource(url, **kwargs)
+    if kind == "websocket":
+        return WebSocketStreamSource(url, **kwargs)
+    if kind == "replay":
+        return ReplayStreamSource(url, **kwargs)
+    raise ValueError(f"Unknown stream kind: {kind}")
@@ -0,0 +1,23 @@
+"""
+Service-role Supabase client shared by the background services
+(history backfill, tier policy interest counts).
+"""
+
+from typing import Optional
+
+try:
+    from supabase import create_client, Client
+    SUPABASE_AVAILABLE = True
+except ImportError:
+    SUPABASE_AVAILABLE = False
+    Client = None
+
+
+def service_client() -> Optional["Client"]:
+    """Service-role Supabase client from settings; None if unavailable or unconfigured."""
+    if not SUPABASE_AVAILABLE:
+        return None
+    from app.config import settings
+    if settings.SUPABASE_URL and settings.SUPABASE_SERVICE_KEY:
+        return create_client(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+    return None
@@ -0,0 +1,330 @@
+"""
+Adaptive polling tiers.
+Scores every polled symbol from recent activity and user interest, then
+promotes the highest scores to HOT / WATCHLIST within a global SSI request
+budget; quiet symbols decay back to DEFAULT.
+
+Score components (summed):
+  - insights: severity weight per insight, halving every `insight_half_life` s
+  - range:    intraday (high - low) / prev close, one point per `range_unit` %
+  - volume:   mean volume of the last `burst_bars` 1m bars over the 1m-window
+              mean, points above 1x
+  - interest: log2(1 + watchlist items + active alerts) for the symbol
+
+Cost of a symbol = REQUESTS_PER_POLL / tier interval (req/s). Everything
+starts at DEFAULT; promotions are granted greedily by score while their extra
+cost fits what DEFAULT leaves of `request_budget`, or `promotion_share` of the
+budget when that is more. A full universe at DEFAULT alone (1,600 x 2 / 60 s)
+already exceeds any budget under the SSI rate limit, so the share keeps
+promotions possible; the rate limiter then slows DEFAULT to make room.
+A promoted symbol keeps its tier for at least `min_hold` seconds so tiers do
+not flap between evaluations. Tiers set outside the policy (add_symbol with a
+non-DEFAULT tier) are manual pins: charged to the budget, never decayed.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.models.insight_models import InsightEvent, InsightSeverity, Timeframe
+from app.services.market_polling_service import REQUESTS_PER_POLL, PollingTier
+from app.services.supabase_client import Client, service_client
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_WEIGHT = {
+    InsightSeverity.LOW: 0.5,
+    InsightSeverity.MEDIUM: 1.0,
+    InsightSeverity.HIGH: 2.0,
+    InsightSeverity.CRITICAL: 3.0,
+}
+
+# Promotion order: fastest tier first
+PROMOTIONS = (PollingTier.HOT, PollingTier.WATCHLIST)
+
+
+class AdaptiveTierPolicy:
+    """Periodic re-tiering of the polling universe within a request budget."""
+
+    def __init__(
+        self,
+        polling_service,
+        state_manager,
+        request_budget: float,
+        promotion_share: float = 0.25,
+        hot_score: float = 3.0,
+        watchlist_score: float = 1.5,
+        insight_half_life: float = 600.0,
+        range_unit: float = 2.0,
+        burst_bars: int = 5,
+        min_hold: float = 300.0,
+        eval_interval: float = 30.0,
+        interest_refresh: float = 600.0,
+        page_size: int = 1000,
+        supabase_client: Optional["Client"] = None,
+    ):
+        self.polling = polling_service
+        self.state_manager = state_manager
+        self.request_budget = request_budget
+        self.promotion_share = promotion_share
+        self.thresholds = {PollingTier.HOT: hot_score, PollingTier.WATCHLIST: watchlist_score}
+        self.insight_half_life = insight_half_life
+        self.range_unit = range_unit
+        self.burst_bars = burst_bars
+        self.min_hold = min_hold
+        self.eval_interval = eval_interval
+        self.interest_refresh = interest_refresh
+        self.page_size = page_size
+        self._supabase = supabase_client
+
+        # Symbol -> [(monotonic time, weight)] of recent insights
+        self._insights: Dict[str, List[Tuple[float, float]]] = defaultdict(list)
+        self._interest: Dict[str, int] = {}
+        self._interest_loaded_at: Optional[float] = None
+        # Symbol -> monotonic time it was last promoted
+        self._promoted_at: Dict[str, float] = {}
+        # Symbol -> tier the policy last set; any other non-DEFAULT tier is a manual pin
+        self._assigned: Dict[str, PollingTier] = {}
+        self._scores: Dict[str, float] = {}
+
+        self._running = False
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            "evaluations": 0,
+            "promotions": 0,
+            "demotions": 0,
+            "budget_limited": 0,
+            "pinned": 0,
+            "over_budget": False,
+            "request_rate": 0.0,
+            "last_eval_ms": None,
+        }
+
+    # ============================================
+    # Inputs
+    # ============================================
+
+    async def record_insight(self, event: InsightEvent):
+        """InsightEngine subscriber: a fresh insight makes its symbol hotter."""
+        weight = SEVERITY_WEIGHT.get(event.severity, 1.0)
+        self._insights[event.symbol.upper()].append((time.monotonic(), weight))
+
+    def set_interest(self, counts: Dict[str, int]):
+        """Watchlist items + active alerts per symbol."""
+        self._interest = {s.upper(): int(n) for s, n in counts.items()}
+        self._interest_loaded_at = time.monotonic()
+
+    def _client(self) -> Optional["Client"]:
+        if self._supabase is None:
+            self._supabase = service_client()
+        return self._supabase
+
+    def load_interest(self) -> Dict[str, int]:
+        """
+        Count watchlist_items and active smart_alerts rows per symbol, paging
+        each table by id (PostgREST caps a single response at ~1,000 rows).
+        """
+        client = self._client()
+        if client is None:
+            return {}
+        counts: Dict[str, int] = defaultdict(int)
+        for table, filters in (("watchlist_items", ()), ("smart_alerts", (("is_active", True),))):
+            last = None  # id of the last row received
+            while True:
+                query = client.table(table).select("id,symbol")
+                for column, value in filters:
+                    query = query.eq(column, value)
+                if last is not None:
+                    query = query.gt("id", last)
+                rows = query.order("id").limit(self.page_size).execute().data or []
+                for row in rows:
+                    if row.get("symbol"):
+                        counts[row["symbol"].upper()] += 1
+                if len(rows) < self.page_size:
+                    break
+                last = rows[-1]["id"]
+        return dict(counts)
+
+    async def _refresh_interest(self, now: float):
+        if self._interest_loaded_at is not None and now - self._interest_loaded_at < self.interest_refresh:
+            return
+        try:
+            self.set_interest(await asyncio.to_thread(self.load_interest))
+        except Exception as e:
+            logger.error("Tier policy: interest refresh failed: %s", e)
+            self._interest_loaded_at = now  # retry at the next refresh, not every evaluation
+
+    # ============================================
+    # Scoring
+    # ============================================
+
+    def _insight_score(self, symbol: str, now: float) -> float:
+        events = self._insights.get(symbol)
+        if not events:
+            return 0.0
+        horizon = self.insight_half_life * 8
+        events[:] = [(t, w) for t, w in events if now - t < horizon]
+        return sum(w * 0.5 ** ((now - t) / self.insight_half_life) for t, w in events)
+
+    def _volume_burst(self, vol: np.ndarray) -> np.ndarray:
+        """Recent / window mean 1m volume minus 1, floored at 0; 0 without data."""
+        def mean(a):
+            n = np.sum(~np.isnan(a), axis=1)
+            return np.where(n > 0, np.nansum(a, axis=1) / np.maximum(n, 1), np.nan)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratio = mean(vol[:, -self.burst_bars:]) / mean(vol)
+        return np.nan_to_num(np.maximum(ratio - 1.0, 0.0), nan=0.0, posinf=0.0)
+
+    async def score(self, symbols: List[str], now: float) -> Dict[str, float]:
+        """Activity + interest score per symbol."""
+        vol = (await self.state_manager.get_bar_matrix(
+            symbols, Timeframe.INTRADAY_1M))["volume"]
+        burst = self._volume_burst(vol)
+
+        scores = {}
+        for i, symbol in enumerate(symbols):
+            value = self._insight_score(symbol, now) + float(burst[i])
+            snap = await self.state_manager.get_snapshot(symbol)
+            if snap and snap.prev_close and not snap.is_stale:
+                range_pct = (snap.high_price - snap.low_price) / snap.prev_close * 100
+                value += max(0.0, range_pct) / self.range_unit
+            value += math.log2(1 + self._interest.get(symbol, 0))
+            scores[symbol] = value
+        return scores
+
+    # ============================================
+    # Assignment
+    # ============================================
+
+    def _cost(self, tier: PollingTier) -> float:
+        return REQUESTS_PER_POLL / self.polling.intervals[tier]
+
+    def _pinned(self, current: Dict[str, PollingTier]) -> Dict[str, PollingTier]:
+        """Non-DEFAULT tiers the policy did not set itself."""
+        return {
+            s: tier for s, tier in current.items()
+            if tier != PollingTier.DEFAULT and self._assigned.get(s) != tier
+        }
+
+    def assign(
+        self, scores: Dict[str, float], current: Dict[str, PollingTier], now: float
+    ) -> Dict[str, PollingTier]:
+        """Greedy budgeted tiering: pins kept, held promotions next, then by descending score."""
+        target = {s: PollingTier.DEFAULT for s in current}
+        spent = self._cost(PollingTier.DEFAULT) * len(current)
+        over = spent > self.request_budget
+        if over and not self._stats["over_budget"]:
+            logger.warning("Tier policy: DEFAULT tier alone needs %.1f req/s > budget %.1f; "
+                           "promotions limited to %.0f%% of the budget", spent,
+                           self.request_budget, self.promotion_share * 100)
+        self._stats["over_budget"] = over
+        limit = max(self.request_budget, spent + self.promotion_share * self.request_budget)
+
+        pinned = self._pinned(current)
+        for symbol, tier in pinned.items():
+            target[symbol] = tier
+            self._promoted_at.pop(symbol, None)
+            self._assigned.pop(symbol, None)
+            spent += self._cost(tier) - self._cost(PollingTier.DEFAULT)
+        self._stats["pinned"] = len(pinned)
+
+        held = [
+            s for s, tier in current.items()
+            if s not in pinned and tier != PollingTier.DEFAULT
+            and now - self._promoted_at.get(s, -math.inf) < self.min_hold
+        ]
+        ranked = held + sorted(
+            (s for s in current if s not in held and s not in pinned),
+            key=lambda s: scores.get(s, 0.0), reverse=True,
+        )
+        for symbol in ranked:
+            score = scores.get(symbol, 0.0)
+            for tier in PROMOTIONS:
+                # A held symbol keeps its tier (or earns a faster one) regardless of score
+                keep = symbol in held and tier == current[symbol]
+                if score < self.thresholds[tier] and not keep:
+                    continue
+                extra = self._cost(tier) - self._cost(PollingTier.DEFAULT)
+                if spent + extra <= limit:
+                    target[symbol] = tier
+                    spent += extra
+                    break
+                self._stats["budget_limited"] += 1
+        self._stats["request_rate"] = round(spent, 3)
+        return target
+
+    async def evaluate(self) -> Dict[str, PollingTier]:
+        """Score the universe and apply tier changes. Returns the changes made."""
+        start = time.perf_counter()
+        now = time.monotonic()
+        await self._refresh_interest(now)
+        current = self.polling.get_symbol_tiers()
+        if not current:
+            return {}
+        self._scores = await self.score(sorted(current), now)
+        target = self.assign(self._scores, current, now)
+
+        changes = {s: t for s, t in target.items() if t != current[s]}
+        for symbol, tier in changes.items():
+            if tier == PollingTier.DEFAULT:
+                self._promoted_at.pop(symbol, None)
+                self._assigned.pop(symbol, None)
+                self._stats["demotions"] += 1
+            else:
+                if current[symbol] == PollingTier.DEFAULT:
+                    self._stats["promotions"] += 1
+                self._promoted_at[symbol] = now
+                self._assigned[symbol] = tier
+            self.polling.add_symbol(symbol, tier)
+
+        self._stats["evaluations"] += 1
+        self._stats["last_eval_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        if changes:
+            logger.info("Tier policy: %d changes (%s)", len(changes),
+                        ", ".join(f"{s}->{t.value}" for s, t in sorted(changes.items())[:10]))
+        return changes
+
+    # ============================================
+    # Periodic loop
+    # ============================================
+
+    async def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        self._running = False
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while self._running:
+            try:
+                await asyncio.sleep(self.eval_interval)
+                await self.evaluate()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error("Tier policy evaluation failed: %s", e)
+
+    def top_scores(self, n: int = 10) -> List[Tuple[str, float]]:
+        return sorted(self._scores.items(), key=lambda kv: kv[1], reverse=True)[:n]
+
+    def get_stats(self) -> Dict:
+        return {
+            **self._stats,
+            "request_budget": self.request_budget,
+            "promoted": len(self._promoted_at),
+            "top_scores": [(s, round(v, 2)) for s, v in self.top_scores(5)],
+            "running": self._running,
+        }
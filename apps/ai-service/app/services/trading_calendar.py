@@ -0,0 +1,117 @@
+"""
+HOSE/HNX trading calendar and session phases.
+
+Phases (ICT, Mon-Fri except exchange holidays):
+  09:00-09:15  ATO         opening auction (HNX trades continuously from 09:00)
+  09:15-11:30  CONTINUOUS
+  11:30-13:00  LUNCH
+  13:00-14:30  CONTINUOUS
+  14:30-14:45  ATC         closing auction
+  otherwise    CLOSED      (incl. weekends, holidays, post-close put-through)
+
+Holidays are loaded from a text file, one ISO date per line; blank lines and
+`#` comments are ignored, anything after the date on a line is a label:
+
+    2026-01-01  New Year
+    2026-02-16  Tet
+
+All methods take naive UTC datetimes, like bar timestamps in the pipeline.
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+from enum import Enum
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+ICT_OFFSET = timedelta(hours=7)  # Asia/Ho_Chi_Minh, no DST
+
+
+class SessionPhase(str, Enum):
+    ATO = "ato"
+    CONTINUOUS = "continuous"
+    LUNCH = "lunch"
+    ATC = "atc"
+    CLOSED = "closed"
+
+
+# Phases where prices move and polling runs at tier cadence
+ACTIVE_PHASES = frozenset({SessionPhase.ATO, SessionPhase.CONTINUOUS, SessionPhase.ATC})
+AUCTION_PHASES = frozenset({SessionPhase.ATO, SessionPhase.ATC})
+
+# (start minute of day ICT, phase) for a trading day, in order
+SESSION_SCHEDULE: List[Tuple[int, SessionPhase]] = [
+    (0, SessionPhase.CLOSED),
+    (9 * 60, SessionPhase.ATO),
+    (9 * 60 + 15, SessionPhase.CONTINUOUS),
+    (11 * 60 + 30, SessionPhase.LUNCH),
+    (13 * 60, SessionPhase.CONTINUOUS),
+    (14 * 60 + 30, SessionPhase.ATC),
+    (14 * 60 + 45, SessionPhase.CLOSED),
+]
+
+
+def load_holidays(path: str) -> Set[date]:
+    """Read a holidays file; a missing file yields no holidays."""
+    p = Path(path)
+    if not p.exists():
+        logger.warning("Holidays file %s not found, only weekends are closed", path)
+        return set()
+    holidays: Set[date] = set()
+    for line_no, line in enumerate(p.read_text().splitlines(), 1):
+        text = line.split("#", 1)[0].strip()
+        if not text:
+            continue
+        try:
+            holidays.add(date.fromisoformat(text.split()[0].rstrip(",")))
+        except ValueError:
+            logger.warning("Holidays file %s:%d: bad date %r", path, line_no, text)
+    return holidays
+
+
+class TradingCalendar:
+    """Session phase lookup and phase-change times for HOSE/HNX."""
+
+    def __init__(self, holidays: Optional[Iterable[date]] = None):
+        self.holidays: Set[date] = set(holidays or ())
+
+    @classmethod
+    def from_file(cls, path: str) -> "TradingCalendar":
+        return cls(load_holidays(path))
+
+    def is_trading_day(self, day: date) -> bool:
+        return day.weekday() < 5 and day not in self.holidays
+
+    def phase_at(self, now: datetime) -> SessionPhase:
+        """Session phase at naive-UTC `now`."""
+        local = now + ICT_OFFSET
+        if not self.is_trading_day(local.date()):
+            return SessionPhase.CLOSED
+        minute = local.hour * 60 + local.minute
+        phase = SessionPhase.CLOSED
+        for start, p in SESSION_SCHEDULE:
+            if minute < start:
+                break
+            phase = p
+        return phase
+
+    def next_change(self, now: datetime) -> datetime:
+        """Naive-UTC time of the next phase change after `now`."""
+        local = now + ICT_OFFSET
+        day = local.date()
+        minute_now = (local - datetime.combine(day, datetime.min.time())).total_seconds() / 60
+        for _ in range(366):
+            if self.is_trading_day(day):
+                # Consecutive schedule entries differ, so every boundary is a change
+                for start, _phase in SESSION_SCHEDULE[1:]:
+                    if start > minute_now:
+                        midnight = datetime.combine(day, datetime.min.time())
+                        return midnight + timedelta(minutes=start) - ICT_OFFSET
+            day += timedelta(days=1)
+            minute_now = -1
+        raise RuntimeError("no trading day within a year; check the holidays file")
+
+    def seconds_until_change(self, now: datetime) -> float:
+        return max(0.0, (self.next_change(now) - now).total_seconds())
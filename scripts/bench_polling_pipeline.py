@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Polling pipeline benchmark against the local SSI simulator.
+
+Drives the real chain in-process:
+    SSI simulator (ASGI) -> SSIFastConnectClient -> MarketPollingService
+    -> MarketStateManager -> InsightEngine -> AlertEvaluator
+
+and reports polling throughput (symbols/sec, SSI req/s), end-to-end lag
+(1m bar published by the simulator -> insight analysis + alerting of that
+symbol done: p50/p95/max; analysis runs through InsightScheduler as in the
+service) and what the chain produced.
+
+Usage:
+    python scripts/bench_polling_pipeline.py
+    python scripts/bench_polling_pipeline.py --symbols 3000 --interval 5 --duration 30 \\
+        --latency 0.08 --error-rate 0.01 --server-rate-limit 400 --rate-limit 350
+
+WARNING:
+    - Offline tool only. Do NOT run in production.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+import numpy as np
+
+BASE = os.path.join(os.path.dirname(__file__), "..", "apps", "ai-service")
+sys.path.insert(0, BASE)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.models.insight_models import Timeframe, UserAlert
+from app.services.alert_evaluator import AlertEvaluator
+from app.services.insight_engine import InsightEngine
+from app.services.insight_scheduler import InsightScheduler
+from app.services.market_polling_service import MarketPollingService
+from app.services.market_state_manager import MarketStateManager
+from app.services.ssi_client import SSIFastConnectClient
+from ssi_simulator import SimulatedMarket, SSISimulator
+
+
+class BenchAlertEvaluator(AlertEvaluator):
+    """AlertEvaluator with in-memory alerts instead of Supabase."""
+
+    def __init__(self, alerts, **kwargs):
+        super().__init__(**kwargs)
+        self._alerts = defaultdict(list)
+        for alert in alerts:
+            self._alerts[alert.symbol].append(alert)
+
+    async def _get_matching_alerts(self, event):
+        return self._alerts.get(event.symbol.upper(), [])
+
+
+def _pct(values, q):
+    return round(float(np.percentile(values, q)) * 1000, 1) if values else None
+
+
+async def run(args) -> dict:
+    market = SimulatedMarket(n_symbols=args.symbols, seed=args.seed, speed=args.speed)
+    sim = SSISimulator(
+        market,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.server_rate_limit,
+    )
+    client = SSIFastConnectClient(
+        "bench", "bench",
+        base_url="http://ssi-sim",
+        max_connections=args.max_in_flight,
+        max_retries=args.retries,
+        transport=httpx.ASGITransport(app=sim.app),
+    )
+
+    sm = MarketStateManager()
+    engine = InsightEngine(dedup_window_seconds=300, log_file=None)
+    alerts = [
+        UserAlert(id=f"a{i}", user_id=f"u{i % 50}", name=f"{s} alert", symbol=s)
+        for i, s in enumerate(market.symbols[::args.alert_every])
+    ]
+    evaluator = BenchAlertEvaluator(alerts, warmup_seconds=0, max_per_user_per_day=10**9,
+                                    cooldown_cache_path=os.devnull)
+    notifications = []
+
+    async def on_insight(event):
+        notifications.extend(await evaluator.evaluate(event))
+
+    engine.subscribe(on_insight)
+
+    poller = MarketPollingService(
+        ssi_client=client,
+        interval_default=args.interval,
+        interval_watchlist=args.interval,
+        interval_hot=args.interval,
+        batch_size=args.batch_size,
+        max_in_flight=args.max_in_flight,
+        rate_limit_per_sec=args.rate_limit,
+        rate_limit_burst=args.rate_limit,
+        calendar=None,
+        clock=market.now,
+    )
+    client.rate_limiter = poller.rate_limiter
+
+    scheduler = InsightScheduler(engine, sm, batch_window=args.batch_window)
+    lag = []  # seconds, bar published -> symbol analyzed + alerts evaluated
+    analyze_ms = []
+    newest = {}  # symbol -> newest 1m bar delivered, not yet analyzed
+
+    async def on_bars(bars):
+        summary = await sm.update_bars(bars)
+        for bar in bars:
+            if bar.timeframe == Timeframe.INTRADAY_1M and bar.timestamp > newest.get(bar.symbol, bar.timestamp.min):
+                newest[bar.symbol] = bar.timestamp
+        scheduler.mark_changed(summary)
+        return summary
+
+    analyze_symbols = engine.analyze_symbols
+
+    async def timed_analyze(state_manager, symbols):
+        start = time.perf_counter()
+        insights = await analyze_symbols(state_manager, symbols)
+        analyze_ms.append((time.perf_counter() - start) * 1000)
+        done = time.monotonic()
+        for symbol in symbols:
+            if symbol in newest:
+                lag.append(done - market.published_at(newest.pop(symbol)))
+        return insights
+
+    engine.analyze_symbols = timed_analyze
+
+    poller.set_on_bars_update(on_bars)
+    poller.set_symbols(market.symbols)
+
+    await client.start()
+    await scheduler.start()
+    wall = time.perf_counter()
+    await poller.start()
+    await asyncio.sleep(args.duration)
+    await poller.stop()
+    await scheduler.stop()
+    elapsed = time.perf_counter() - wall
+    await client.close()
+
+    polling = poller.get_stats()
+    # Lag of the first cold sweep measures history age, not pipeline latency
+    warm = lag[args.symbols:] or lag
+    return {
+        "symbols": args.symbols,
+        "duration_s": round(elapsed, 1),
+        "symbols_per_sec": round(polling["symbols_polled"] / elapsed, 1),
+        "ssi_req_per_sec": round(sim.stats["requests"] / elapsed, 1),
+        "e2e_lag_ms": {"p50": _pct(warm, 50), "p95": _pct(warm, 95), "max": _pct(warm, 100),
+                       "samples": len(warm)},
+        "schedule_lateness_ms": polling["lateness_ms"],
+        "analyze_batch_ms": {"p50": round(float(np.median(analyze_ms)), 1) if analyze_ms else None,
+                             "max": round(max(analyze_ms), 1) if analyze_ms else None},
+        "bars_fetched": polling["bars_fetched"],
+        "polls_error": polling["polls_error"],
+        "suppression_rate": polling["suppression_rate"],
+        "insight_scheduler": {k: v for k, v in scheduler.get_stats().items() if k != "running"},
+        "insights": engine.get_stats()["insights_detected"],
+        "alerts": len(notifications),
+        "client": {k: v for k, v in client.get_stats().items() if k != "token_expires_in"},
+        "simulator": sim.stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Polling pipeline benchmark (SSI simulator)")
+    parser.add_argument("--symbols", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=20.0, help="wall seconds")
+    parser.add_argument("--interval", type=int, default=5, help="tier interval, wall seconds")
+    parser.add_argument("--speed", type=float, default=60.0, help="simulated seconds per wall second")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--latency-jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--server-rate-limit", type=float, default=0.0, help="simulator quota, req/s")
+    parser.add_argument("--rate-limit", type=float, default=1000.0, help="client token bucket, req/s")
+    parser.add_argument("--max-in-flight", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--batch-window", type=float, default=1.0, help="insight batch window, seconds")
+    parser.add_argument("--alert-every", type=int, default=10, help="one user alert per N symbols")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    report = asyncio.run(run(args))
+
+    import json
+    print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Local SSI FastConnect Data simulator for load testing the polling pipeline.
+
+Serves the three endpoints SSIFastConnectClient uses (AccessToken,
+IntradayOhlc, DailyOhlc) for thousands of synthetic symbols, with seeded
+random-walk bars, configurable latency, injected errors and a server-side
+rate limit that answers 429 like the real quota.
+
+Usage:
+    # standalone, then point the app at it: SSI_BASE_URL=http://127.0.0.1:8765
+    python scripts/ssi_simulator.py --symbols 2000 --speed 60 --port 8765
+
+    # in-process (benchmark / tests), no sockets:
+    sim = SSISimulator(SimulatedMarket(n_symbols=2000))
+    client = SSIFastConnectClient("id", "secret", base_url="http://sim",
+                                  transport=httpx.ASGITransport(app=sim.app))
+
+Market model:
+    - Simulated clock runs `speed` x wall time from `start` (default: now)
+    - 1m bars form a continuous random walk (no session breaks); a bar with
+      timestamp t is served once the simulated clock passes t + 1 minute;
+      `history_minutes` bars exist before `start` so cold fetches are full
+    - Volume is log-normal with rare bursts (burst_prob, burst_factor), so
+      volume / candle detectors actually fire
+    - Daily history: `daily_history` weekdays before the start date; today's
+      daily bar aggregates the completed 1m bars
+    - Date range parameters are ignored: newest `pageSize` bars are served
+
+WARNING:
+    - Offline tool only. Do NOT run in production.
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+ICT_OFFSET = timedelta(hours=7)
+
+
+# ---------------------------------------------------------------------------
+# Market model
+# ---------------------------------------------------------------------------
+
+class SimulatedMarket:
+    """Seeded random-walk OHLCV for `n_symbols` symbols on a scaled clock."""
+
+    def __init__(
+        self,
+        n_symbols: int = 2000,
+        seed: int = 42,
+        speed: float = 60.0,
+        start: Optional[datetime] = None,
+        history_minutes: int = 60,
+        daily_history: int = 60,
+        sigma_1m: float = 0.002,
+        sigma_daily: float = 0.02,
+        burst_prob: float = 0.002,
+        burst_factor: float = 8.0,
+        chunk_minutes: int = 60,
+    ):
+        self.symbols = [f"S{i:04d}" for i in range(n_symbols)]
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+        self.speed = speed
+        self.start = (start or datetime.utcnow()).replace(second=0, microsecond=0)
+        self.history_minutes = history_minutes
+        self.sigma_1m = sigma_1m
+        self.burst_prob = burst_prob
+        self.burst_factor = burst_factor
+        self.chunk_minutes = chunk_minutes
+        self._rng = np.random.default_rng(seed)
+        self._wall0 = time.monotonic()
+
+        n = n_symbols
+        self._base_volume = self._rng.uniform(500, 5000, n)
+
+        # Daily history, oldest first, ending the weekday before start
+        days: List[datetime] = []
+        day = datetime.combine(self.start.date(), datetime.min.time())
+        while len(days) < daily_history:
+            day -= timedelta(days=1)
+            if day.weekday() < 5:
+                days.append(day)
+        self.daily_ts = days[::-1]
+        price = self._rng.uniform(10, 100, n)
+        rets = self._rng.normal(0, sigma_daily, (n, daily_history))
+        close = price[:, None] * np.exp(np.cumsum(rets, axis=1))
+        open_ = np.concatenate([price[:, None], close[:, :-1]], axis=1)
+        spread = np.abs(self._rng.normal(0, sigma_daily / 2, (n, daily_history)))
+        self.daily = {
+            "open": open_,
+            "high": np.maximum(open_, close) * (1 + spread),
+            "low": np.minimum(open_, close) * (1 - spread),
+            "close": close,
+            "volume": (self._base_volume[:, None] * 300
+                       * self._rng.lognormal(0, 0.4, (n, daily_history))).astype(np.int64),
+        }
+
+        # Intraday path, grown in chunks for every symbol at once
+        self._last_close = close[:, -1].copy()
+        self.intraday = {k: np.empty((n, 0)) for k in ("open", "high", "low", "close")}
+        self.intraday["volume"] = np.empty((n, 0), dtype=np.int64)
+
+    # -- clock ---------------------------------------------------------------
+
+    def now(self) -> datetime:
+        """Simulated naive-UTC time (pass as the poller's `clock`)."""
+        return self.start + timedelta(seconds=(time.monotonic() - self._wall0) * self.speed)
+
+    def minute_ts(self, k: int) -> datetime:
+        return self.start + timedelta(minutes=k - self.history_minutes)
+
+    def published_at(self, ts: datetime) -> float:
+        """time.monotonic() at which the 1m bar stamped `ts` became available."""
+        return self._wall0 + ((ts - self.start).total_seconds() + 60) / self.speed
+
+    def completed_minutes(self) -> int:
+        elapsed = (self.now() - self.start).total_seconds()
+        return self.history_minutes + max(0, int(elapsed // 60))
+
+    # -- generation ----------------------------------------------------------
+
+    def _grow(self, minutes: int):
+        have = self.intraday["close"].shape[1]
+        if minutes <= have:
+            return
+        m = max(self.chunk_minutes, minutes - have)
+        n = len(self.symbols)
+        rets = self._rng.normal(0, self.sigma_1m, (n, m))
+        close = self._last_close[:, None] * np.exp(np.cumsum(rets, axis=1))
+        open_ = np.concatenate([self._last_close[:, None], close[:, :-1]], axis=1)
+        wick = np.abs(self._rng.normal(0, self.sigma_1m / 2, (n, m)))
+        burst = np.where(self._rng.random((n, m)) < self.burst_prob, self.burst_factor, 1.0)
+        volume = (self._base_volume[:, None] * burst
+                  * self._rng.lognormal(0, 0.5, (n, m))).astype(np.int64)
+        chunk = {
+            "open": open_,
+            "high": np.maximum(open_, close) * (1 + wick),
+            "low": np.minimum(open_, close) * (1 - wick),
+            "close": close,
+            "volume": volume,
+        }
+        for key, values in chunk.items():
+            self.intraday[key] = np.concatenate([self.intraday[key], values], axis=1)
+        self._last_close = close[:, -1].copy()
+
+    def intraday_bars(self, symbol: str, count: int) -> List[Dict]:
+        """Newest `count` completed 1m bars, oldest first."""
+        i = self.index.get(symbol)
+        if i is None:
+            return []
+        end = self.completed_minutes()
+        self._grow(end)
+        rows = []
+        for k in range(max(0, end - count), end):
+            rows.append({"timestamp": self.minute_ts(k),
+                         **{key: self.intraday[key][i, k] for key in self.intraday}})
+        return rows
+
+    def daily_bars(self, symbol: str, count: int) -> List[Dict]:
+        """Newest `count` daily bars (history + today's bar so far), oldest first."""
+        i = self.index.get(symbol)
+        if i is None:
+            return []
+        first = max(0, len(self.daily_ts) - count)
+        rows = [
+            {"timestamp": self.daily_ts[d], **{key: self.daily[key][i, d] for key in self.daily}}
+            for d in range(first, len(self.daily_ts))
+        ]
+        end = self.completed_minutes()
+        if end > self.history_minutes:
+            self._grow(end)
+            today = slice(self.history_minutes, end)
+            rows.append({
+                "timestamp": datetime.combine(self.start.date(), datetime.min.time()),
+                "open": self.intraday["open"][i, today.start],
+                "high": self.intraday["high"][i, today].max(),
+                "low": self.intraday["low"][i, today].min(),
+                "close": self.intraday["close"][i, end - 1],
+                "volume": int(self.intraday["volume"][i, today].sum()),
+            })
+        return rows[-count:] if count > 0 else []
+
+
+# ---------------------------------------------------------------------------
+# FastConnect API
+# ---------------------------------------------------------------------------
+
+def _ssi_row(symbol: str, bar: Dict, intraday: bool) -> Dict:
+    local = bar["timestamp"] + ICT_OFFSET if intraday else bar["timestamp"]
+    return {
+        "Symbol": symbol,
+        "TradingDate": local.strftime("%d/%m/%Y"),
+        "Time": local.strftime("%H:%M:%S") if intraday else None,
+        # SSI sends numbers as strings
+        "Open": f"{bar['open']:.2f}",
+        "High": f"{bar['high']:.2f}",
+        "Low": f"{bar['low']:.2f}",
+        "Close": f"{bar['close']:.2f}",
+        "Volume": str(int(bar["volume"])),
+        "Value": f"{bar['close'] * bar['volume']:.0f}",
+    }
+
+
+def _fake_jwt(exp: float) -> str:
+    payload = base64.urlsafe_b64encode(
+        json.dumps({"exp": int(exp), "jti": uuid.uuid4().hex}).encode()
+    ).decode().rstrip("=")
+    return f"e30.{payload}.sim"
+
+
+class SSISimulator:
+    """ASGI app mimicking FastConnect Data on top of a SimulatedMarket."""
+
+    def __init__(
+        self,
+        market: SimulatedMarket,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: float = 0.0,
+        rate_burst: Optional[float] = None,
+        token_ttl: float = 8 * 3600,
+        seed: int = 0,
+    ):
+        self.market = market
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit  # req/s, 0 = unlimited
+        self.rate_burst = rate_burst or max(rate_limit, 1.0)
+        self.token_ttl = token_ttl
+        self._random = random.Random(seed)
+        self._tokens: Dict[str, float] = {}
+        self._bucket = self.rate_burst
+        self._bucket_at = time.monotonic()
+        self.stats = {
+            "requests": 0,
+            "tokens_issued": 0,
+            "errors_injected": 0,
+            "rate_limited": 0,
+            "unauthorized": 0,
+            "rows_served": 0,
+        }
+        self.app = self._build_app()
+
+    def _take_token(self) -> bool:
+        if not self.rate_limit:
+            return True
+        now = time.monotonic()
+        self._bucket = min(self.rate_burst, self._bucket + (now - self._bucket_at) * self.rate_limit)
+        self._bucket_at = now
+        if self._bucket >= 1:
+            self._bucket -= 1
+            return True
+        return False
+
+    async def _gate(self, request: Request) -> Optional[JSONResponse]:
+        """Latency, quota, auth and injected failures, in the order SSI would apply them."""
+        self.stats["requests"] += 1
+        delay = self.latency + self._random.uniform(0, self.latency_jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if not self._take_token():
+            self.stats["rate_limited"] += 1
+            return JSONResponse({"status": 429, "message": "Too many requests"}, status_code=429)
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if self._tokens.get(token, 0) < time.time():
+            self.stats["unauthorized"] += 1
+            return JSONResponse({"status": 401, "message": "Unauthorized"}, status_code=401)
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.stats["errors_injected"] += 1
+            return JSONResponse({"status": 500, "message": "Simulated error"}, status_code=500)
+        return None
+
+    def _page(self, symbol: str, bars: List[Dict], request: Request, intraday: bool) -> Dict:
+        rows = [_ssi_row(symbol, bar, intraday) for bar in bars]
+        if request.query_params.get("ascending", "true").lower() == "false":
+            rows.reverse()
+        self.stats["rows_served"] += len(rows)
+        return {"status": 200, "message": "Success", "data": rows, "totalRecord": len(rows)}
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="SSI FastConnect simulator")
+
+        @app.post("/api/v2/Market/AccessToken")
+        async def access_token(request: Request):
+            body = await request.json()
+            if not body.get("consumerID") or not body.get("consumerSecret"):
+                return JSONResponse({"status": 400, "message": "Missing credentials"}, status_code=400)
+            exp = time.time() + self.token_ttl
+            token = _fake_jwt(exp)
+            self._tokens[token] = exp
+            self.stats["tokens_issued"] += 1
+            return {"status": 200, "message": "Success", "data": {"accessToken": token}}
+
+        @app.get("/api/v2/Market/IntradayOhlc")
+        async def intraday_ohlc(request: Request):
+            blocked = await self._gate(request)
+            if blocked:
+                return blocked
+            symbol = request.query_params.get("symbol", "").upper()
+            count = int(request.query_params.get("pageSize", 100))
+            return self._page(symbol, self.market.intraday_bars(symbol, count), request, True)
+
+        @app.get("/api/v2/Market/DailyOhlc")
+        async def daily_ohlc(request: Request):
+            blocked = await self._gate(request)
+            if blocked:
+                return blocked
+            symbol = request.query_params.get("symbol", "").upper()
+            count = int(request.query_params.get("pageSize", 100))
+            return self._page(symbol, self.market.daily_bars(symbol, count), request, False)
+
+        @app.get("/stats")
+        async def stats():
+            return {**self.stats, "sim_time": self.market.now().isoformat()}
+
+        return app
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SSI FastConnect Data simulator")
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--speed", type=float, default=1.0, help="simulated seconds per wall second")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per request")
+    parser.add_argument("--latency-jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="req/s, 0 = unlimited")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    sim = SSISimulator(
+        SimulatedMarket(n_symbols=args.symbols, seed=args.seed, speed=args.speed),
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+    )
+    print(f"SSI simulator: {args.symbols} symbols S0000..S{args.symbols - 1:04d} "
+          f"on http://{args.host}:{args.port}", file=sys.stderr)
+    uvicorn.run(sim.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
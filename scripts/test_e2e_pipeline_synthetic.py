@@ -8,6 +8,10 @@ Asserts:
   - Cooldown blocks duplicate alerts
   - Warm-up suppresses alerts during startup window
   - PipelineMonitor counters > 0
+  - InsightScheduler analyzes only changed symbols, once per batch window
+  - Feature-frame detectors (per symbol and universe-wide) emit exactly the v1 events
+  - Detector registry: enable/disable, min-bar skips, sync/async plugins, cost stats
+  - Insight log writer: batched off-loop flushes, size/date rotation, gzip, flush on close
 """
 
 import asyncio
@@ -47,6 +51,11 @@ from app.models.insight_models import (
 )
 from app.services.market_state_manager import MarketStateManager
 from app.services.insight_engine import InsightEngine
+from app.services.insight_scheduler import InsightScheduler
+from app.services.insight_log import InsightLogWriter
+from app.services.detector_features import compute_features
+from app.services.detector_registry import DetectorRegistry, DetectorSpec
+from app.services.insight_vectorized import DETECTOR_CODES, create_default_registry
 from app.services.ai_explain_service import AIExplainService
 from app.services.pipeline_monitor import PipelineMonitor, RollingCounter
 
@@ -395,6 +404,419 @@ async def test_full_pipeline_e2e():
               len(n.message) > 10 and n.symbol in n.message)
 
 
+async def test_event_driven_analysis():
+    """Ingest marks changed symbols dirty; repeated marks coalesce into one analysis."""
+    print("\n[Test 9] Event-driven analysis (InsightScheduler)")
+
+    sm = MarketStateManager()
+    engine = InsightEngine(dedup_window_seconds=300, log_file=None)
+    scheduler = InsightScheduler(engine, sm, batch_window=0.2)
+    analyzed = []
+    original = engine.analyze_symbol
+
+    async def counting(symbol, *args):
+        analyzed.append(symbol)
+        return await original(symbol, *args)
+
+    engine.analyze_symbol = counting
+    engine.vectorized = False
+    found = []
+
+    async def on_insight(event: InsightEvent):
+        found.append(event)
+
+    engine.subscribe(on_insight)
+
+    # Warm state for three symbols; only VNM gets new bars afterwards
+    for sym in ("VNM", "FPT", "HPG"):
+        await sm.update_bars(gen_daily_bars(sym, 30))
+
+    await scheduler.start()
+    bars_1m = gen_1m_bars_pa01("VNM")
+    for i in range(3):
+        # Same bars re-polled: first ingest changes state, the rest coalesce
+        scheduler.mark_changed(await sm.update_bars(bars_1m[: len(bars_1m) - 2 + i]))
+    await asyncio.sleep(0.05)
+    check("First mark analyzed immediately", analyzed[:1] == ["VNM"], f"analyzed={analyzed}")
+    check("Only the changed symbol analyzed", set(analyzed) == {"VNM"}, f"analyzed={analyzed}")
+    check("Bursts coalesce to one analysis per batch", analyzed.count("VNM") == 1,
+          f"count={analyzed.count('VNM')}")
+    check("PA01 published from scheduler", any(e.insight_code == "PA01" for e in found),
+          f"codes={[e.insight_code for e in found]}")
+
+    unchanged = await sm.update_bars(bars_1m)
+    scheduler.mark_changed(unchanged)
+    check("Unchanged ingest not marked", scheduler.get_stats()["dirty"] == 0,
+          f"stats={scheduler.get_stats()}")
+
+    # Marks inside the window wait for it, then run as one batch
+    scheduler.mark_dirty(["FPT", "HPG", "FPT"])
+    await asyncio.sleep(0.05)
+    check("Next batch waits for the window", "FPT" not in analyzed, f"analyzed={analyzed}")
+    await asyncio.sleep(0.3)
+    stats = scheduler.get_stats()
+    await scheduler.stop()
+    check("Window batch analyzed each symbol once",
+          analyzed.count("FPT") == 1 and analyzed.count("HPG") == 1, f"analyzed={analyzed}")
+    check("Scheduler stats", stats["batches"] == 2 and stats["marks_coalesced"] == 3
+          and stats["detection_lag_ms"]["p95"] is not None, f"stats={stats}")
+
+
+def gen_random_universe(n_symbols, seed=7):
+    """Random walks with volume spikes, gaps and trend flips; some short histories."""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    day0 = datetime.combine(now.date(), datetime.min.time())
+    bars, symbols = [], []
+    for i in range(n_symbols):
+        sym = f"R{i:03d}"
+        symbols.append(sym)
+        n_daily = int(rng.choice([1, 3, 15, 19, 20, 40, 80]))
+        n_1m = int(rng.choice([2, 4, 5, 30, 60]))
+        drift = rng.normal(0, 0.01, n_daily)
+        flip = rng.integers(1, n_daily + 1)
+        drift[flip:] += rng.choice([-0.03, 0.03])  # trend change drives MA crosses / RSI
+        close = 20 * np.exp(np.cumsum(drift))
+        if n_daily == 80 and i % 2:
+            # End some histories on an MA20/MA50 cross so TM02 has something to find
+            ma20 = np.convolve(close, np.ones(20) / 20, "valid")[30:]
+            ma50 = np.convolve(close, np.ones(50) / 50, "valid")
+            above = ma20 > ma50
+            crosses = np.flatnonzero(above[1:] != above[:-1]) + 1 + 49
+            if len(crosses) and crosses[-1] >= 51:
+                n_daily = int(crosses[-1]) + 1
+                close = close[:n_daily]
+        for d in range(n_daily):
+            o = close[d - 1] * (1 + rng.choice([0, 0, 0.02, -0.025])) if d else close[d]
+            c = close[d]
+            vol = int(rng.integers(1, 5) * 100_000 * (rng.choice([1, 1, 1, 4, 0.3])))
+            bars.append(make_bar(sym, Timeframe.DAILY, day0 - timedelta(days=n_daily - 1 - d),
+                                 o, max(o, c) * 1.01, min(o, c) * 0.99, c, vol))
+        price = float(close[-1])
+        for m in range(n_1m):
+            o = price
+            c = price * (1 + rng.normal(0, 0.003))
+            h = max(o, c) + abs(rng.normal(0, 0.002)) * price * rng.choice([0, 1, 5])
+            l = min(o, c) - abs(rng.normal(0, 0.002)) * price
+            if rng.random() < 0.05:
+                h, l, c = o, o, o  # flat bar, zero range
+            bars.append(make_bar(sym, Timeframe.INTRADAY_1M, now - timedelta(minutes=n_1m - m),
+                                 o, h, l, c))
+            price = c
+    return symbols, bars
+
+
+def v1_detector_events(symbol, snap, bars_1m, bars_daily):
+    """Frozen copy of the original per-bar detector logic, the reference for equality."""
+    H, M = InsightSeverity.HIGH, InsightSeverity.MEDIUM
+    out = []
+
+    def ev(code, tf, sev, signals, text):
+        out.append(InsightEvent(insight_code=code, symbol=symbol, timeframe=tf, severity=sev,
+                                signals=signals, raw_explanation=text))
+
+    if len(bars_1m) >= 5:
+        for bar in bars_1m[-5:]:
+            if bar.range and bar.is_bullish and bar.body / bar.range > 0.70:
+                body_pct = bar.body / bar.range
+                chg = ((bar.close - bar.open) / bar.open * 100) if bar.open else 0
+                ev("PA01", Timeframe.INTRADAY_1M, H if body_pct > 0.85 else M,
+                   {"body_percent": round(body_pct, 2), "close_change_pct": round(chg, 2), "range": bar.range},
+                   f"Strong bullish candle: body {body_pct:.0%} of range, {chg:+.1f}% gain")
+                break
+        for bar in bars_1m[-5:]:
+            if bar.range and bar.upper_wick / bar.range > 0.50:
+                wick = bar.upper_wick / bar.range
+                ev("PA02", Timeframe.INTRADAY_1M, H if wick > 0.65 else M,
+                   {"upper_wick_percent": round(wick, 2), "high": bar.high, "close": bar.close},
+                   f"Upper wick rejection: {wick:.0%} of range, rejected at {bar.high}")
+                break
+    if len(bars_daily) >= 2:
+        today, prev = bars_daily[-1], bars_daily[-2]
+        gap = ((today.open - prev.close) / prev.close * 100) if prev.close else 0
+        if abs(gap) > 1.0:
+            ev("PA03", Timeframe.DAILY, H if abs(gap) > 2.0 else M,
+               {"gap_percent": round(gap, 2), "prev_close": prev.close, "today_open": today.open},
+               f"Gap {'up' if gap > 0 else 'down'}: {gap:+.1f}% (prev close {prev.close} → open {today.open})")
+    if len(bars_daily) >= 20:
+        today = bars_daily[-1]
+        high_20 = max(b.high for b in bars_daily[-20:-1])
+        if today.high >= high_20 and today.close < today.open:
+            ev("PA04", Timeframe.DAILY, M,
+               {"high_20d": high_20, "today_high": today.high, "today_close": today.close},
+               f"Failed breakout: hit 20d high {high_20} but closed at {today.close}")
+        vols = [b.volume for b in bars_daily[-20:]]
+        avg = sum(vols[:-1]) / 19
+        chg = ((today.close - today.open) / today.open * 100) if today.open else 0
+        ratio = today.volume / avg if avg > 0 else 0
+        if ratio > 2.0 and abs(chg) > 0.5:
+            ev("VA01", Timeframe.DAILY, H if ratio > 3.0 else M,
+               {"volume_ratio": round(ratio, 2), "price_change_pct": round(chg, 2), "volume": today.volume},
+               f"High volume breakout: {ratio:.1f}x avg volume, price {chg:+.1f}%")
+        ratio = today.volume / avg if avg > 0 else 1
+        if chg > 0.8 and ratio < 0.65:
+            ev("VA02", Timeframe.DAILY, M, {"price_change_pct": round(chg, 2), "volume_ratio": round(ratio, 2)},
+               f"Price up {chg:+.1f}% but volume only {ratio:.0%} of average")
+        threshold = sorted(vols)[19]
+        if today.volume >= threshold:
+            ev("VA03", Timeframe.DAILY, M, {"volume": today.volume, "threshold_95pct": threshold},
+               f"Volume climax: {today.volume:,} (top 5% of 20-day range)")
+    if snap.ma20 and snap.ma50 and len(bars_daily) >= 51:
+        closes = [b.close for b in bars_daily]
+        p20, p50 = sum(closes[-21:-1]) / 20, sum(closes[-51:-1]) / 50
+        if p20 <= p50 and snap.ma20 > snap.ma50:
+            ev("TM02", Timeframe.DAILY, H, {"ma20": snap.ma20, "ma50": snap.ma50, "cross_type": "golden"},
+               f"Golden cross: MA20 ({snap.ma20:.0f}) crossed above MA50 ({snap.ma50:.0f})")
+        elif p20 >= p50 and snap.ma20 < snap.ma50:
+            ev("TM02", Timeframe.DAILY, H, {"ma20": snap.ma20, "ma50": snap.ma50, "cross_type": "death"},
+               f"Death cross: MA20 ({snap.ma20:.0f}) crossed below MA50 ({snap.ma50:.0f})")
+    if snap.rsi14 is not None and snap.rsi14 > 70:
+        ev("TM04", Timeframe.DAILY, H if snap.rsi14 > 80 else M, {"rsi14": snap.rsi14},
+           f"RSI overbought: {snap.rsi14:.1f} (>70)")
+    if snap.rsi14 is not None and snap.rsi14 < 30:
+        ev("TM05", Timeframe.DAILY, H if snap.rsi14 < 20 else M, {"rsi14": snap.rsi14},
+           f"RSI oversold: {snap.rsi14:.1f} (<30)")
+    return out
+
+
+def _event_key(e):
+    return (e.symbol, e.insight_code, e.timeframe, e.severity,
+            tuple(sorted(e.signals.items())), e.raw_explanation)
+
+
+async def test_detectors_match_v1():
+    """Shared features, one symbol or the whole universe: same hits, signals and wording as v1."""
+    import time
+    print("\n[Test 10] Feature-frame detectors == v1 per-bar detectors (single + universe)")
+
+    symbols, bars = gen_random_universe(400)
+    sm = MarketStateManager(rolling_window_daily=80)
+    await sm.update_bars(bars)
+    snapshots = [await sm.get_snapshot(s) for s in symbols]
+
+    for n_daily in (50, 80):  # 50 = what analysis reads; 80 lets TM02 (needs 51) fire
+        engine = InsightEngine(log_file=None)
+        expected, per_symbol = [], []
+        for sym, snap in zip(symbols, snapshots):
+            b1m = await sm.get_recent_bars(sym, Timeframe.INTRADAY_1M, 60)
+            bd = await sm.get_recent_bars(sym, Timeframe.DAILY, n_daily)
+            expected.extend(v1_detector_events(sym, snap, b1m, bd))
+            per_symbol.extend(await engine.analyze_symbol(sym, snap, b1m, bd))
+        check(f"daily={n_daily}: per-symbol features == v1 detectors",
+              [_event_key(e) for e in per_symbol] == [_event_key(e) for e in expected],
+              f"got {len(per_symbol)} expected {len(expected)}")
+        m1 = await sm.get_bar_matrix(symbols, Timeframe.INTRADAY_1M, 60)
+        md = await sm.get_bar_matrix(symbols, Timeframe.DAILY, n_daily)
+        registry = create_default_registry()
+        scan = await registry.scan(compute_features(symbols, snapshots, m1, md))
+        got = registry.events(scan)
+        check(f"daily={n_daily}: identical events ({len(expected)})",
+              [_event_key(e) for e in got] == [_event_key(e) for e in expected],
+              f"got {len(got)} expected {len(expected)}")
+        check(f"daily={n_daily}: hit mask counts events", scan.hit_count() == len(got),
+              f"hits={scan.hit_count()}")
+        codes = {e.insight_code for e in got}
+        wanted = set(DETECTOR_CODES) if n_daily == 80 else set(DETECTOR_CODES) - {"TM02"}
+        check(f"daily={n_daily}: every detector exercised", wanted <= codes,
+              f"missing={sorted(wanted - codes)}")
+
+    # Engine batch mode (scheduler path) == per-symbol engine mode, incl. stats
+    vec, ref = InsightEngine(log_file=None), InsightEngine(log_file=None, vectorized=False)
+    got = await vec.analyze_symbols(sm, symbols)
+    expected = await ref.analyze_symbols(sm, symbols)
+    check("analyze_symbols: vectorized == per-symbol",
+          [_event_key(e) for e in got] == [_event_key(e) for e in expected] and len(got) > 0,
+          f"got {len(got)} expected {len(expected)}")
+    vs, rs = vec.get_stats(), ref.get_stats()
+    check("Stats agree", vs["analyses_run"] == rs["analyses_run"]
+          and vs["insights_by_code"] == rs["insights_by_code"], f"vec={vs} ref={rs}")
+
+    start = time.perf_counter()
+    await registry.scan(compute_features(symbols, snapshots, m1, md))
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"  scan of {len(symbols)} symbols: {elapsed_ms:.2f} ms, "
+          f"analyze_universe: {vs['last_scan_ms']} ms")
+
+
+async def test_tm02_tie_matches_v1():
+    """Previous MA20 == MA50 in exact arithmetic: features must round like v1's sum()."""
+    import random
+    import numpy as np
+    from app.services.indicators import latest, sma
+    print("\n[Test 10b] TM02 with MA20/MA50 tied: features == v1 sums")
+
+    rng = random.Random(5)
+    sm = MarketStateManager(rolling_window_daily=60)
+    symbols, bars = [], []
+    start = datetime(2024, 1, 1)
+    for k in range(40):
+        recent = [round(rng.uniform(20, 30) / 0.05) * 0.05 for _ in range(20)]
+        mean = sum(recent) / 20
+        older = []
+        for _ in range(15):  # pairs around the recent mean: same MA50 as MA20
+            d = round(rng.uniform(0, 3) / 0.05) * 0.05
+            older += [mean + d, mean - d]
+        sym = f"T{k:02d}"
+        symbols.append(sym)
+        for i, c in enumerate(older + recent + [25.0]):
+            bars.append(PriceBar(symbol=sym, timeframe=Timeframe.DAILY, timestamp=start + timedelta(days=i),
+                                 open=c, high=c, low=c, close=c, volume=1000 + i))
+    await sm.update_bars(bars)
+    snapshots = [(await sm.get_snapshot(s)).model_copy(update={"ma20": 2.0, "ma50": 1.0}) for s in symbols]
+    m1 = await sm.get_bar_matrix(symbols, Timeframe.INTRADAY_1M, 60)
+    md = await sm.get_bar_matrix(symbols, Timeframe.DAILY, 51)
+    features = compute_features(symbols, snapshots, m1, md)
+
+    closes = [md["close"][i].tolist() for i in range(len(symbols))]
+    v20 = [sum(c[-21:-1]) / 20 for c in closes]
+    v50 = [sum(c[-51:-1]) / 50 for c in closes]
+    check("prev MA20/MA50 bit-identical to v1 sums",
+          features.prev_ma20.tolist() == v20 and features.prev_ma50.tolist() == v50)
+    pairwise = [(a <= b) for a, b in zip(latest(sma(md["close"], 20), 2), latest(sma(md["close"], 50), 2))]
+    check("ties are real: NumPy summation order would flip some crosses",
+          pairwise != [a <= b for a, b in zip(v20, v50)])
+
+    expected = []
+    for sym, snap in zip(symbols, snapshots):
+        expected.extend(v1_detector_events(sym, snap, [], await sm.get_recent_bars(sym, Timeframe.DAILY, 51)))
+    registry = create_default_registry()
+    got = registry.events(await registry.scan(features))
+    tm02 = [_event_key(e) for e in got if e.insight_code == "TM02"]
+    check("TM02 events == v1 on tied MAs",
+          tm02 == [_event_key(e) for e in expected if e.insight_code == "TM02"] and tm02,
+          f"got {len(tm02)}")
+
+
+async def test_detector_registry():
+    """Registry: enable/disable, bar-count skip before invoking, sync + async plugins, cost stats."""
+    print("\n[Test 11] Detector registry")
+
+    symbols, bars = gen_random_universe(100, seed=11)
+    sm = MarketStateManager()
+    await sm.update_bars(bars)
+
+    engine = InsightEngine(log_file=None, dedup_window_seconds=0, disabled_detectors=["VA03"])
+    calls = []
+
+    def big_body(f):
+        calls.append("sync")
+        return f.body_ratio[:, -1] > 0.9
+
+    async def rsi_extreme(f):
+        calls.append("async")
+        return (f.rsi14 > 90) | (f.rsi14 < 10)
+
+    def never_eligible(f):
+        calls.append("never")
+        return f.rsi14 > 0
+
+    def build(code):
+        return lambda symbol, s: InsightEvent(
+            insight_code=code, symbol=symbol, timeframe=Timeframe.INTRADAY_1M,
+            severity=InsightSeverity.LOW, signals={"rsi14": s["rsi14"]})
+
+    engine.registry.register(DetectorSpec(code="X01", detect=big_body, build=build("X01"),
+                                          timeframe=Timeframe.INTRADAY_1M, min_bars_1m=1,
+                                          features=("body_ratio",)))
+    engine.registry.register(DetectorSpec(code="X02", detect=rsi_extreme, build=build("X02"),
+                                          timeframe=Timeframe.DAILY, features=("rsi14",)))
+    engine.registry.register(DetectorSpec(code="X03", detect=never_eligible, build=build("X03"),
+                                          timeframe=Timeframe.DAILY, min_bars_daily=10_000))
+
+    events = await engine.analyze_symbols(sm, symbols)
+    codes = {e.insight_code for e in events}
+    stats = engine.get_stats()["detectors"]
+    check("Disabled detector emits nothing", "VA03" not in codes and stats["VA03"]["calls"] == 0,
+          f"VA03={stats['VA03']}")
+    check("Sync + async plugins run once per batch", calls.count("sync") == 1 and calls.count("async") == 1,
+          f"calls={calls}")
+    check("Plugin hits become events", "X01" in codes, f"codes={sorted(codes)}")
+    check("Precondition failure skips the call", "never" not in calls and stats["X03"]["skipped"] == 1,
+          f"X03={stats['X03']}")
+    check("Registry metadata exposed", stats["X02"]["async"] and not stats["X01"]["async"]
+          and stats["PA01"]["min_bars_1m"] == 5, f"stats={stats['X02']}")
+    short = sum(1 for s in symbols if (sm.get_symbol_info(s) or {}).get("bars_1m", 0) < 5)
+    check("Cost accounting", stats["PA01"]["symbols_evaluated"] == len(symbols) - short
+          and stats["PA01"]["hits"] == sum(e.insight_code == "PA01" for e in events)
+          and stats["PA01"]["time_ms"] >= 0, f"PA01={stats['PA01']} short={short}")
+
+    engine.registry.enable("VA03")
+    engine.registry.disable("X01")
+    codes = {e.insight_code for e in await engine.analyze_symbols(sm, symbols)}
+    check("Re-enable / disable at runtime", "VA03" in codes and "X01" not in codes, f"codes={sorted(codes)}")
+
+    try:
+        DetectorSpec(code="BAD", detect=big_body, build=build("BAD"),
+                     timeframe=Timeframe.DAILY, features=("no_such_feature",))
+        check("Unknown feature rejected", False)
+    except ValueError:
+        check("Unknown feature rejected", True)
+    try:
+        engine.registry.register(DetectorSpec(code="PA01", detect=big_body, build=build("PA01"),
+                                              timeframe=Timeframe.DAILY))
+        check("Duplicate code rejected", False)
+    except ValueError:
+        check("Duplicate code rejected", True)
+
+
+async def test_insight_log_writer():
+    """Batched log: size/time flushes on the worker thread, rotation, compression, close."""
+    import gzip
+    import json
+    import tempfile
+    import time
+    from pathlib import Path
+    print("\n[Test 12] Insight log writer (batched, rotating)")
+
+    tmp = Path(tempfile.mkdtemp())
+    now = [datetime(2024, 1, 19, 2, 0)]
+    writer = InsightLogWriter(str(tmp / "insights.jsonl"), batch_size=50, flush_interval=0.1,
+                              max_bytes=4000, compress=True, clock=lambda: now[0])
+    line = json.dumps({"insight_code": "PA03", "symbol": "FPT", "pad": "x" * 60})
+
+    start = time.perf_counter()
+    for _ in range(120):
+        writer.write(line)
+    enqueue_ms = (time.perf_counter() - start) * 1000
+    await asyncio.sleep(0.3)
+    stats = writer.get_stats()
+    check("Size + interval flushes write everything", stats["lines_written"] == 120 and stats["pending"] == 0,
+          f"stats={stats}")
+    check("Batched writes", stats["batches"] <= 4, f"batches={stats['batches']}")
+    check("Size rotation + gzip", stats["rotations"] >= 1 and stats["compressed"] == stats["rotations"]
+          and (tmp / "insights.2024-01-19.jsonl.gz").exists(),
+          f"files={sorted(p.name for p in tmp.iterdir())}")
+
+    now[0] = datetime(2024, 1, 20, 2, 0)  # next day
+    writer.write(line)
+    await writer.drain()
+    segments = sorted(p.name for p in tmp.iterdir())
+    check("Date rotation starts a fresh file", (tmp / "insights.jsonl").read_text().count("\n") == 1
+          and writer.get_stats()["rotations"] == stats["rotations"] + 1, f"files={segments}")
+
+    total = sum(len(gzip.open(p).read().splitlines()) for p in tmp.glob("*.gz"))
+    total += (tmp / "insights.jsonl").read_text().count("\n")
+    check("No line lost across segments", total == 121, f"total={total}")
+
+    # Engine path: events queued during analysis, flushed on close
+    engine = InsightEngine(log_file=None, dedup_window_seconds=0,
+                           log_writer=InsightLogWriter(str(tmp / "engine.jsonl"), flush_interval=60))
+    symbols, bars = gen_random_universe(50, seed=3)
+    sm = MarketStateManager()
+    await sm.update_bars(bars)
+    events = await engine.analyze_symbols(sm, symbols)
+    check("Analysis does not wait for the log", engine.get_stats()["log"]["lines_written"] == 0
+          and engine.get_stats()["log"]["pending"] == len(events), f"log={engine.get_stats()['log']}")
+    await engine.close()
+    logged = [json.loads(l) for l in (tmp / "engine.jsonl").read_text().splitlines()]
+    check("close() flushes queued insights", [e["insight_code"] for e in logged]
+          == [e.insight_code for e in events] and len(events) > 0, f"{len(logged)} vs {len(events)}")
+    engine._log_insight(events[0])
+    check("Closed writer ignores late lines", engine.get_stats()["log"]["pending"] == 0)
+    print(f"  enqueue 120 lines: {enqueue_ms:.2f} ms")
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
@@ -413,6 +835,11 @@ async def main():
     await test_ai_explain_vietnamese()
     await test_pipeline_monitor_counters()
     await test_full_pipeline_e2e()
+    await test_event_driven_analysis()
+    await test_detectors_match_v1()
+    await test_tm02_tie_matches_v1()
+    await test_detector_registry()
+    await test_insight_log_writer()
 
     print("\n" + "=" * 60)
     total = passed + failed
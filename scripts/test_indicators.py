@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Indicator library tests
+Vectorized SMA/EMA/RSI/MACD/Bollinger/ATR/VWAP over (symbols, time) arrays
+checked against straightforward per-symbol loops, NaN padding for short
+histories, and the consumers (state manager matrix, AlertEngine, TM02).
+Run: python scripts/test_indicators.py
+"""
+
+import asyncio
+import math
+import os
+import statistics
+import sys
+
+BASE = os.path.join(os.path.dirname(__file__), "..", "apps", "ai-service")
+sys.path.insert(0, BASE)
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.models.insight_models import PriceBar, Timeframe
+from app.services import indicators as ind
+from app.services.alert_engine import AlertEngine
+from app.services.insight_engine import InsightEngine
+from app.services.market_state_manager import MarketStateManager
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+passed = 0
+failed = 0
+
+
+def check(name: str, condition: bool, detail: str = ""):
+    global passed, failed
+    if condition:
+        passed += 1
+        print(f"  ✓ {name}")
+    else:
+        failed += 1
+        print(f"  ✗ {name} — {detail}")
+
+
+def close_enough(a, b, tol=1e-9) -> bool:
+    if a is None or b is None:
+        return a is None and b is None
+    if math.isnan(a) or math.isnan(b):
+        return math.isnan(a) and math.isnan(b)
+    return abs(a - b) <= tol * max(1.0, abs(b))
+
+
+def random_walk(n, seed, base=25.0):
+    rng = np.random.default_rng(seed)
+    close = base + np.cumsum(rng.normal(0, 0.3, n))
+    high = close + rng.uniform(0, 0.4, n)
+    low = close - rng.uniform(0, 0.4, n)
+    volume = rng.integers(1_000, 50_000, n).astype(float)
+    return high, low, close, volume
+
+
+def ref_ema(xs, period, alpha=None):
+    alpha = alpha if alpha is not None else 2 / (period + 1)
+    out = [math.nan] * len(xs)
+    valid = [i for i, x in enumerate(xs) if not math.isnan(x)]
+    if len(valid) < period:
+        return out
+    start = valid[period - 1]
+    prev = sum(xs[start - period + 1:start + 1]) / period
+    out[start] = prev
+    for i in range(start + 1, len(xs)):
+        prev = alpha * xs[i] + (1 - alpha) * prev
+        out[i] = prev
+    return out
+
+
+def ref_wilder_rsi(closes, period=14):
+    deltas = [closes[i] - closes[i - 1] for i in range(1, len(closes))]
+    g = sum(max(d, 0) for d in deltas[:period]) / period
+    l = sum(max(-d, 0) for d in deltas[:period]) / period
+    for d in deltas[period:]:
+        g = (g * (period - 1) + max(d, 0)) / period
+        l = (l * (period - 1) + max(-d, 0)) / period
+    return 100.0 if l == 0 else 100 - 100 / (1 + g / l)
+
+
+def make_daily(symbol, closes):
+    start = datetime(2024, 1, 1)
+    return [
+        PriceBar(symbol=symbol, timeframe=Timeframe.DAILY, timestamp=start + timedelta(days=i),
+                 open=c, high=c + 0.2, low=c - 0.2, close=c, volume=100_000)
+        for i, c in enumerate(closes)
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+async def test_series_against_reference():
+    print("\n[Test 1] Full-series indicators match per-symbol loops")
+    rows = [random_walk(80, seed) for seed in range(3)]
+    close = np.stack([r[2] for r in rows])
+
+    ok = True
+    for i in range(3):
+        xs = close[i].tolist()
+        for t in range(19, 80):
+            ok &= close_enough(ind.sma(close, 20)[i, t], sum(xs[t - 19:t + 1]) / 20)
+    check("SMA20", ok)
+
+    e = ind.ema(close, 12)
+    check("EMA12", all(close_enough(a, b) for i in range(3)
+                       for a, b in zip(e[i].tolist(), ref_ema(close[i].tolist(), 12))))
+
+    r = ind.rsi(close, 14, "wilder")
+    check("Wilder RSI14 (latest)", all(close_enough(r[i, -1], ref_wilder_rsi(close[i].tolist()))
+                                       for i in range(3)))
+    r = ind.rsi(close, 14, "simple")
+    check("Simple RSI14 == v1 calc_rsi", all(
+        round(float(r[i, t]), 2) == ind.calc_rsi(close[i, :t + 1].tolist())
+        for i in range(3) for t in range(14, 80)))
+
+    line, sig, hist = ind.macd(close)
+    ref_line = [a - b for a, b in zip(ref_ema(close[0].tolist(), 12), ref_ema(close[0].tolist(), 26))]
+    check("MACD line", all(close_enough(a, b) for a, b in zip(line[0].tolist(), ref_line)))
+    check("MACD signal", all(close_enough(a, b) for a, b in zip(sig[0].tolist(), ref_ema(ref_line, 9))))
+    check("MACD histogram", np.allclose(hist, line - sig, equal_nan=True))
+
+    upper, mid, lower = ind.bollinger(close)
+    ref_std = statistics.pstdev(close[1, -20:].tolist())
+    check("Bollinger bands", close_enough(upper[1, -1], mid[1, -1] + 2 * ref_std, 1e-7)
+          and close_enough(lower[1, -1], mid[1, -1] - 2 * ref_std, 1e-7))
+
+
+async def test_atr_and_vwap():
+    print("\n[Test 2] ATR (Wilder) and session-anchored VWAP")
+    high, low, close, volume = random_walk(40, 7)
+    tr = [high[0] - low[0]] + [
+        max(high[t] - low[t], abs(high[t] - close[t - 1]), abs(low[t] - close[t - 1]))
+        for t in range(1, 40)
+    ]
+    ref = ref_ema(tr, 14, alpha=1 / 14)
+    check("ATR14", all(close_enough(a, b) for a, b in zip(ind.atr(high, low, close).tolist(), ref)))
+
+    reset = np.zeros(40, dtype=bool)
+    reset[25] = True
+    v = ind.vwap(high, low, close, volume, reset=reset)
+    tp = (high + low + close) / 3
+    check("VWAP before reset", close_enough(v[24], float((tp[:25] * volume[:25]).sum() / volume[:25].sum())))
+    check("VWAP restarts at session open",
+          close_enough(v[39], float((tp[25:] * volume[25:]).sum() / volume[25:].sum())))
+
+
+async def test_padding_and_latest():
+    print("\n[Test 3] Short histories: NaN padding, latest/previous values")
+    from app.services.bar_buffer import BarColumns
+    _, _, long_close, _ = random_walk(60, 1)
+    short = np.arange(10, dtype=float) + 20
+    cols = [
+        BarColumns(np.arange(60), long_close, long_close, long_close, long_close, np.ones(60)),
+        BarColumns(np.arange(10), short, short, short, short, np.ones(10)),
+        None,
+    ]
+    m = ind.stack_columns(cols, 60)
+    check("stacked shape", m["close"].shape == (3, 60))
+    check("short row left-padded", np.isnan(m["close"][1, :50]).all()
+          and m["close"][1, -1] == short[-1])
+
+    latest = ind.compute_latest(m["close"], m["high"], m["low"], m["volume"])
+    check("long symbol gets MA50", not math.isnan(latest["ma50"][0]))
+    check("long symbol ma20 == sma20 tail", close_enough(latest["ma20"][0], long_close[-20:].mean(), 1e-12))
+    check("prev_ma20 is one bar earlier", close_enough(latest["prev_ma20"][0], long_close[-21:-1].mean(), 1e-12))
+    check("short symbol: MA20/RSI/MACD are NaN",
+          all(math.isnan(latest[k][1]) for k in ("ma20", "rsi", "macd_signal")))
+    check("missing symbol is all NaN", all(math.isnan(v[2]) for v in latest.values()))
+    check("MA200 NaN without 200 bars", math.isnan(latest["ma200"][0]))
+
+
+async def test_state_matrix_and_alert_engine():
+    print("\n[Test 4] State bar matrix feeds AlertEngine (no random indicators)")
+    sm = MarketStateManager()
+    walks = {}
+    for seed, sym in enumerate(("VNM", "FPT")):
+        _, _, close, _ = random_walk(50, seed + 10)
+        walks[sym] = close
+        await sm.update_bars(make_daily(sym, close.tolist()))
+
+    m = await sm.get_bar_matrix(["VNM", "FPT", "XXX"], Timeframe.DAILY)
+    check("matrix rows follow symbol order", m["close"].shape == (3, 50)
+          and m["close"][1, -1] == walks["FPT"][-1] and np.isnan(m["close"][2]).all())
+
+    engine = AlertEngine(state_manager=sm)
+    await engine._fetch_market_data(["VNM", "FPT"])
+    await engine._fetch_technical_indicators(["VNM", "FPT"])
+    first = engine._technical_cache[("FPT", Timeframe.DAILY)]
+    await engine._fetch_technical_indicators(["VNM", "FPT"])
+    check("indicators deterministic", engine._technical_cache[("FPT", Timeframe.DAILY)] == first)
+
+    snap = await sm.get_snapshot("FPT")
+    check("RSI agrees with snapshot", round(first.rsi, 2) == snap.rsi14, f"{first.rsi} vs {snap.rsi14}")
+    check("MA20 agrees with snapshot", round(first.ma_20, 2) == snap.ma20)
+    check("MA200 None without history", first.ma_200 is None)
+    check("market data from snapshot", engine._market_data_cache["FPT"].price == snap.last_price)
+
+    rsi_hit = {"indicator": "rsi", "operator": ">=", "value": first.rsi - 1}
+    ma200 = {"indicator": "ma", "operator": ">", "value": 20, "value_secondary": 200}
+    result = await engine.check_alert({"id": "a1", "symbol": "FPT", "conditions": [rsi_hit]})
+    check("RSI condition triggers", result["triggered"])
+    result = await engine.check_alert({"id": "a2", "symbol": "FPT", "conditions": [ma200]})
+    check("MA200 condition reports insufficient history", not result["triggered"]
+          and result["insufficient_history"] == ["MA(200): chưa đủ lịch sử (50/200 phiên)"], f"{result}")
+    result = await engine.check_alert({"id": "a3", "symbol": "FPT", "logic_operator": "OR",
+                                       "conditions": [rsi_hit, ma200]})
+    check("OR alert still triggers on the evaluable condition", result["triggered"]
+          and len(result["insufficient_history"]) == 1)
+
+    fresh = AlertEngine(state_manager=sm)
+    result = await fresh.evaluate({"id": "a4", "symbol": "FPT", "conditions": [rsi_hit]})
+    check("evaluate() loads state for a single alert", result["triggered"]
+          and result["trigger_data"]["rsi"] == first.rsi)
+
+    bb = {"indicator": "bb", "operator": "touches_upper", "value": 0}
+    is_met, _ = await engine._evaluate_condition(bb, engine._market_data_cache["FPT"], first)
+    check("BB touch uses real bands", is_met == (snap.last_price >= first.bb_upper * 0.995))
+
+    # check_interval picks the frame: 5m / 1h alerts run on bars resampled from 1m
+    _, _, close, _ = random_walk(120, 42)
+    start = datetime(2024, 1, 19, 2, 0)  # 09:00 ICT
+    await sm.update_bars([PriceBar(symbol="FPT", timeframe=Timeframe.INTRADAY_1M,
+                                   timestamp=start + timedelta(minutes=i), open=c, high=c, low=c,
+                                   close=c, volume=100) for i, c in enumerate(close.tolist())])
+    five = await sm.get_bar_matrix(["FPT"], Timeframe.INTRADAY_5M)
+    result = await fresh.evaluate({"id": "a5", "symbol": "FPT", "check_interval": "5m",
+                                   "conditions": [{"indicator": "rsi", "operator": ">=", "value": 0}]})
+    tech = fresh._technical_cache[("FPT", Timeframe.INTRADAY_5M)]
+    closes_5m = five["close"][0][~np.isnan(five["close"][0])]
+    check("5m alert computed on resampled bars", result["triggered"] and tech.bar_count == 24
+          and math.isclose(tech.ma_20, closes_5m[-20:].mean()), f"{tech}")
+    result = await fresh.evaluate({"id": "a6", "symbol": "FPT", "check_interval": "1h",
+                                   "conditions": [ma200]})
+    check("1h alert reports insufficient 1h bars", result["insufficient_history"]
+          == ["MA(200): chưa đủ lịch sử (2/200 nến)"], f"{result}")
+
+
+async def test_tm02_uses_library():
+    print("\n[Test 5] TM02 golden cross via shared SMA")
+    # MA20 sits just below MA50 until the last bar's jump lifts it above
+    closes = [30.0] * 31 + [29.0] * 19 + [55.0]
+    bars = make_daily("HPG", closes)
+    sm = MarketStateManager(rolling_window_daily=60)
+    await sm.update_bars(bars)
+    snap = await sm.get_snapshot("HPG")
+    engine = InsightEngine(log_file=None)
+    events = [e for e in await engine.analyze_symbol("HPG", snap, [], bars) if e.insight_code == "TM02"]
+
+    prev20 = sum(closes[-21:-1]) / 20
+    prev50 = sum(closes[-51:-1]) / 50
+    expect = prev20 <= prev50 and snap.ma20 > snap.ma50
+    check("golden cross detected", bool(events) == expect and expect,
+          f"prev20={prev20:.2f} prev50={prev50:.2f} ma20={snap.ma20} ma50={snap.ma50}")
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+async def main():
+    print("=" * 60)
+    print("Indicator Library Tests")
+    print("=" * 60)
+
+    await test_series_against_reference()
+    await test_atr_and_vwap()
+    await test_padding_and_latest()
+    await test_state_matrix_and_alert_engine()
+    await test_tm02_uses_library()
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed}/{passed + failed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    ok = asyncio.run(main())
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,662 @@
+#!/usr/bin/env python3
+"""
+Market State Manager tests
+Columnar ring buffers, snapshot parity with the legacy list-based math,
+incremental indicator modes, timestamp dedup index, batched ingest,
+versioned snapshot cache, multi-timeframe resampling, warm restart,
+shared-memory multi-worker state, history backfill.
+Run: python scripts/test_market_state.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+BASE = os.path.join(os.path.dirname(__file__), "..", "apps", "ai-service")
+sys.path.insert(0, BASE)
+
+from datetime import datetime, timedelta
+
+from app.models.insight_models import PriceBar, Timeframe
+from app.services.bar_buffer import BarRingBuffer, from_epoch_us, to_epoch_us
+from app.services.bar_resampler import BarResampler, bucket_start_us
+from app.services.market_state_manager import MarketStateManager
+from app.services.state_snapshot import HEADER_DTYPE, StateSnapshotStore
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+passed = 0
+failed = 0
+
+
+def check(name: str, condition: bool, detail: str = ""):
+    global passed, failed
+    if condition:
+        passed += 1
+        print(f"  ✓ {name}")
+    else:
+        failed += 1
+        print(f"  ✗ {name} — {detail}")
+
+
+def make_bar(symbol, tf, ts, o, h, l, c, vol=100_000):
+    return PriceBar(
+        symbol=symbol, timeframe=tf, timestamp=ts,
+        open=o, high=h, low=l, close=c, volume=vol,
+    )
+
+
+def gen_daily_bars(symbol, n, base_price=25.0):
+    """Zig-zag daily bars so RSI has both gains and losses."""
+    bars = []
+    start = datetime(2024, 1, 1)
+    price = base_price
+    for i in range(n):
+        o = price
+        c = price + (0.37 if i % 3 else -0.21)
+        bars.append(make_bar(symbol, Timeframe.DAILY, start + timedelta(days=i),
+                             o, max(o, c) + 0.05, min(o, c) - 0.05, c, 500_000 + i * 1_000))
+        price = c
+    return bars
+
+
+def gen_1m_bars(symbol, n, base_price=26.0, start=None):
+    start = start or datetime(2024, 3, 1, 2, 15)
+    return [
+        make_bar(symbol, Timeframe.INTRADAY_1M, start + timedelta(minutes=i),
+                 base_price + i * 0.01, base_price + i * 0.01 + 0.05,
+                 base_price + i * 0.01 - 0.05, base_price + i * 0.01 + 0.02, 1_000 + i)
+        for i in range(n)
+    ]
+
+
+def legacy_ma(closes, period):
+    if len(closes) < period:
+        return None
+    return round(sum(closes[-period:]) / period, 2)
+
+
+def legacy_rsi(closes, period=14):
+    if len(closes) < period + 1:
+        return None
+    deltas = [closes[i] - closes[i - 1] for i in range(1, len(closes))]
+    recent = deltas[-period:]
+    gains = [d for d in recent if d > 0]
+    losses = [-d for d in recent if d < 0]
+    avg_gain = sum(gains) / period if gains else 0
+    avg_loss = sum(losses) / period if losses else 0
+    if avg_loss == 0:
+        return 100.0
+    return round(100 - (100 / (1 + avg_gain / avg_loss)), 2)
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+async def test_ring_buffer_wraps():
+    print("\n[Test 1] BarRingBuffer wrap-around keeps newest bars contiguous")
+    buf = BarRingBuffer(5)
+    for i in range(12):
+        buf.append(i, float(i), float(i) + 1, float(i) - 1, float(i) + 0.5, i * 10)
+
+    cols = buf.columns()
+    check("size capped at capacity", len(buf) == 5, f"len={len(buf)}")
+    check("timestamps oldest-first", cols.timestamp.tolist() == [7, 8, 9, 10, 11],
+          f"ts={cols.timestamp.tolist()}")
+    check("close column matches", cols.close.tolist() == [7.5, 8.5, 9.5, 10.5, 11.5])
+    check("views are contiguous (zero-copy)", cols.close.flags["C_CONTIGUOUS"]
+          and cols.close.base is not None)
+    check("views are read-only", not cols.close.flags.writeable)
+    check("last n window", buf.columns(2).volume.tolist() == [100, 110])
+    check("last_close offset", buf.last_close(2) == 10.5)
+
+
+async def test_timestamp_roundtrip():
+    print("\n[Test 2] Timestamp encode/decode round-trip")
+    ts = datetime(2024, 5, 17, 9, 15, 0, 123456)
+    check("naive UTC round-trip", from_epoch_us(to_epoch_us(ts)) == ts)
+
+
+async def test_snapshot_parity():
+    print("\n[Test 3] Snapshot matches legacy list-based math")
+    sm = MarketStateManager()
+    daily = gen_daily_bars("VNM", 70)  # more than the 50-bar window
+    intraday = gen_1m_bars("VNM", 80)
+    await sm.update_bars(daily + intraday)
+
+    snap = await sm.get_snapshot("VNM")
+    closes = [b.close for b in daily[-50:]]
+    check("bar_count_daily capped at 50", snap.bar_count_daily == 50, f"{snap.bar_count_daily}")
+    check("bar_count_1m capped at 60", snap.bar_count_1m == 60, f"{snap.bar_count_1m}")
+    check("last_price from latest 1m bar", snap.last_price == intraday[-1].close)
+    check("prev_close from daily[-2]", snap.prev_close == closes[-2])
+    check("MA20 parity", snap.ma20 == legacy_ma(closes, 20), f"{snap.ma20} vs {legacy_ma(closes, 20)}")
+    check("MA50 parity", snap.ma50 == legacy_ma(closes, 50), f"{snap.ma50} vs {legacy_ma(closes, 50)}")
+    check("RSI14 parity", snap.rsi14 == legacy_rsi(closes), f"{snap.rsi14} vs {legacy_rsi(closes)}")
+
+
+async def test_recent_bars_and_columns():
+    print("\n[Test 4] get_recent_bars / get_recent_columns")
+    sm = MarketStateManager()
+    intraday = gen_1m_bars("FPT", 30)
+    await sm.update_bars(intraday)
+
+    bars = await sm.get_recent_bars("FPT", Timeframe.INTRADAY_1M, 5)
+    check("returns 5 PriceBars", len(bars) == 5 and all(isinstance(b, PriceBar) for b in bars))
+    check("bars equal input", [b.model_dump() for b in bars] == [b.model_dump() for b in intraday[-5:]])
+
+    cols = await sm.get_recent_columns("FPT", Timeframe.INTRADAY_1M, 5)
+    check("columns close match", cols.close.tolist() == [b.close for b in intraday[-5:]])
+    check("unknown symbol -> None", await sm.get_recent_columns("XXX", Timeframe.DAILY) is None)
+
+
+async def test_wilder_mode():
+    print("\n[Test 5] Wilder mode: running MAs + Wilder RSI")
+    sm = MarketStateManager(indicator_mode="wilder")
+    daily = gen_daily_bars("HPG", 70)
+    await sm.update_bars(daily)
+    snap = await sm.get_snapshot("HPG")
+
+    closes = [b.close for b in daily]
+    deltas = [closes[i] - closes[i - 1] for i in range(1, len(closes))]
+    avg_gain = sum(max(d, 0) for d in deltas[:14]) / 14
+    avg_loss = sum(max(-d, 0) for d in deltas[:14]) / 14
+    for d in deltas[14:]:
+        avg_gain = (avg_gain * 13 + max(d, 0)) / 14
+        avg_loss = (avg_loss * 13 + max(-d, 0)) / 14
+    ref_rsi = round(100 - 100 / (1 + avg_gain / avg_loss), 2)
+
+    check("MA20 matches window mean", snap.ma20 == legacy_ma(closes, 20), f"{snap.ma20}")
+    check("MA50 matches window mean", snap.ma50 == legacy_ma(closes, 50), f"{snap.ma50}")
+    check("RSI14 matches Wilder reference", snap.rsi14 == ref_rsi, f"{snap.rsi14} vs {ref_rsi}")
+
+
+async def test_indicator_readiness():
+    print("\n[Test 6] Indicators stay None until the window is long enough")
+    for mode in ("exact", "wilder"):
+        sm = MarketStateManager(indicator_mode=mode)
+        await sm.update_bars(gen_daily_bars("MWG", 14))
+        snap = await sm.get_snapshot("MWG")
+        check(f"[{mode}] RSI None with 14 bars", snap.rsi14 is None, f"{snap.rsi14}")
+        check(f"[{mode}] MA20 None with 14 bars", snap.ma20 is None, f"{snap.ma20}")
+
+
+async def test_dedup_and_forming_bar():
+    print("\n[Test 7] Timestamp index: duplicates, forming bar, late bars, eviction")
+    sm = MarketStateManager(rolling_window_1m=5)
+    bars = gen_1m_bars("VIC", 8)
+    await sm.update_bars(bars)
+    await sm.update_bars(bars)  # overlapping poll window
+    state = sm._states["VIC"]
+    check("duplicates ignored", len(state.bars_1m) == 5, f"len={len(state.bars_1m)}")
+    check("session volume counted once", state.session_volume == sum(b.volume for b in bars),
+          f"{state.session_volume}")
+    check("evicted timestamps leave the index",
+          to_epoch_us(bars[0].timestamp) not in state.bars_1m
+          and to_epoch_us(bars[-1].timestamp) in state.bars_1m)
+
+    last = bars[-1]
+    forming = make_bar("VIC", Timeframe.INTRADAY_1M, last.timestamp,
+                       last.open, last.high + 0.5, last.low, last.close + 0.4, last.volume + 500)
+    await sm.update_bars([forming])
+    cols = state.bars_1m.columns()
+    check("forming bar replaced in place", len(cols) == 5 and cols.close[-1] == forming.close)
+    check("session volume swaps forming bar volume",
+          state.session_volume == sum(b.volume for b in bars) + 500, f"{state.session_volume}")
+    check("session high widened", state.session_high == forming.high)
+
+    # Late bar: between two held bars (drop one held bar to make a gap first)
+    sm2 = MarketStateManager()
+    seq = gen_1m_bars("SSI", 6)
+    await sm2.update_bars(seq[:3] + seq[4:])
+    await sm2.update_bars([seq[3]])
+    ts = (await sm2.get_recent_columns("SSI", Timeframe.INTRADAY_1M, 10)).timestamp.tolist()
+    check("late bar inserted in order", ts == [to_epoch_us(b.timestamp) for b in seq], f"{ts}")
+
+
+async def test_forming_daily_bar_indicators():
+    print("\n[Test 8] Forming daily bar update keeps indicators in sync")
+    for mode in ("exact", "wilder"):
+        sm = MarketStateManager(indicator_mode=mode)
+        daily = gen_daily_bars("VCB", 60)
+        await sm.update_bars(daily)
+        last = daily[-1]
+        revised = make_bar("VCB", Timeframe.DAILY, last.timestamp,
+                           last.open, last.high + 2, last.low, last.close + 1.7, last.volume)
+        await sm.update_bars([revised])
+        snap = await sm.get_snapshot("VCB")
+
+        ref = MarketStateManager(indicator_mode=mode)
+        await ref.update_bars(daily[:-1] + [revised])
+        ref_snap = await ref.get_snapshot("VCB")
+        check(f"[{mode}] MA20/MA50 match fresh ingest",
+              (snap.ma20, snap.ma50) == (ref_snap.ma20, ref_snap.ma50),
+              f"{snap.ma20},{snap.ma50} vs {ref_snap.ma20},{ref_snap.ma50}")
+        check(f"[{mode}] RSI14 matches fresh ingest", snap.rsi14 == ref_snap.rsi14,
+              f"{snap.rsi14} vs {ref_snap.rsi14}")
+
+
+async def test_batch_change_summary():
+    print("\n[Test 9] Batched update_bars returns per-symbol change summary")
+    sm = MarketStateManager()
+    vnm = gen_1m_bars("VNM", 10)
+    fpt = gen_1m_bars("FPT", 10)
+    hpg = gen_daily_bars("HPG", 5)
+    await sm.update_bars(vnm + fpt + hpg)
+
+    last = fpt[-1]
+    forming = make_bar("FPT", Timeframe.INTRADAY_1M, last.timestamp,
+                       last.open, last.high, last.low, last.close + 0.1, last.volume + 10)
+    more_vnm = gen_1m_bars("VNM", 3, start=vnm[-1].timestamp + timedelta(minutes=1))
+    # Shuffled input: grouping + sort must still append in order
+    summary = await sm.update_bars(list(reversed(more_vnm)) + [forming] + hpg)
+
+    check("VNM -> new_bars", summary["VNM"].status == "new_bars" and summary["VNM"].appended == 3,
+          f"{summary['VNM']}")
+    check("FPT -> updated_last", summary["FPT"].status == "updated_last", f"{summary['FPT']}")
+    check("HPG -> untouched", summary["HPG"].status == "untouched" and not summary["HPG"].changed,
+          f"{summary['HPG']}")
+    check("changed timeframes tracked", summary["VNM"].timeframes == {Timeframe.INTRADAY_1M})
+    ts = (await sm.get_recent_columns("VNM", Timeframe.INTRADAY_1M, 60)).timestamp.tolist()
+    check("shuffled batch stored in order", ts == sorted(ts) and len(ts) == 13, f"len={len(ts)}")
+
+
+async def test_snapshot_cache_and_versions():
+    print("\n[Test 10] Versioned snapshot cache + changed_since")
+    sm = MarketStateManager()
+    await sm.update_bars(gen_1m_bars("VNM", 5) + gen_1m_bars("FPT", 5))
+    cursor = sm.version
+
+    s1 = await sm.get_snapshot("VNM")
+    s2 = await sm.get_snapshot("VNM")
+    check("cached snapshot reused", s1 is s2)
+    check("nothing changed since cursor", sm.changed_since(cursor) == [])
+
+    await sm.update_bars(gen_1m_bars("FPT", 5))  # pure duplicates
+    check("duplicates do not bump version", sm.changed_since(cursor) == [])
+
+    more = gen_1m_bars("VNM", 2, start=datetime(2024, 3, 1, 2, 20))
+    await sm.update_bars(more)
+    check("changed_since lists VNM only", sm.changed_since(cursor) == ["VNM"],
+          f"{sm.changed_since(cursor)}")
+    s3 = await sm.get_snapshot("VNM")
+    check("new data -> new snapshot", s3 is not s1 and s3.bar_count_1m == 7, f"{s3.bar_count_1m}")
+    check("newer cursor sees nothing", sm.changed_since(sm.version) == [])
+
+    sm.stale_threshold = -1  # everything is stale now
+    s4 = await sm.get_snapshot("VNM")
+    check("staleness flip rebuilds snapshot", s4 is not s3 and s4.is_stale)
+
+
+def reference_resample(bars, minutes):
+    """Plain group-by over 1m bars, keyed by session-anchored bucket."""
+    out = {}
+    for b in bars:
+        key = bucket_start_us(to_epoch_us(b.timestamp), minutes)
+        if key not in out:
+            out[key] = [b.open, b.high, b.low, b.close, b.volume]
+        else:
+            agg = out[key]
+            agg[1] = max(agg[1], b.high)
+            agg[2] = min(agg[2], b.low)
+            agg[3] = b.close
+            agg[4] += b.volume
+    return [(k, *v) for k, v in sorted(out.items())]
+
+
+async def test_resampled_frames():
+    print("\n[Test 11] 1m -> 5m/15m/30m/1h resampling across lunch break")
+    sm = MarketStateManager()
+    # 11:10-11:29 ICT (04:10 UTC) then 13:00-13:19 ICT (06:00 UTC)
+    morning = gen_1m_bars("ACB", 20, start=datetime(2024, 3, 1, 4, 10))
+    afternoon = gen_1m_bars("ACB", 20, base_price=27.0, start=datetime(2024, 3, 1, 6, 0))
+    await sm.update_bars(morning + afternoon)
+
+    h1 = await sm.get_recent_bars("ACB", Timeframe.INTRADAY_1H, 10)
+    check("1h: lunch splits into 11:00 and 13:00 ICT buckets",
+          [b.timestamp.hour for b in h1] == [4, 6], f"{[b.timestamp for b in h1]}")
+    check("1h morning bucket volume = 11:10-11:29 minutes",
+          h1[0].volume == sum(b.volume for b in morning))
+
+    ok = True
+    for tf, minutes in ((Timeframe.INTRADAY_5M, 5), (Timeframe.INTRADAY_15M, 15),
+                        (Timeframe.INTRADAY_30M, 30), (Timeframe.INTRADAY_1H, 60)):
+        cols = await sm.get_recent_columns("ACB", tf, 60)
+        got = list(zip(cols.timestamp.tolist(), cols.open.tolist(), cols.high.tolist(),
+                       cols.low.tolist(), cols.close.tolist(), cols.volume.tolist()))
+        ok = ok and got == [tuple(r) for r in reference_resample(morning + afternoon, minutes)]
+    check("all frames match group-by reference", ok)
+
+    # Forming minute revised, then a late minute inserted
+    last = afternoon[-1]
+    forming = make_bar("ACB", Timeframe.INTRADAY_1M, last.timestamp,
+                       last.open, last.high + 0.3, last.low, last.close + 0.2, last.volume + 77)
+    dropped = afternoon[10]
+    sm2 = MarketStateManager()
+    await sm2.update_bars(morning + afternoon[:10] + afternoon[11:])
+    await sm2.update_bars([forming])
+    await sm2.update_bars([dropped])
+    expected = morning + afternoon[:-1] + [forming]
+    ok = True
+    for tf, minutes in ((Timeframe.INTRADAY_5M, 5), (Timeframe.INTRADAY_15M, 15)):
+        cols = await sm2.get_recent_columns("ACB", tf, 60)
+        got = list(zip(cols.timestamp.tolist(), cols.open.tolist(), cols.high.tolist(),
+                       cols.low.tolist(), cols.close.tolist(), cols.volume.tolist()))
+        ok = ok and got == [tuple(r) for r in reference_resample(expected, minutes)]
+    check("forming + late minutes keep frames exact", ok)
+
+
+async def test_warm_restart_snapshot():
+    print("\n[Test 12] Memory-mapped warm-restart snapshot")
+    import tempfile
+    from pathlib import Path
+
+    tmpdir = Path(tempfile.mkdtemp())
+    store = StateSnapshotStore(path=str(tmpdir / "state.bin"))
+
+    sm = MarketStateManager()
+    for sym in ("VNM", "FPT", "HPG"):
+        await sm.update_bars(gen_daily_bars(sym, 55) + gen_1m_bars(sym, 70))
+    written = await store.save(sm)
+    check("3 symbols written", written == 3, f"{written}")
+
+    sm2 = MarketStateManager()
+    restored = store.restore(sm2)
+    check("3 symbols restored", restored == 3, f"{restored}")
+    before = (await sm.get_snapshot("FPT")).model_dump()
+    after = (await sm2.get_snapshot("FPT")).model_dump()
+    before.pop("is_stale"), after.pop("is_stale")
+    check("restored snapshot identical", before == after, f"{before} vs {after}")
+    cols1 = await sm.get_recent_columns("FPT", Timeframe.INTRADAY_15M, 60)
+    cols2 = await sm2.get_recent_columns("FPT", Timeframe.INTRADAY_15M, 60)
+    check("resampled frames rebuilt", cols1.close.tolist()[-2:] == cols2.close.tolist()[-2:])
+    replay = BarResampler(60)
+    for row in sm2._states["FPT"].bars_1m.to_bars("FPT", Timeframe.INTRADAY_1M):
+        replay.on_append(to_epoch_us(row.timestamp), row.open, row.high, row.low,
+                         row.close, row.volume)
+    check("vectorized rebuild matches incremental",
+          all(replay.buffers[tf].to_bars("FPT", tf) == sm2._states["FPT"].buffer_for(tf).to_bars("FPT", tf)
+              for tf in replay.buffers))
+    check("restored state keeps deduping",
+          (await sm2.update_bars(gen_1m_bars("FPT", 70)))["FPT"].status == "untouched")
+
+    # Flip one byte inside the second record -> only that record is dropped
+    path = tmpdir / "state.bin"
+    data = bytearray(path.read_bytes())
+    rec_size = (len(data) - HEADER_DTYPE.itemsize) // 3
+    data[HEADER_DTYPE.itemsize + rec_size + 100] ^= 0xFF
+    path.write_bytes(bytes(data))
+    sm3 = MarketStateManager()
+    check("corrupt record skipped, others restored", store.restore(sm3) == 2
+          and len(sm3.get_tracked_symbols()) == 2, f"{sm3.get_tracked_symbols()}")
+
+    # Unknown format version -> whole file ignored
+    data[8] = 99
+    path.write_bytes(bytes(data))
+    check("format version mismatch ignored", store.restore(MarketStateManager()) == 0)
+
+
+async def test_shared_memory_state():
+    print("\n[Test 13] Shared-memory state: single writer, readers in other processes")
+    import subprocess
+    from app.services.shared_state import SharedStateReader, SharedStateWriter, open_shared_state
+
+    name = f"stm_test_{os.getpid()}"
+    sm = MarketStateManager()
+    for sym in ("VNM", "FPT", "HPG"):
+        await sm.update_bars(gen_daily_bars(sym, 55) + gen_1m_bars(sym, 70))
+
+    writer = SharedStateWriter.create(name, max_symbols=10, cap_1m=60, cap_daily=50)
+    reader = SharedStateReader(name)
+    try:
+        check("all symbols published", writer.publish(sm) == 3)
+        check("reader sees symbols", reader.get_tracked_symbols() == ["VNM", "FPT", "HPG"],
+              f"{reader.get_tracked_symbols()}")
+        before = (await sm.get_snapshot("FPT")).model_dump()
+        after = (await reader.get_snapshot("FPT")).model_dump()
+        check("reader snapshot identical", before == after, f"{before} vs {after}")
+        for tf in (Timeframe.INTRADAY_1M, Timeframe.DAILY):
+            a = await sm.get_recent_columns("FPT", tf, 60)
+            b = await reader.get_recent_columns("FPT", tf, 60)
+            check(f"{tf.value} columns identical",
+                  a.timestamp.tolist() == b.timestamp.tolist() and a.close.tolist() == b.close.tolist())
+        a = await sm.get_recent_bars("FPT", Timeframe.INTRADAY_15M, 2)
+        b = await reader.get_recent_bars("FPT", Timeframe.INTRADAY_15M, 2)
+        check("resampled frame served from 1m window", a == b, f"{a} vs {b}")
+
+        cursor = reader.version
+        await sm.update_bars(gen_1m_bars("HPG", 1, start=datetime(2024, 3, 1, 3, 30)))
+        writer.publish(sm)
+        check("changed_since via shared versions", reader.changed_since(cursor) == ["HPG"],
+              f"{reader.changed_since(cursor)}")
+        check("cached snapshot refreshed on new version",
+              (await reader.get_snapshot("HPG")).last_price == (await sm.get_snapshot("HPG")).last_price)
+        builds = []
+        build = sm._build_snapshot
+        sm._build_snapshot = lambda st, stale: builds.append(st.symbol) or build(st, stale)
+        await sm.update_bars(gen_1m_bars("HPG", 1, start=datetime(2024, 3, 1, 3, 31)))
+        writer.publish(sm)
+        await sm.get_snapshot("HPG")
+        check("publish shares the per-version snapshot cache", builds == ["HPG"], f"{builds}")
+
+        code = (
+            "import asyncio; from app.services.shared_state import SharedStateReader; "
+            f"r = SharedStateReader('{name}'); "
+            "print(r.get_tracked_symbols(), asyncio.run(r.get_snapshot('VNM')).last_price)"
+        )
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                             env={**os.environ, "PYTHONPATH": BASE}, timeout=60)
+        expected = f"['VNM', 'FPT', 'HPG'] {(await sm.get_snapshot('VNM')).last_price}"
+        check("reader in another process", out.stdout.strip() == expected,
+              f"{out.stdout.strip()!r} {out.stderr[-300:]}")
+        check("segment survives reader process exit", reader.get_tracked_symbols() != [])
+
+        # A record stuck mid-write: reads back off, then serve the last good meta
+        known = await reader.get_snapshot("VNM")
+        slot = reader._slot_of["VNM"]
+        writer._seg.slots[slot]["seq"] += 1
+        try:
+            start = time.perf_counter()
+            stuck = await reader.get_snapshot("VNM")
+            waited = time.perf_counter() - start
+            bars = await reader.get_recent_columns("VNM", Timeframe.DAILY, 5)
+        finally:
+            writer._seg.slots[slot]["seq"] += 1
+        check("busy slot serves last good snapshot", stuck == known, f"{stuck}")
+        check("busy slot bars skipped, not raised", bars is None)
+        check("busy slot read gives up quickly", waited < 0.1, f"{waited:.3f}s")
+        check("fallbacks counted", reader.get_stats()["read_fallbacks"] == 2,
+              f"{reader.get_stats()}")
+        check("slot readable once the write ends",
+              (await reader.get_recent_columns("VNM", Timeframe.DAILY, 5)) is not None)
+
+        small = SharedStateWriter.create(name + "_s", max_symbols=2, cap_1m=60, cap_daily=50)
+        check("full segment drops extra symbols", small.publish(sm) == 2
+              and small.get_stats()["records_dropped"] == 1)
+        small.close()
+    finally:
+        reader.close()
+        writer.close()
+
+    w1, r1 = open_shared_state("auto", name, 10, 60, 50)
+    w2, r2 = open_shared_state("auto", name, 10, 60, 50)
+    check("auto: first process becomes writer", w1 is not None and r1 is None)
+    check("auto: live writer -> reader", w2 is None and r2 is not None)
+    w1.close()
+    w3, r3 = open_shared_state("auto", name, 10, 60, 50)
+    check("auto: closed writer is replaced", w3 is not None)
+    w3.close()
+
+
+class FakeStockHistory:
+    """Minimal stand-in for the supabase-py query builder over stock_history."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+        self.scanned = []  # rows matching each query before the limit
+
+    def table(self, name):
+        assert name == "stock_history"
+        self._q = {"since": None, "symbols": None, "after": None, "limit": None}
+        return self
+
+    def select(self, columns):
+        return self
+
+    def gte(self, column, value):
+        self._q["since"] = value
+        return self
+
+    def in_(self, column, values):
+        self._q["symbols"] = set(values)
+        return self
+
+    def order(self, column):
+        return self
+
+    def or_(self, filters):
+        # Keyset resume: "symbol.gt.S,and(symbol.eq.S,date.gt.D)" -> rows after (S, D)
+        symbol = filters.split(",")[0].split(".", 2)[2]
+        after_date = filters.rsplit("date.gt.", 1)[1].rstrip(")")
+        self._q["after"] = (symbol, after_date)
+        return self
+
+    def limit(self, n):
+        self._q["limit"] = n
+        return self
+
+    def execute(self):
+        self.queries += 1
+        after = self._q["after"]
+        rows = sorted(
+            (r for r in self.rows if r["date"] >= self._q["since"]
+             and (self._q["symbols"] is None or r["symbol"] in self._q["symbols"])
+             and (after is None or (r["symbol"], r["date"]) > after)),
+            key=lambda r: (r["symbol"], r["date"]),
+        )
+        self.scanned.append(len(rows))
+        return type("Resp", (), {"data": rows[:self._q["limit"]]})()
+
+
+async def test_history_backfill():
+    print("\n[Test 14] Daily history backfill: files, Supabase paging, merge with state")
+    import tempfile
+    from datetime import date
+    from pathlib import Path
+
+    import numpy as np
+
+    from app.services.history_backfill import HistoryBackfill
+    from app.services.market_polling_service import MarketPollingService
+
+    today = date.today()
+    rows = []
+    for sym in ("VNM", "FPT", "HPG"):
+        for bar in gen_daily_bars(sym, 60):
+            rows.append({
+                "symbol": sym,
+                "date": (today - timedelta(days=60) + (bar.timestamp - datetime(2024, 1, 1))).isoformat(),
+                "open": bar.open, "high": bar.high, "low": bar.low,
+                "close": bar.close, "volume": bar.volume,
+            })
+
+    tmpdir = Path(tempfile.mkdtemp())
+    csv_path = tmpdir / "history.csv"
+    with open(csv_path, "w") as f:
+        f.write("symbol,date,open,high,low,close,volume\n")
+        for r in rows:
+            f.write(",".join(str(r[c]) for c in ("symbol", "date", "open", "high", "low", "close", "volume")) + "\n")
+    npz_path = tmpdir / "history.npz"
+    np.savez(npz_path, **{c: np.array([r[c] for r in rows]) for c in rows[0]})
+
+    expected = [r["close"] for r in rows if r["symbol"] == "FPT"][-50:]
+    for path in (csv_path, npz_path):
+        sm = MarketStateManager()
+        loaded = await HistoryBackfill(sm).run(str(path))
+        snap = await sm.get_snapshot("FPT")
+        cols = await sm.get_recent_columns("FPT", Timeframe.DAILY, 50)
+        check(f"{path.suffix}: 3 symbols loaded", loaded == 3, f"{loaded}")
+        check(f"{path.suffix}: newest 50 closes held", cols.close.tolist() == expected)
+        check(f"{path.suffix}: indicators ready", snap.ma50 == legacy_ma(expected, 50)
+              and snap.rsi14 == legacy_rsi(expected), f"{snap.ma50} {snap.rsi14}")
+
+    sm = MarketStateManager()
+    fake = FakeStockHistory(rows)
+    backfill = HistoryBackfill(sm, page_size=50, supabase_client=fake)
+    loaded = await backfill.run("supabase", symbols=["fpt", "hpg"])
+    check("supabase: symbol filter", loaded == 2 and sm.get_tracked_symbols() == ["FPT", "HPG"],
+          f"{sm.get_tracked_symbols()}")
+    check("supabase: paged queries", fake.queries == 3, f"{fake.queries}")  # 120 rows / 50
+    check("supabase: keyset pages resume after the last key", fake.scanned == [120, 70, 20],
+          f"{fake.scanned}")
+    cols = await sm.get_recent_columns("FPT", Timeframe.DAILY, 50)
+    check("supabase: newest 50 closes held", cols.close.tolist() == expected)
+
+    # Bars already in state (warm restart / today's forming bar) win over history
+    sm = MarketStateManager()
+    last_day = datetime.combine(today - timedelta(days=1), datetime.min.time())
+    await sm.update_bars([make_bar("FPT", Timeframe.DAILY, last_day, 1, 2, 0.5, 1.5)])
+    await HistoryBackfill(sm).run(str(csv_path), symbols=["FPT"])
+    cols = await sm.get_recent_columns("FPT", Timeframe.DAILY, 50)
+    check("merge: held bar kept over history", cols.close.tolist()[-1] == 1.5
+          and len(cols) == 50, f"{cols.close.tolist()[-1]}")
+
+    class CountingSSI:
+        def __init__(self):
+            self.daily_counts = {}
+
+        async def get_intraday_ohlc(self, symbol, resolution, count):
+            return []
+
+        async def get_daily_ohlc(self, symbol, count):
+            self.daily_counts[symbol] = count
+            return []
+
+    ssi = CountingSSI()
+    poller = MarketPollingService(ssi_client=ssi)
+    poller.mark_daily_backfilled(backfill.loaded_symbols())
+    for sym in ("FPT", "VNM"):
+        await poller._fetch_symbol_bars(sym)
+    check("polling skips daily history for backfilled symbols",
+          ssi.daily_counts == {"FPT": 2, "VNM": 50}
+          and poller.get_stats()["daily_history_fetches"] == 1, f"{ssi.daily_counts}")
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+async def main():
+    print("=" * 60)
+    print("Market State Manager Tests")
+    print("=" * 60)
+
+    await test_ring_buffer_wraps()
+    await test_timestamp_roundtrip()
+    await test_snapshot_parity()
+    await test_recent_bars_and_columns()
+    await test_wilder_mode()
+    await test_indicator_readiness()
+    await test_dedup_and_forming_bar()
+    await test_forming_daily_bar_indicators()
+    await test_batch_change_summary()
+    await test_snapshot_cache_and_versions()
+    await test_resampled_frames()
+    await test_warm_restart_snapshot()
+    await test_shared_memory_state()
+    await test_history_backfill()
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed}/{passed + failed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    ok = asyncio.run(main())
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,1060 @@
+#!/usr/bin/env python3
+"""
+Market Polling Service tests
+Concurrent bounded fetching, shared token-bucket rate limiting,
+per-symbol failure isolation, incremental fetch cursors and the
+market-hours session dispatch, the deadline-heap scheduler, the ingest
+queue between polling and state, streaming sources with polling as the
+fallback, and adaptive
+tier promotion against fake SSI clients; the FastConnect client against a
+mock HTTP transport and the local SSI simulator.
+Run: python scripts/test_polling.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+BASE = os.path.join(os.path.dirname(__file__), "..", "apps", "ai-service")
+sys.path.insert(0, BASE)
+
+from datetime import date, datetime, timedelta, timezone
+
+from app.models.insight_models import Timeframe
+from app.models.insight_models import InsightEvent, InsightSeverity, PriceBar
+from app.services.ingest_queue import IngestQueue
+from app.services.market_polling_service import MarketPollingService, PollingTier
+from app.services.market_state_manager import MarketStateManager
+from app.services.rate_limiter import TokenBucket
+from app.services.ssi_client import SSIError, SSIFastConnectClient, decode_ohlc
+from app.services.stream_source import (
+    ReplayStreamSource, SSEStreamSource, StreamSource, TickAggregator, WebSocketStreamSource,
+)
+from app.services.tier_policy import AdaptiveTierPolicy
+from app.services.trading_calendar import SessionPhase, TradingCalendar, load_holidays
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+passed = 0
+failed = 0
+
+
+def check(name: str, condition: bool, detail: str = ""):
+    global passed, failed
+    if condition:
+        passed += 1
+        print(f"  ✓ {name}")
+    else:
+        failed += 1
+        print(f"  ✗ {name} — {detail}")
+
+
+class FakeSSI:
+    """SSI stand-in: fixed latency per request, tracks concurrency and request times."""
+
+    def __init__(self, latency: float = 0.02, fail: set = ()):
+        self.latency = latency
+        self.fail = set(fail)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.request_times = []
+
+    async def _request(self, symbol):
+        self.request_times.append(time.monotonic())
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if symbol in self.fail:
+                raise ConnectionError(f"boom {symbol}")
+        finally:
+            self.in_flight -= 1
+
+    async def get_intraday_ohlc(self, symbol, resolution, count):
+        await self._request(symbol)
+        ts = datetime(2024, 1, 19, 9, 15)
+        return [{"timestamp": ts, "open": 10, "high": 11, "low": 9, "close": 10.5, "volume": 100}]
+
+    async def get_daily_ohlc(self, symbol, count):
+        await self._request(symbol)
+        return [{"timestamp": datetime(2024, 1, 19), "open": 10, "high": 11, "low": 9,
+                 "close": 10.5, "volume": 1000}]
+
+
+class CountingSSI:
+    """SSI stand-in honouring `count`: returns the newest bars of a series ending now."""
+
+    def __init__(self):
+        self.requests = []
+        self.volume = 100
+        now = datetime.utcnow().replace(second=0, microsecond=0)
+        self.minutes = [now - timedelta(minutes=i) for i in range(200)][::-1]
+        today = datetime.combine(now.date(), datetime.min.time())
+        self.days = [today - timedelta(days=i) for i in range(100)][::-1]
+
+    def _rows(self, stamps):
+        return [{"timestamp": t, "open": 10, "high": 11, "low": 9, "close": 10.5, "volume": self.volume}
+                for t in stamps]
+
+    async def get_intraday_ohlc(self, symbol, resolution, count):
+        self.requests.append(("1m", symbol, count))
+        return self._rows(self.minutes[-count:])
+
+    async def get_daily_ohlc(self, symbol, count):
+        self.requests.append(("daily", symbol, count))
+        return self._rows(self.days[-count:])
+
+
+SYMBOLS = [f"S{i:03d}" for i in range(40)]
+
+
+async def sweep(poller, symbols):
+    """One scheduled poll of every symbol: all due now, fetched by the worker pool."""
+    poller.set_symbols(symbols)
+    await poller.start()
+    now = time.monotonic()
+    for symbol in symbols:
+        poller._schedule(symbol, now)
+    while poller.get_stats()["symbols_polled"] < len(symbols):
+        await asyncio.sleep(0.002)
+    await poller._queue.join()
+    await poller.stop()
+
+
+# ---------------------------------------------------------------------------
+# Tests
+# ---------------------------------------------------------------------------
+
+async def test_token_bucket():
+    print("\n[Test 1] Token bucket paces requests to its rate")
+    bucket = TokenBucket(rate=50, capacity=5)
+    start = time.monotonic()
+    await asyncio.gather(*(bucket.acquire() for _ in range(30)))
+    elapsed = time.monotonic() - start
+    # 5 burst tokens free, 25 more at 50/s -> ~0.5s
+    check("30 tokens at 50/s (burst 5) take ~0.5s", 0.45 <= elapsed < 0.8, f"{elapsed:.2f}s")
+    check("waits recorded", bucket.get_stats()["waits"] > 0)
+
+    try:
+        await bucket.acquire(10)
+        check("acquire above capacity rejected", False)
+    except ValueError:
+        check("acquire above capacity rejected", True)
+
+
+async def test_concurrent_sweep():
+    print("\n[Test 2] Concurrent sweep: bounded in-flight, faster than serial")
+    ssi = FakeSSI(latency=0.02)
+    poller = MarketPollingService(ssi_client=ssi, max_in_flight=8, rate_limit_per_sec=1000,
+                                  rate_limit_burst=50)
+    received = []
+
+    async def on_update(bars):
+        received.extend(bars)
+
+    poller.set_on_bars_update(on_update)
+    start = time.monotonic()
+    await sweep(poller, SYMBOLS)
+    elapsed = time.monotonic() - start
+
+    # Serial would be 40 symbols x 2 requests x 20ms = 1.6s before any delay
+    check("sweep well under serial round-trip time", elapsed < 0.5, f"{elapsed:.2f}s")
+    check("in-flight bounded by max_in_flight", ssi.max_in_flight <= 8, f"{ssi.max_in_flight}")
+    check("fetches actually overlap", ssi.max_in_flight > 1, f"{ssi.max_in_flight}")
+    check("both timeframes per symbol", len(received) == 80
+          and {(b.symbol, b.timeframe) for b in received}
+          == {(s, tf) for s in SYMBOLS for tf in (Timeframe.INTRADAY_1M, Timeframe.DAILY)})
+    stats = poller.get_stats()
+    check("stats: requests + symbols polled", stats["ssi_requests"] == 80
+          and stats["symbols_polled"] == 40, f"{stats['ssi_requests']} {stats['symbols_polled']}")
+
+
+async def test_rate_limit_bounds_sweep():
+    print("\n[Test 3] Rate limit, not latency, bounds the sweep")
+    ssi = FakeSSI(latency=0.001)
+    poller = MarketPollingService(ssi_client=ssi, max_in_flight=16, rate_limit_per_sec=100,
+                                  rate_limit_burst=10)
+    start = time.monotonic()
+    await sweep(poller, SYMBOLS)
+    elapsed = time.monotonic() - start
+    # 80 requests, 10 burst, 70 more at 100/s -> ~0.7s
+    check("sweep paced by the bucket", 0.6 <= elapsed < 1.2, f"{elapsed:.2f}s")
+    window = [t for t in ssi.request_times if t >= ssi.request_times[0] + 0.2]
+    span = window[-1] - window[0]
+    rate = (len(window) - 1) / span if span else float("inf")
+    check("steady-state rate <= quota", rate <= 110, f"{rate:.0f}/s")
+
+
+async def test_failure_isolation():
+    print("\n[Test 4] Per-symbol failures stay isolated")
+
+    class BrokenSSI(FakeSSI):
+        async def get_intraday_ohlc(self, symbol, resolution, count):
+            if symbol == "S005":
+                raise RuntimeError("unexpected")
+            return await super().get_intraday_ohlc(symbol, resolution, count)
+
+    ssi = BrokenSSI(latency=0.005, fail={"S001", "S002"})
+    poller = MarketPollingService(ssi_client=ssi, rate_limit_per_sec=1000, rate_limit_burst=100)
+
+    received = []
+
+    async def on_update(bars):
+        received.extend(bars)
+
+    poller.set_on_bars_update(on_update)
+    original = poller._fetch_symbol_bars
+
+    async def fetch(symbol, **kwargs):
+        if symbol == "S010":
+            raise RuntimeError("fetch crashed")
+        return await original(symbol, **kwargs)
+
+    poller._fetch_symbol_bars = fetch
+    await sweep(poller, SYMBOLS)
+    got = {b.symbol for b in received}
+    check("failed symbols missing, others present",
+          got == set(SYMBOLS) - {"S001", "S002", "S010"}, f"{sorted(set(SYMBOLS) - got)}")
+    check("S005 keeps its daily bar", any(b.symbol == "S005" and b.timeframe == Timeframe.DAILY
+                                          for b in received))
+    check("crashed fetch counted", poller.get_stats()["polls_error"] == 1)
+
+
+async def test_serial_mode():
+    print("\n[Test 5] Serial mode keeps v1 behaviour")
+    ssi = FakeSSI(latency=0.001)
+    poller = MarketPollingService(ssi_client=ssi, fetch_mode="serial", rate_limit_delay=0.01)
+    await sweep(poller, SYMBOLS[:5])
+    check("one request at a time", ssi.max_in_flight == 1)
+    check("bucket untouched", poller.rate_limiter.get_stats()["acquired"] == 0)
+    try:
+        MarketPollingService(fetch_mode="parallel")
+        check("unknown mode rejected", False)
+    except ValueError:
+        check("unknown mode rejected", True)
+
+
+async def test_fetch_cursors():
+    print("\n[Test 6] Cursors: only new bars after the first poll")
+    ssi = CountingSSI()
+    poller = MarketPollingService(ssi_client=ssi, rate_limit_per_sec=1000, rate_limit_burst=100)
+    first = await poller._fetch_symbol_bars("VNM")
+    poller._commit(first)  # delivered
+    check("first poll: full 1m + daily window", ssi.requests == [("1m", "VNM", 60), ("daily", "VNM", 50)],
+          f"{ssi.requests}")
+    first_requested = poller.get_stats()["bars_requested"]
+
+    for _ in range(3):
+        ssi.requests.clear()
+        again = await poller._fetch_symbol_bars("VNM")
+        poller._commit(again)
+    # count 2 only if the wall clock ticked into a new minute mid-test
+    check("later polls: only the forming 1m bar and today's daily bar",
+          ssi.requests[0][2] in (1, 2) and ssi.requests[1] == ("daily", "VNM", 1), f"{ssi.requests}")
+    check("unchanged re-fetched bars suppressed", again == []
+          and poller.get_stats()["symbols_unchanged"] == 3
+          and poller.get_stats()["suppression_rate"] == 0.75, f"{again} {poller.get_stats()}")
+    ssi.volume = 150  # forming bars traded
+    again = await poller._fetch_symbol_bars("VNM")
+    check("changed forming bars delivered", [b.timestamp for b in again]
+          == [ssi.minutes[-1], ssi.days[-1]] and again[0].volume == 150, f"{again}")
+    per_poll = (poller.get_stats()["bars_requested"] - first_requested) / 3
+    check("payload cut by >10x", first_requested / per_poll > 10, f"{first_requested} vs {per_poll}")
+    check("daily history fetched once", poller.get_stats()["daily_history_fetches"] == 1)
+
+    # Cursor 5 minutes / 3 trading days back -> that many bars plus the cursor bar
+    poller = MarketPollingService(ssi_client=ssi)
+    poller.set_cursor("FPT", Timeframe.INTRADAY_1M, ssi.minutes[-6])
+    check("1m count follows elapsed minutes", poller._intraday_count("FPT") in (6, 7),
+          f"{poller._intraday_count('FPT')}")
+    poller.set_cursor("FPT", Timeframe.DAILY, ssi.days[-8])
+    expected = int(np.busday_count(ssi.days[-8].date(), ssi.days[-1].date())) + 1
+    check("daily count follows trading days", poller._daily_count("FPT") == expected,
+          f"{poller._daily_count('FPT')} vs {expected}")
+
+    # Bars carrying a timezone: same instant, no naive/aware TypeError
+    ict_tz = timezone(timedelta(hours=7))
+    poller = MarketPollingService(ssi_client=ssi)
+    poller.set_cursor("VCB", Timeframe.INTRADAY_1M, (ssi.minutes[-6] + timedelta(hours=7)).replace(tzinfo=ict_tz))
+    check("tz-aware cursor stored as naive UTC", poller._intraday_count("VCB") in (6, 7)
+          and poller._cursors[Timeframe.INTRADAY_1M]["VCB"] == ssi.minutes[-6],
+          f"{poller._cursors[Timeframe.INTRADAY_1M]['VCB']}")
+    rows = [{"timestamp": t.replace(tzinfo=timezone.utc), "open": 10, "high": 11, "low": 9,
+             "close": 10.5, "volume": 100} for t in ssi.minutes[-7:]]
+    bars = poller._rows_to_bars("VCB", Timeframe.INTRADAY_1M, rows)
+    check("tz-aware rows filtered against the cursor", [b.timestamp for b in bars] == ssi.minutes[-6:],
+          f"{[b.timestamp for b in bars]}")
+
+    class StaleSSI(CountingSSI):
+        async def get_intraday_ohlc(self, symbol, resolution, count):
+            return self._rows(self.minutes[-60:])  # ignores count
+
+    stale = StaleSSI()
+    poller = MarketPollingService(ssi_client=stale)
+    poller.set_cursor("HPG", Timeframe.INTRADAY_1M, stale.minutes[-2])
+    bars = await poller._fetch_symbol_bars("HPG")
+    check("rows older than the cursor skipped", [b.timestamp for b in bars
+                                                 if b.timeframe == Timeframe.INTRADAY_1M]
+          == stale.minutes[-2:] and poller.get_stats()["bars_skipped_old"] == 58)
+
+
+async def test_seed_cursors_from_state():
+    print("\n[Test 7] Cursors seeded from state")
+    sm = MarketStateManager()
+    ssi = CountingSSI()
+    bars = [PriceBar(symbol="VNM", timeframe=Timeframe.DAILY, timestamp=t, open=10, high=11,
+                     low=9, close=10, volume=1) for t in ssi.days[-51:-1]]
+    bars += [PriceBar(symbol="VNM", timeframe=Timeframe.INTRADAY_1M, timestamp=t, open=10, high=11,
+                      low=9, close=10, volume=1) for t in ssi.minutes[-10:-3]]
+    bars += [PriceBar(symbol="FPT", timeframe=Timeframe.DAILY, timestamp=t, open=10, high=11,
+                      low=9, close=10, volume=1) for t in ssi.days[-5:-1]]
+    await sm.update_bars(bars)
+
+    poller = MarketPollingService(ssi_client=ssi)
+    await poller.seed_cursors(sm)
+    check("1m cursor = last 1m bar in state", poller._intraday_count("VNM") in (4, 5),
+          f"{poller._intraday_count('VNM')}")
+    check("full daily window -> no history refetch", poller._daily_count("VNM") < 50)
+    check("short daily history -> one full fetch", poller._daily_count("FPT") == 50)
+    poller.remove_symbol("VNM")
+    check("remove_symbol drops cursors", poller._intraday_count("VNM") == 60)
+
+
+def ict(*args) -> datetime:
+    """Naive-UTC datetime for an ICT wall-clock time."""
+    return datetime(*args) - timedelta(hours=7)
+
+
+async def test_trading_calendar():
+    print("\n[Test 8] Trading calendar: phases, holidays, next change")
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write("# exchange holidays\n2024-02-12  Tet\n\n2024-02-13\nnot-a-date\n")
+    holidays = load_holidays(f.name)
+    check("holidays file parsed, bad line skipped",
+          holidays == {date(2024, 2, 12), date(2024, 2, 13)}, f"{holidays}")
+    check("missing file -> no holidays", load_holidays("/nonexistent/holidays.txt") == set())
+
+    cal = TradingCalendar(holidays)
+    cases = [
+        (ict(2024, 1, 19, 8, 59), SessionPhase.CLOSED),
+        (ict(2024, 1, 19, 9, 0), SessionPhase.ATO),
+        (ict(2024, 1, 19, 9, 15), SessionPhase.CONTINUOUS),
+        (ict(2024, 1, 19, 11, 45), SessionPhase.LUNCH),
+        (ict(2024, 1, 19, 13, 0), SessionPhase.CONTINUOUS),
+        (ict(2024, 1, 19, 14, 40), SessionPhase.ATC),
+        (ict(2024, 1, 19, 14, 45), SessionPhase.CLOSED),
+        (ict(2024, 1, 20, 10, 0), SessionPhase.CLOSED),   # Saturday
+        (ict(2024, 2, 12, 10, 0), SessionPhase.CLOSED),   # holiday
+    ]
+    wrong = [(t, p, cal.phase_at(t)) for t, p in cases if cal.phase_at(t) != p]
+    check("phases across a trading day, weekend, holiday", not wrong, f"{wrong}")
+
+    check("next change inside the session", cal.next_change(ict(2024, 1, 19, 10, 0))
+          == ict(2024, 1, 19, 11, 30))
+    check("next change over the weekend", cal.next_change(ict(2024, 1, 19, 15, 0))
+          == ict(2024, 1, 22, 9, 0))
+    check("next change skips holidays", cal.next_change(ict(2024, 2, 9, 15, 0))
+          == ict(2024, 2, 14, 9, 0))
+
+
+def drain(poller) -> list:
+    """Symbols the dispatcher queued, in order (as the workers would take them)."""
+    out = []
+    while not poller._queue.empty():
+        symbol, _ = poller._queue.get_nowait()
+        poller._queued.discard(symbol)
+        out.append(symbol)
+    return out
+
+
+async def test_session_scheduler():
+    print("\n[Test 9] Session-aware dispatch: idle off-session, faster auctions")
+    clock = {"now": ict(2024, 1, 19, 10, 0)}
+    poller = MarketPollingService(calendar=TradingCalendar(), auction_interval=5,
+                                  clock=lambda: clock["now"])
+    poller.set_symbols(["FPT", "VNM"])
+    poller._restagger(1000.0)  # FPT due at 1000, VNM at 1030
+
+    def step(t, mono):
+        clock["now"] = t
+        wait = poller._dispatch(mono)
+        return drain(poller), wait
+
+    check("continuous: due symbol queued, sleep to next due",
+          step(ict(2024, 1, 19, 10, 0), 1000.0) == (["FPT"], 30.0))
+    check("sleep cut short at a phase change",
+          step(ict(2024, 1, 19, 11, 29, 50), 1010.0) == ([], 10.0))
+    queued, wait = step(ict(2024, 1, 19, 11, 30), 1020.0)
+    check("lunch: every symbol reconciled once, idle sleep capped",
+          queued == ["FPT", "VNM"] and wait == 3600, f"{queued} {wait}")
+    check("lunch: then idle until 13:00", step(ict(2024, 1, 19, 12, 45), 5000.0) == ([], 15 * 60))
+    queued, wait = step(ict(2024, 1, 19, 13, 0), 6000.0)
+    check("afternoon: schedule restaggered from the open", queued == ["FPT"] and wait == 30.0,
+          f"{queued} {wait}")
+    clock["now"] = ict(2024, 1, 19, 14, 35)
+    poller._dispatch(6030.0)
+    check("ATC: next poll at the auction interval", poller._next_due["VNM"] == 6035.0,
+          f"{poller._next_due['VNM']}")
+    drain(poller)
+    queued, wait = step(ict(2024, 1, 19, 14, 45), 6040.0)
+    check("close: reconciliation poll", queued == ["FPT", "VNM"] and wait == 3600)
+    check("overnight: idle", step(ict(2024, 1, 20, 3, 0), 9000.0)[0] == [])
+    check("stats: phase + reconciliations", poller.get_stats()["session_phase"] == "closed"
+          and poller.get_stats()["reconciliation_polls"] == 2)
+
+    v1 = MarketPollingService()
+    v1.set_symbols(["VNM"])
+    v1._restagger(0.0)
+    check("no calendar: always on cadence", v1._dispatch(0.0) == 60.0
+          and drain(v1) == ["VNM"] and v1.get_stats()["session_phase"] is None)
+
+    ssi = CountingSSI()
+    poller = MarketPollingService(ssi_client=ssi, calendar=TradingCalendar(),
+                                  clock=lambda: ict(2024, 1, 20, 3, 0))
+    poller.set_symbols(["VNM"])
+    await poller.start()
+    await asyncio.sleep(0.05)
+    await poller.stop()
+    check("loop: one reconciliation poll, then idle", len(ssi.requests) == 2
+          and poller.get_stats()["reconciliation_polls"] == 1, f"{ssi.requests}")
+
+
+async def test_heap_scheduler():
+    print("\n[Test 10] Deadline heap: even spread, exact cadence, immediate tier changes")
+    poller = MarketPollingService()
+    poller.set_symbols(["A", "B", "C", "D"])
+    poller._restagger(0.0)
+    check("tier staggered across its interval",
+          [poller._next_due[s] for s in "ABCD"] == [0.0, 15.0, 30.0, 45.0])
+
+    due = poller._pop_due(16.0, None)
+    check("due symbols popped in deadline order", due == [("A", 0.0), ("B", 15.0)], f"{due}")
+    check("next poll one interval after the due time (no drift)",
+          poller._next_due["A"] == 60.0 and poller._next_due["B"] == 75.0)
+    drain(poller)
+
+    due = poller._pop_due(200.0, None)
+    check("late: missed slots skipped, cadence phase kept",
+          poller._next_due["A"] == 240.0 and poller._next_due["C"] == 210.0, f"{poller._next_due}")
+
+    poller._queued.add("A")
+    poller._schedule("A", 201.0)
+    check("symbol still in flight is not queued twice",
+          poller._pop_due(201.0, None) == [] and poller.get_stats()["overruns"] == 1)
+    poller._queued.clear()
+
+    poller = MarketPollingService()
+    poller.set_symbols(["A", "B"])
+    poller._restagger(0.0)
+    poller._pop_due(0.0, None)  # A polled at 0, next due 60
+    poller._move("A", PollingTier.HOT, 20.0)
+    check("promotion takes effect now", poller._next_due["A"] == 20.0
+          and poller.get_stats()["symbols_hot"] == 1 and poller.get_stats()["symbols_default"] == 1)
+    poller.add_symbol("A", PollingTier.DEFAULT)
+    check("demotion: next poll one default interval after the last", poller._next_due["A"] >= 60.0)
+    check("tier change leaves one live heap entry", [e[2] for e in poller._heap
+                                                     if poller._next_due.get(e[2]) == e[0]].count("A") == 1)
+    poller.remove_symbol("B")
+    check("removed symbol never popped", all(s != "B" for s, _ in poller._pop_due(1e9, None)))
+
+    poller.set_symbols(["A", "X"], PollingTier.WATCHLIST)
+    poller.set_symbols(["X"], PollingTier.WATCHLIST)
+    check("set_symbols moves and drops symbols", poller._symbol_tiers == {"X": PollingTier.WATCHLIST},
+          f"{poller._symbol_tiers}")
+
+    # Live: intervals of 0.2s / 0.1s for ~1s; every symbol on its own cadence
+    ssi = FakeSSI(latency=0.005)
+    poller = MarketPollingService(ssi_client=ssi, interval_default=0.2, interval_hot=0.1,
+                                  rate_limit_per_sec=1000, rate_limit_burst=100, change_filter=False)
+    received = []
+
+    async def on_update(bars):
+        received.extend(bars)
+
+    poller.set_on_bars_update(on_update)
+    poller.set_symbols(SYMBOLS[:10])
+    poller.set_symbols(["HOT1"], PollingTier.HOT)
+    await poller.start()
+    await asyncio.sleep(1.0)
+    stats = poller.get_stats()
+    await poller.stop()
+    per_symbol = {}
+    for b in received:
+        if b.timeframe == Timeframe.DAILY:
+            per_symbol[b.symbol] = per_symbol.get(b.symbol, 0) + 1
+    default_polls = [per_symbol.get(s, 0) for s in SYMBOLS[:10]]
+    check("default tier: ~5 polls/s each", all(4 <= n <= 6 for n in default_polls), f"{default_polls}")
+    check("hot tier: ~10 polls/s", 9 <= per_symbol.get("HOT1", 0) <= 11, f"{per_symbol.get('HOT1')}")
+    check("lateness reported", stats["lateness_ms"]["max"] is not None
+          and stats["lateness_ms"]["p95"] < 100, f"{stats['lateness_ms']}")
+    check("queue depth / in-flight reported", stats["queue_depth"] >= 0 and stats["scheduled"] == 11)
+
+
+async def test_adaptive_tiers():
+    print("\n[Test 11] Adaptive tiers: promote active/watched symbols within budget")
+    sm = MarketStateManager()
+    start = datetime(2024, 1, 19, 2, 0)
+    bars = []
+    for sym in ("BURST", "QUIET", "NEWS", "FAVE"):
+        for i in range(60):
+            volume = 5000 if sym == "BURST" and i >= 55 else 100
+            bars.append(PriceBar(symbol=sym, timeframe=Timeframe.INTRADAY_1M,
+                                 timestamp=start + timedelta(minutes=i),
+                                 open=10, high=10.1, low=9.9, close=10, volume=volume))
+    await sm.update_bars(bars)
+
+    poller = MarketPollingService()
+    poller.set_symbols(["BURST", "QUIET", "NEWS", "FAVE"])
+    # Baseline 4 x 2/60 = 0.133 req/s; HOT costs +0.1, WATCHLIST +0.033
+    policy = AdaptiveTierPolicy(poller, sm, request_budget=0.31)
+    for code in ("PA01", "VA01"):
+        await policy.record_insight(InsightEvent(insight_code=code, symbol="NEWS", timeframe=Timeframe.DAILY,
+                                                 severity=InsightSeverity.CRITICAL, raw_explanation="x"))
+    policy.set_interest({"fave": 3})
+
+    scores = await policy.score(["BURST", "QUIET", "NEWS", "FAVE"], time.monotonic())
+    check("quiet symbol scores ~0", scores["QUIET"] < 0.01, f"{scores}")
+    check("volume burst, insight and interest all score", scores["BURST"] > 3
+          and 5.9 < scores["NEWS"] <= 6.0 and scores["FAVE"] == 2.0, f"{scores}")
+
+    changes = await policy.evaluate()
+    tiers = poller.get_symbol_tiers()
+    check("top score promoted to HOT", tiers["BURST"] == PollingTier.HOT, f"{tiers}")
+    check("budget caps the second HOT; falls back to WATCHLIST",
+          tiers["NEWS"] == PollingTier.WATCHLIST and tiers["FAVE"] == PollingTier.WATCHLIST, f"{tiers}")
+    check("quiet symbol stays DEFAULT", tiers["QUIET"] == PollingTier.DEFAULT)
+    stats = policy.get_stats()
+    check("request rate within budget", stats["request_rate"] <= 0.31 and stats["budget_limited"] >= 1,
+          f"{stats}")
+    check("promotion rescheduled immediately", poller._next_due["BURST"] <= time.monotonic())
+
+    changes = await policy.evaluate()
+    check("stable scores -> no churn", changes == {}, f"{changes}")
+
+    # Insight ages out and interest drops; held until min_hold passes, then decays
+    policy._insights["NEWS"] = [(time.monotonic() - 3600, 3.0)] * 2
+    policy.set_interest({})
+    await policy.evaluate()
+    check("min_hold keeps recent promotions", poller.get_symbol_tiers()["NEWS"] == PollingTier.WATCHLIST)
+    policy._promoted_at = {s: t - 600 for s, t in policy._promoted_at.items()}
+    changes = await policy.evaluate()
+    check("quiet symbols decay to DEFAULT", changes == {"NEWS": PollingTier.DEFAULT,
+                                                        "FAVE": PollingTier.DEFAULT}, f"{changes}")
+    check("active symbol keeps HOT", poller.get_symbol_tiers()["BURST"] == PollingTier.HOT)
+
+    # A manual pin is kept past min_hold and charged first: BURST no longer fits HOT
+    poller.add_symbol("QUIET", PollingTier.HOT)
+    policy._promoted_at = {s: t - 600 for s, t in policy._promoted_at.items()}
+    changes = await policy.evaluate()
+    tiers = poller.get_symbol_tiers()
+    check("manual pin survives decay", tiers["QUIET"] == PollingTier.HOT
+          and policy.get_stats()["pinned"] == 1, f"{tiers}")
+    check("pin cost comes out of the budget", changes == {"BURST": PollingTier.WATCHLIST}, f"{changes}")
+
+    # DEFAULT alone (4 x 2/60 = 0.133) exceeds the budget: promotions get their share of it
+    fresh = MarketPollingService()
+    fresh.set_symbols(["BURST", "QUIET", "NEWS", "FAVE"])
+    tight = AdaptiveTierPolicy(fresh, sm, request_budget=0.1, promotion_share=0.5)
+    await tight.evaluate()
+    tiers = fresh.get_symbol_tiers()
+    check("baseline over budget -> promotions within the share", tight.get_stats()["over_budget"]
+          and tiers["BURST"] == PollingTier.WATCHLIST and tiers["QUIET"] == PollingTier.DEFAULT,
+          f"{tiers}")
+    fresh = MarketPollingService()
+    fresh.set_symbols(["BURST", "QUIET", "NEWS", "FAVE"])
+    await AdaptiveTierPolicy(fresh, sm, request_budget=0.1, promotion_share=0.0).evaluate()
+    check("zero share -> no promotions", fresh.get_symbol_tiers()["BURST"] == PollingTier.DEFAULT)
+
+    class FakeTables:
+        def __init__(self):
+            watch = [{"id": i, "symbol": s} for i, s in enumerate(["fpt", "FPT", "VNM", "HPG", "FPT"])]
+            self.rows = {"watchlist_items": watch,
+                         "smart_alerts": [{"id": 1, "symbol": "FPT"}]}
+            self.queries = 0
+
+        def table(self, name):
+            self._rows = self.rows[name]
+            return self
+
+        def select(self, columns):
+            return self
+
+        def eq(self, column, value):
+            return self
+
+        def gt(self, column, value):
+            self._rows = [r for r in self._rows if r[column] > value]
+            return self
+
+        def order(self, column):
+            self._rows = sorted(self._rows, key=lambda r: r[column])
+            return self
+
+        def limit(self, n):
+            self._rows = self._rows[:n]
+            return self
+
+        def execute(self):
+            self.queries += 1
+            return type("R", (), {"data": self._rows})()
+
+    tables = FakeTables()
+    policy = AdaptiveTierPolicy(poller, sm, request_budget=1, page_size=2, supabase_client=tables)
+    interest = policy.load_interest()
+    check("interest counted from watchlists + alerts across pages",
+          interest == {"FPT": 4, "VNM": 1, "HPG": 1} and tables.queries == 4,
+          f"{interest} in {tables.queries} queries")
+
+
+# ---------------------------------------------------------------------------
+# SSI FastConnect client
+# ---------------------------------------------------------------------------
+
+def _jwt(exp: float) -> str:
+    import base64, json
+    part = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).decode().rstrip("=")
+    return f"e30.{part}.sig"
+
+
+async def test_ssi_client():
+    print("\n[SSI FastConnect client]")
+
+    rows = [
+        {"Symbol": "FPT", "TradingDate": "19/01/2024", "Time": "09:16:00", "Open": "101",
+         "High": "102", "Low": "100", "Close": "101.5", "Volume": "1200"},
+        {"Symbol": "FPT", "TradingDate": "19/01/2024", "Time": "09:15:00", "Open": 100,
+         "High": 101, "Low": 99, "Close": 100.5, "Volume": 1000},
+    ]
+    cols = decode_ohlc(rows, intraday=True)
+    check("intraday decoded oldest first, ICT -> UTC",
+          [str(np.datetime64(int(t), "us")) for t in cols.timestamp]
+          == ["2024-01-19T02:15:00.000000", "2024-01-19T02:16:00.000000"], f"{cols.timestamp}")
+    check("string numbers decoded", cols.close.tolist() == [100.5, 101.5] and cols.volume.dtype == np.int64)
+    daily = decode_ohlc([{"TradingDate": "19/01/2024", "Time": None, "Open": 1, "High": 1,
+                          "Low": 1, "Close": 1, "Volume": 5}], intraday=False)
+    check("daily bar stamped 00:00 of trade date",
+          str(np.datetime64(int(daily.timestamp[0]), "us")) == "2024-01-19T00:00:00.000000")
+
+    calls = {"token": 0, "ohlc": 0}
+    script = []  # status codes to return for the next OHLC requests
+    tokens = iter([_jwt(time.time() + 3600), _jwt(time.time() + 7200), _jwt(time.time() + 9000)])
+    seen_auth = []
+
+    def handler(request: httpx.Request):
+        if request.url.path.endswith("AccessToken"):
+            calls["token"] += 1
+            return httpx.Response(200, json={"status": 200, "data": {"accessToken": next(tokens)}})
+        calls["ohlc"] += 1
+        seen_auth.append(request.headers.get("Authorization"))
+        status = script.pop(0) if script else 200
+        if status != 200:
+            return httpx.Response(status)
+        assert request.url.params["pageSize"] == "2" and request.url.params["ascending"] == "false"
+        return httpx.Response(200, json={"status": 200, "data": rows, "totalRecord": 2})
+
+    client = SSIFastConnectClient("id", "secret", transport=httpx.MockTransport(handler),
+                                  backoff_base=0.001, backoff_cap=0.002, max_retries=2)
+    await client.start()
+    check("token fetched at start", calls["token"] == 1 and calls["ohlc"] == 0)
+    check("expiry read from token", 3500 < client.get_stats()["token_expires_in"] <= 3600,
+          f"{client.get_stats()}")
+
+    got = await asyncio.gather(*(client.get_intraday_ohlc("FPT", count=2) for _ in range(5)))
+    check("requests reuse cached token", calls["token"] == 1 and len(set(seen_auth)) == 1)
+    check("client returns BarColumns", all(len(g) == 2 for g in got))
+
+    script[:] = [503, 429]
+    await client.get_daily_ohlc("FPT", count=2)
+    check("429/5xx retried with backoff", client.get_stats()["retries"] == 2, f"{client.get_stats()}")
+
+    script[:] = [401]
+    before = seen_auth[-1]
+    await client.get_intraday_ohlc("FPT", count=2)
+    check("401 refreshes token once and retries",
+          calls["token"] == 2 and seen_auth[-1] != before, f"{calls}")
+
+    script[:] = [500, 500, 500]
+    try:
+        await client.get_intraday_ohlc("FPT", count=2)
+        raised = False
+    except SSIError:
+        raised = True
+    check("gives up after max_retries", raised and client.get_stats()["errors"] == 1)
+
+    client._token_expires = time.time() + client.token_refresh_margin - 1
+    client._refresh_task.cancel()
+    client._refresh_task = asyncio.create_task(client._refresh_loop())
+    await asyncio.sleep(5.1)
+    check("token refreshed in background before expiry", calls["token"] == 3, f"{calls}")
+    await client.close()
+    check("closed", not client.get_stats()["connected"] and client._refresh_task is None)
+
+    # Poller consumes columns through the cursor filter
+    poller = MarketPollingService(ssi_client=None, rate_limit_per_sec=1000)
+    poller.set_cursor("FPT", Timeframe.INTRADAY_1M, datetime(2024, 1, 19, 2, 16))
+    bars = poller._rows_to_bars("FPT", Timeframe.INTRADAY_1M, cols)
+    poller._commit(bars)
+    check("columnar rows filtered by cursor",
+          [b.timestamp for b in bars] == [datetime(2024, 1, 19, 2, 16)]
+          and poller.get_stats()["bars_skipped_old"] == 1 and bars[0].volume == 1200,
+          f"{bars}")
+    check("identical columnar re-fetch suppressed",
+          poller._rows_to_bars("FPT", Timeframe.INTRADAY_1M, cols) == [])
+    cols.close[-1] = 102.0
+    check("changed close delivered",
+          [b.close for b in poller._rows_to_bars("FPT", Timeframe.INTRADAY_1M, cols)] == [102.0])
+
+
+async def test_ssi_simulator():
+    print("\n[SSI simulator]")
+    sys.path.insert(0, os.path.dirname(__file__))
+    from ssi_simulator import SimulatedMarket, SSISimulator
+
+    market = SimulatedMarket(n_symbols=20, seed=7, speed=600)
+    again = SimulatedMarket(n_symbols=20, seed=7, speed=600)
+    check("seeded random walk is reproducible",
+          market.intraday_bars("S0003", 60)[-1]["close"] == again.intraday_bars("S0003", 60)[-1]["close"])
+
+    sim = SSISimulator(market, error_rate=0.3, rate_limit=50, rate_burst=50, seed=1)
+    client = SSIFastConnectClient("id", "secret", base_url="http://sim", max_retries=5,
+                                  backoff_base=0.01, backoff_cap=0.05,
+                                  transport=httpx.ASGITransport(app=sim.app))
+    await client.start()
+    poller = MarketPollingService(ssi_client=client, rate_limit_per_sec=1000, calendar=None,
+                                  clock=market.now)
+    bars = []
+
+    async def collect(delivered):
+        bars.extend(delivered)
+
+    poller.set_on_bars_update(collect)
+    await sweep(poller, market.symbols)
+    intraday = [b for b in bars if b.timeframe == Timeframe.INTRADAY_1M]
+    daily = [b for b in bars if b.timeframe == Timeframe.DAILY]
+    check("cold sweep gets full windows through the real client",
+          len(intraday) == 20 * 60 and len(daily) == 20 * 50, f"{len(intraday)} {len(daily)}")
+    check("injected errors retried", sim.stats["errors_injected"] > 0
+          and client.get_stats()["retries"] >= sim.stats["errors_injected"], f"{sim.stats}")
+
+    cursor = poller._cursors[Timeframe.INTRADAY_1M]["S0000"]
+    await asyncio.sleep(0.25)  # 2.5 simulated minutes
+    bars = await poller._fetch_one(market.symbols[0])
+    fresh = [b.timestamp for b in bars if b.timeframe == Timeframe.INTRADAY_1M]
+    check("incremental poll sees only new minutes", len(fresh) >= 2
+          and fresh[0] == cursor + timedelta(minutes=1)
+          and len(fresh) == (fresh[-1] - cursor) // timedelta(minutes=1), f"{fresh}")
+
+    sim.error_rate = 0
+    sim.rate_limit, sim.rate_burst, sim._bucket = 1, 1, 0
+    try:
+        await client.get_daily_ohlc("S0001", count=5)
+        limited = False
+    except SSIError:
+        limited = True
+    check("server quota answers 429", limited and sim.stats["rate_limited"] > 0, f"{sim.stats}")
+    await client.close()
+
+
+async def test_ingest_queue():
+    print("\n[Ingest queue] per-symbol hand-off, micro-batches, backpressure")
+
+    def bar(symbol, minute, close=10.0):
+        return PriceBar(symbol=symbol, timeframe=Timeframe.INTRADAY_1M,
+                        timestamp=datetime(2024, 1, 19, 2, minute), open=10, high=11, low=9,
+                        close=close, volume=100)
+
+    batches = []
+    gate = asyncio.Event()
+
+    async def consumer(bars):
+        await gate.wait()
+        batches.append(bars)
+
+    queue = IngestQueue(consumer, max_symbols=3, batch_size=2)
+    await queue.start()
+    await queue.put("A", [bar("A", 0)])
+    await asyncio.sleep(0)  # consumer takes A and waits on the gate
+    await queue.put("B", [bar("B", 0)])
+    await queue.put("B", [bar("B", 0, close=12.0), bar("B", 1)])
+    check("pending symbol coalesces newer bars", queue.depth == 1
+          and queue.get_stats()["coalesced"] == 1 and queue.get_stats()["bars_coalesced"] == 1)
+    await queue.put("C", [bar("C", 0)])
+    await queue.put("D", [bar("D", 0)])
+    blocked = asyncio.create_task(queue.put("E", [bar("E", 0)]))
+    await asyncio.sleep(0.02)
+    check("full queue blocks the producer", not blocked.done() and queue.get_stats()["blocked_puts"] == 1)
+    gate.set()
+    await blocked
+    await queue.drain()
+    symbols = [sorted({b.symbol for b in batch}) for batch in batches]
+    check("FIFO micro-batches of <= batch_size symbols",
+          sum(symbols, []) == list("ABCDE") and symbols[1] == ["B", "C"]
+          and max(map(len, symbols)) <= 2, f"{symbols}")
+    b_bars = {b.timestamp.minute: b.close for b in batches[1] if b.symbol == "B"}
+    check("coalesced entry: newer bar wins", b_bars == {0: 12.0, 1: 10.0}, f"{b_bars}")
+    stats = queue.get_stats()
+    check("latency + depth reported", stats["latency_ms"]["max"] >= 15 and stats["depth"] == 0
+          and stats["max_depth"] == 3 and stats["bars_ingested"] == 6, f"{stats}")
+    await queue.stop()
+
+    gate.clear()
+    batches.clear()
+    queue = IngestQueue(consumer, max_symbols=2, batch_size=5, overflow="drop_oldest")
+    await queue.start()
+    await queue.put("A", [bar("A", 0)])
+    await asyncio.sleep(0)
+    for s in "BCD":
+        await queue.put(s, [bar(s, 0)])
+    check("drop_oldest discards the oldest pending symbol",
+          queue.get_stats()["dropped_symbols"] == 1 and list(queue._pending) == ["C", "D"])
+    gate.set()
+    await queue.stop()
+    check("stop delivers what is queued", [sorted({b.symbol for b in x}) for x in batches]
+          == [["A"], ["C", "D"]], f"{batches}")
+
+    # Poller: a slow consumer no longer delays bars of fast symbols behind the sweep
+    ssi = FakeSSI(latency=0.005)
+    poller = MarketPollingService(ssi_client=ssi, interval_default=0.2, batch_size=4,
+                                  rate_limit_per_sec=1000, rate_limit_burst=100, change_filter=False)
+    first_at = []
+    sizes = []
+
+    async def slow(bars):
+        first_at.append(time.monotonic())
+        sizes.append(len({b.symbol for b in bars}))
+        await asyncio.sleep(0.03)
+
+    poller.set_on_bars_update(slow)
+    poller.set_symbols(SYMBOLS)
+    start = time.monotonic()
+    await poller.start()
+    await asyncio.sleep(0.3)
+    await poller.stop()
+    stats = poller.get_stats()
+    check("first bars delivered before the sweep finishes", first_at[0] - start < 0.05,
+          f"{first_at[0] - start:.3f}s")
+    check("slow consumer gets multi-symbol micro-batches", max(sizes) == 4
+          and stats["ingest"]["batches"] == len(sizes), f"{sizes}")
+    check("every polled symbol delivered", stats["ingest"]["bars_ingested"] + 2 * stats["ingest"]["coalesced"]
+          >= 2 * stats["symbols_polled"] >= 2 * len(SYMBOLS), f"{stats['ingest']}")
+    check("ingest stats exposed", stats["ingest"]["latency_ms"]["p95"] is not None
+          and stats["ingest"]["depth"] == 0)
+
+    # drop_oldest: cursors only advance on delivery, so dropped bars come back next poll
+    poller = MarketPollingService(ssi_client=CountingSSI(), ingest_max_symbols=1,
+                                  ingest_overflow="drop_oldest", rate_limit_per_sec=1000)
+    delivered = {}
+    gate = asyncio.Event()
+
+    async def gated(bars):
+        await gate.wait()
+        for b in bars:
+            delivered[b.symbol] = delivered.get(b.symbol, 0) + 1
+
+    poller.set_on_bars_update(gated)
+    await poller.ingest.start()
+    for s in ("X", "Y", "Z"):
+        await poller.ingest.put(s, await poller._fetch_one(s))
+        await asyncio.sleep(0)  # X is taken by the consumer, Y waits, Z pushes Y out
+    gate.set()
+    await poller.ingest.drain()
+    check("drop_oldest: dropped symbol leaves its cursor alone",
+          delivered == {"X": 110, "Z": 110} and "Y" not in poller._cursors[Timeframe.INTRADAY_1M]
+          and poller.ingest.get_stats()["dropped_symbols"] == 1, f"{delivered}")
+    for s in ("X", "Y"):
+        await poller.ingest.put(s, await poller._fetch_one(s))
+    await poller.ingest.drain()
+    check("dropped bars arrive on the next poll", delivered == {"X": 110, "Y": 110, "Z": 110},
+          f"{delivered}")
+
+    async def failing(bars):
+        raise RuntimeError("state down")
+
+    poller.set_on_bars_update(failing)
+    poller.ssi_client.volume = 150
+    await poller.ingest.put("X", await poller._fetch_one("X"))
+    await poller.ingest.drain()
+    poller.set_on_bars_update(gated)
+    await poller.ingest.put("X", await poller._fetch_one("X"))
+    await poller.ingest.drain()
+    await poller.ingest.stop()
+    check("failed delivery counted by the queue and re-fetched",
+          poller.ingest.get_stats()["consumer_errors"] == 1 and delivered["X"] == 112, f"{delivered}")
+    stats = poller.get_stats()
+    check("polls counted per symbol fetch", stats["polls_total"] == 7
+          and stats["polls_success"] == 7, f"{stats['polls_total']} {stats['polls_success']}")
+
+
+async def test_stream_sources():
+    print("\n[Streaming] push sources, polling as fallback for gaps")
+    agg = TickAggregator()
+    t0 = datetime(2024, 1, 19, 2, 15)
+    held = [agg.add("FPT", t0 + timedelta(seconds=sec), 100.0, 10) for sec in (1, 20, 40)]
+    check("first minute after joining is partial: held back", held == [[], [], []])
+    agg.add("FPT", t0 + timedelta(minutes=1, seconds=2), 101.0, 3)
+    agg.add("FPT", t0 + timedelta(minutes=1, seconds=20), 103.0, 5)
+    [minute] = agg.add("FPT", t0 + timedelta(minutes=1, seconds=40), 99.0, 7)
+    check("ticks aggregate into the forming 1m bar, no daily bar",
+          (minute.timeframe, minute.timestamp, minute.open, minute.high, minute.low, minute.close,
+           minute.volume) == (Timeframe.INTRADAY_1M, t0 + timedelta(minutes=1), 101.0, 103.0, 99.0,
+                              99.0, 15), f"{minute}")
+    [minute] = agg.add("FPT", t0 + timedelta(minutes=2, seconds=2), 101.0, 3)
+    check("new minute starts a new bar", minute.timestamp == t0 + timedelta(minutes=2)
+          and minute.volume == 3)
+    check("late tick for a closed minute ignored",
+          agg.add("FPT", t0 + timedelta(minutes=1, seconds=50), 50.0, 1) == [])
+
+    # Replay: ticks for A only (two minutes, the first partial); B has no stream data
+    messages = [{"type": "tick", "symbol": "a", "timestamp": (t0 + timedelta(seconds=4 * i)).isoformat(),
+                 "price": 10 + i * 0.1, "volume": 1} for i in range(30)]
+    messages.insert(5, {"type": "quote", "symbol": "A"})
+    ssi = FakeSSI(latency=0.001)
+    poller = MarketPollingService(ssi_client=ssi, interval_default=0.1, stream_gap=1.0,
+                                  rate_limit_per_sec=1000, rate_limit_burst=100)
+    received = []
+
+    async def on_update(bars):
+        received.extend(bars)
+
+    poller.set_on_bars_update(on_update)
+    poller.set_symbols(["A", "B"])
+    source = ReplayStreamSource(messages, speed=400)  # 30 ticks over 0.3s
+    source.set_on_bars_update(poller.push_bars)
+    await poller.start()
+    await source.start()
+    await source.wait_closed()
+    await asyncio.sleep(0.2)
+    await poller.stop()
+    stats = poller.get_stats()
+    a_bars = [b for b in received if b.symbol == "A" and b.timeframe == Timeframe.INTRADAY_1M
+              and b.timestamp < datetime(2024, 1, 19, 9)]
+    check("stream bars reach the bars callback", a_bars and a_bars[-1].volume == 15
+          and round(a_bars[-1].close, 1) == 12.9, f"{a_bars[-1:] }")
+    check("partial first minute not pushed", {b.timestamp for b in a_bars} == {t0 + timedelta(minutes=1)}
+          and source.get_stats()["ticks_unpushed"] == 15, f"{source.get_stats()}")
+    check("bad message counted, stream keeps going", source.get_stats()["bad_messages"] == 1
+          and source.get_stats()["ticks"] == 30)
+    check("daily bars only from polling", all(b.volume == 1000 for b in received
+                                              if b.symbol == "A" and b.timeframe == Timeframe.DAILY))
+    check("streamed symbol: intraday left to the stream once caught up, gap symbol polled",
+          stats["intraday_skipped_streaming"] >= 2 and stats["stream_covered"] == 1
+          and any(b.symbol == "B" for b in received), f"{stats['intraday_skipped_streaming']}")
+
+    class NoFeed(StreamSource):
+        pass
+
+    try:
+        NoFeed()
+        check("source without _messages rejected", False)
+    except TypeError:
+        check("source without _messages rejected", True)
+
+    # Cursors follow polled bars only; the gap before the stream is polled first
+    counting = CountingSSI()
+    poller = MarketPollingService(ssi_client=counting, stream_gap=60, rate_limit_per_sec=1000)
+    await poller.ingest.start()
+    await poller.push_bars([
+        PriceBar(symbol="Z", timeframe=tf, timestamp=ts, open=10, high=11, low=9, close=10, volume=5)
+        for tf, ts in ((Timeframe.INTRADAY_1M, counting.minutes[-1]), (Timeframe.DAILY, counting.days[-1]))
+    ])
+    await poller.ingest.drain()
+    check("stream bars leave cursors alone",
+          all("Z" not in cursors for cursors in poller._cursors.values()))
+    check("gap before the stream still polled", not poller._stream_covers_intraday("Z", time.monotonic()))
+    await poller.ingest.put("Z", await poller._fetch_one("Z"))
+    await poller.ingest.drain()
+    await poller.ingest.stop()
+    check("caught up -> intraday left to the stream",
+          poller._stream_covers_intraday("Z", time.monotonic()))
+
+    # SSE adapter over a mock transport
+    body = "".join(
+        f"event: bar\ndata: {json.dumps(m)}\n\n" for m in [
+            {"type": "bar", "symbol": "VNM", "timeframe": "intraday_1m", "timestamp": t0.isoformat(),
+             "open": 70, "high": 71, "low": 69, "close": 70.5, "volume": 1000},
+            [{"type": "tick", "symbol": "HPG", "timestamp": (t0 + timedelta(seconds=sec)).isoformat(),
+              "price": 25.0, "volume": 5} for sec in (0, 60)],
+        ]
+    )
+    transport = httpx.MockTransport(lambda request: httpx.Response(
+        200, content=body.encode(), headers={"content-type": "text/event-stream"}))
+    sse = SSEStreamSource("http://feed/stream", transport=transport, reconnect_base=0.01)
+    got = []
+
+    async def collect(bars):
+        got.extend(bars)
+
+    sse.set_on_bars_update(collect)
+    await sse.start()
+    await asyncio.sleep(0.05)
+    await sse.stop()
+    check("SSE: bar and tick-list messages decoded", {b.symbol for b in got} == {"VNM", "HPG"}
+          and got[0].close == 70.5, f"{got[:2]}")
+    check("SSE: reconnects after the stream ends", sse.get_stats()["connects"] >= 2)
+
+    # WebSocket adapter against a local server
+    import websockets
+
+    async def feed(ws):
+        assert json.loads(await ws.recv()) == {"subscribe": ["SSI"]}
+        for sec in (0, 60):
+            await ws.send(json.dumps({"type": "tick", "symbol": "SSI", "price": 30.0, "volume": 2,
+                                      "timestamp": (t0 + timedelta(seconds=sec)).isoformat()}))
+        await asyncio.sleep(1)
+
+    async with websockets.serve(feed, "127.0.0.1", 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        ws_source = WebSocketStreamSource(f"ws://127.0.0.1:{port}", subscribe={"subscribe": ["SSI"]})
+        got.clear()
+        ws_source.set_on_bars_update(collect)
+        await ws_source.start()
+        for _ in range(50):
+            if got:
+                break
+            await asyncio.sleep(0.01)
+        await ws_source.stop()
+    check("WebSocket: subscribe sent, ticks decoded", [b.symbol for b in got] == ["SSI"])
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+async def main():
+    print("=" * 60)
+    print("Market Polling Service Tests")
+    print("=" * 60)
+
+    await test_token_bucket()
+    await test_concurrent_sweep()
+    await test_rate_limit_bounds_sweep()
+    await test_failure_isolation()
+    await test_serial_mode()
+    await test_fetch_cursors()
+    await test_seed_cursors_from_state()
+    await test_trading_calendar()
+    await test_session_scheduler()
+    await test_heap_scheduler()
+    await test_ingest_queue()
+    await test_stream_sources()
+    await test_adaptive_tiers()
+    await test_ssi_client()
+    await test_ssi_simulator()
+
+    print("\n" + "=" * 60)
+    print(f"Results: {passed}/{passed + failed} passed, {failed} failed")
+    print("=" * 60)
+    return failed == 0
+
+
+if __name__ == "__main__":
+    ok = asyncio.run(main())
+    sys.exit(0 if ok else 1)
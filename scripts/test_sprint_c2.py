@@ -49,8 +49,14 @@ def _load_module(name, filename):
 
 
 pipeline_monitor_mod = _load_module("pipeline_monitor", "pipeline_monitor.py")
+_load_module("bar_buffer", "bar_buffer.py")
+_load_module("indicators", "indicators.py")
 ai_explain_mod = _load_module("ai_explain_service", "ai_explain_service.py")
 alert_evaluator_mod = _load_module("alert_evaluator", "alert_evaluator.py")
+_load_module("detector_features", "detector_features.py")
+_load_module("detector_registry", "detector_registry.py")
+_load_module("insight_vectorized", "insight_vectorized.py")
+_load_module("insight_log", "insight_log.py")
 insight_engine_mod = _load_module("insight_engine", "insight_engine.py")
 
 InsightEngine = insight_engine_mod.InsightEngine
@@ -100,7 +106,7 @@ def make_snapshot(symbol):
 async def test_min_bars_guard():
     """PA01/PA02 should return [] when bars_1m < 5."""
     print("\n[TEST] PA01/PA02 min_bars guard")
-    engine = InsightEngine(enabled=True)
+    engine = InsightEngine(enabled=True, log_file=None)
     snap = make_snapshot("VIC")
     few_bars = make_bars_1m("VIC", 3, bullish=True)
     daily = make_bars_daily("VIC", 50)
@@ -119,7 +125,7 @@ async def test_min_bars_guard():
 async def test_min_bars_pass():
     """PA01 should fire when bars_1m >= 5 and has strong bullish."""
     print("\n[TEST] PA01 fires with sufficient bars")
-    engine = InsightEngine(enabled=True)
+    engine = InsightEngine(enabled=True, log_file=None)
     snap = make_snapshot("VIC")
     bars = make_bars_1m("VIC", 10, bullish=True)
     daily = make_bars_daily("VIC", 50)